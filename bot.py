@@ -1,101 +1,299 @@
+import argparse
+import asyncio
 import discord
 import os
-import yaml
+import signal
 from dotenv import load_dotenv
 import logging
+from typing import List, Optional, Tuple
 from discord.ext import commands
 
 
-from database.repository import GhostRepository
+from database.partitioned import create_repository
 from core.tracker import MentionTracker
 from core.evaluator import ResponseEvaluator
 from core.scheduler import TimeoutScheduler
+from core.startup import StartupPipeline
+from core.lifecycle import ShutdownGate
+from core.admission import AdmissionController
+from core.participants import ParticipantRegistry
+from core.ranking import RankIndex
+from core.voice import VoiceResponder
+from core.profiling import Profiler, ProfiledCommandTree
+from core.gateway import build_gateway_options
+from core.cards import LeaderboardCards
+from core.reload import ConfigReloader, read_config
+from utils.name_cache import NameCache
+from utils.command_sync import CommandSyncState
+from utils.logger import setup_logging
+from utils.permissions import load_permissions
+from database.read_model import StatsReadModel
 
-# 設定基礎 Log (之後移至 utils/logger.py 統一管理)
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("MentionDodger")
 
 class GhostBot(commands.Bot):
-    def __init__(self) -> None:
+    def __init__(self, config: Optional[dict] = None, force_sync: bool = False) -> None:
+        """
+        Args:
+            config: 已讀取的 config.yaml (None 則在此讀取)
+        """
         # 1. 載入設定檔
-        self.config = self.load_config()
+        self.config = config if config is not None else self.load_config()
+        self.permissions = load_permissions()
+        self.force_sync = force_sync
+        self.startup = StartupPipeline.from_config(self.config)
+        self.lifecycle = ShutdownGate()
+        self.profiler = Profiler.from_config(self.config)
         
-        # 2. 設定 Intents
-        intents = discord.Intents.default()
-        intents.message_content = True  
-        intents.members = True
+        # 2. 設定 Intents 與快取 (gateway.profile: default / lean)
+        self.names = NameCache(self.config.get("gateway", {}).get("name_cache_size", 10000))
 
         super().__init__(
             command_prefix=commands.when_mentioned,
-            intents=intents,
+            **build_gateway_options(self.config),
             help_command=None,
-            description="MentionDodger - A bot tracking ghosting behavior."
+            description="MentionDodger - A bot tracking ghosting behavior.",
+            tree_cls=ProfiledCommandTree
         )
 
-    def load_config(self) -> dict:
+    @staticmethod
+    def load_config() -> dict:
         """
         讀取 config/config.yaml
         """
         try:
-            with open("config/config.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+            return read_config("config/config.yaml")
         except FileNotFoundError:
             logger.error("找不到 config/config.yaml，請檢查檔案位置。")
             exit(1)
+        except ValueError as e:
+            logger.error(f"config/config.yaml 設定錯誤: {e}")
+            exit(1)
 
     async def setup_hook(self) -> None:
         """
         Bot 啟動前的異步初始化鉤子
-        在這裡載入 Cogs 和連接資料庫
+        
+        彼此獨立的步驟並行執行:
+        - 背景: 開啟資料庫 / 建表檢查 → 分批恢復 pending timeouts
+        - 前景: 並行載入 Cogs → 同步 Slash Commands → 返回後開始連線 gateway
+        還原完成前收到的事件會暫存在 self.startup，完成後依序套用
         """
-        print(f"--- 初始化 GhostBot ---")
+        logger.info("--- 初始化 GhostBot ---")
         
-        # 1. 初始化資料庫
-        self.repository = GhostRepository(self.config["database"]["path"])
-        await self.repository.init_db()
+        # 診斷: 常駐 asyncio debug 或啟動時 profiling (MENTIONDODGER_PROFILE=秒數)
+        if self.config.get("profiling", {}).get("loop_debug", False):
+            self.profiler.set_loop_debug(True)
+        profile_seconds = os.getenv("MENTIONDODGER_PROFILE")
+        if profile_seconds:
+            self.profiler.start(float(profile_seconds))
         
-        # 2. 初始化核心元件
+        # 1. 初始化核心元件 (不涉及 I/O)
+        self.repository = create_repository(self.config["database"])
+        # /rank、/ghost 的讀取路徑 (記憶體快照 + 唯讀連線)
+        self.read_model = StatsReadModel(
+            self.repository,
+            max_staleness=self.config.get("read_model", {}).get("max_staleness", 30)
+        )
         timeout = self.config["ghost_rules"]["response_timeout"]
-        self.tracker = MentionTracker(self.repository, timeout)
-        self.evaluator = ResponseEvaluator(
-            min_length=self.config["ghost_rules"]["valid_response_min_length"]
+        self.participants = ParticipantRegistry(
+            self.repository,
+            enabled=self.config["ghost_rules"].get("need_permission2play", False)
         )
-        self.scheduler = TimeoutScheduler(self.repository, timeout)
-        cog_folders = ["commands", "events"]
+        # /rank 圖片排行榜 (子程序繪圖，第一次使用時才啟動)
+        self.cards = LeaderboardCards.from_config(self.config)
+        # /ghost 的名次 (隨 mention 與詐欺更新)
+        self.ranking = RankIndex(self.repository)
+        self.tracker = MentionTracker(self.repository, timeout, self.participants, self.ranking)
+        self.evaluator = ResponseEvaluator.from_config(self.config)
+        self.scheduler = TimeoutScheduler(
+            self.repository,
+            timeout,
+            self.ranking,
+            horizon_seconds=self.config.get("scheduler", {}).get("horizon_seconds", 0)
+        )
+        # 加入語音頻道視為回應 (events.on_voice_state 開啟時才會收到事件)
+        self.voice = VoiceResponder.from_config(self.repository, self.scheduler, self.config)
+        self.admission = AdmissionController.from_config(self.scheduler.get_open_count, self.config)
+        self.admission.start()
+        
+        # 2. 資料庫初始化與 timeout 恢復在背景執行，與載入模組、gateway 連線重疊
+        self._restore_task = asyncio.create_task(self._init_storage(), name="startup_restore")
+        
+        # SIGTERM (例如容器停止) 也走正常關閉流程
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except (NotImplementedError, AttributeError):
+            pass  # Windows 不支援
+        
+        # 3. 並行載入 Cogs
+        async with self.startup.phase("載入模組"):
+            await asyncio.gather(*(self._load_cog(name) for name in self._enabled_extensions()))
+        
+        # 4. 只在指令樹變動時同步 (sync 有速率限制)
+        async with self.startup.phase("同步指令"):
+            await self.sync_commands(force=self.force_sync)
+        
+        # 5. config.yaml / permissions.json 變動時自動重載
+        self.reloader = ConfigReloader.from_config(self)
+        self.reloader.start()
 
-        enable_cogs = [key for key, i in (bot.config["commands"] | bot.config["events"]).items() if i["enable"]]
+        logger.info("--- 初始化完成，等待連線 ---")
 
-        for folder in cog_folders:
+    async def sync_commands(self, force: bool = False) -> bool:
+        """
+        指令樹與上次同步不同時才同步
+
+        Returns:
+            bool: 是否實際進行了同步
+        """
+        sync_state = CommandSyncState(
+            self.config.get("command_sync", {}).get("hash_path", "database/command_tree.json")
+        )
+        synced = False
+        guild_id = os.getenv("GUILD_ID")
+        if guild_id:
+            synced = await sync_state.sync_if_changed(self.tree, guild=discord.Object(id=int(guild_id)), force=force)
+        
+        return await sync_state.sync_if_changed(self.tree, guild=None, force=force) or synced
+
+    async def reconcile_extensions(self) -> Tuple[List[str], List[str]]:
+        """
+        依目前的 config 只載入新啟用、卸載已停用的模組 (其餘模組與其狀態不動)
+
+        Returns:
+            (載入的模組, 卸載的模組)
+        """
+        wanted = set(self._enabled_extensions())
+        current = {name for name in self.extensions if name.split(".")[0] in ("commands", "events")}
+        
+        unloaded = sorted(current - wanted)
+        for name in unloaded:
+            await self.unload_extension(name)
+            logger.info(f"已卸載模組: {name}")
+        
+        loaded = []
+        for name in sorted(wanted - current):
+            await self._load_cog(name)
+            if name in self.extensions:
+                loaded.append(name)
+        return loaded, unloaded
+
+    def _enabled_extensions(self) -> list:
+        """
+        依 config 列出要載入的模組名稱
+        """
+        enable_cogs = {key for key, i in (self.config["commands"] | self.config["events"]).items() if i["enable"]}
+        extensions = []
+        
+        for folder in ("commands", "events"):
             if not os.path.exists(folder):
                 logger.warning(f"目錄 {folder} 不存在，跳過載入。")
                 continue
-                
-            for filename in os.listdir(folder):
+            
+            for filename in sorted(os.listdir(folder)):
                 if filename[:-3] not in enable_cogs: continue
                 if filename.endswith(".py") and not filename.startswith("__"):
-                    extension_name = f"{folder}.{filename[:-3]}"
-                    try:
-                        await self.load_extension(extension_name)
-                        logger.info(f"已載入模組: {extension_name}")
-                    except Exception as e:
-                        logger.error(f"無法載入模組 {extension_name}: {e}")
+                    extensions.append(f"{folder}.{filename[:-3]}")
         
+        return extensions
 
-        await self.tree.sync(guild=discord.Object(id=(os.getenv("GUILD_ID"))))
-        
-        await self.tree.sync(guild=None)
-        logger.info("Slash Commands 已同步")
+    async def _load_cog(self, extension_name: str) -> None:
+        try:
+            await self.load_extension(extension_name)
+            logger.info(f"已載入模組: {extension_name}")
+        except Exception as e:
+            logger.error(f"無法載入模組 {extension_name}: {e}")
+
+    async def _init_storage(self) -> None:
+        """
+        開啟資料庫並恢復 pending timeouts，完成後套用暫存事件
+        """
+        try:
+            async with self.startup.phase("資料庫初始化"):
+                await self.repository.init_db()
+                await self.repository.start()
+            
+            async with self.startup.phase("載入參加者"):
+                await self.participants.load()
+            
+            async with self.startup.phase("恢復 timeouts"):
+                # 優先使用上次正常關閉留下的快照，沒有才完整查詢資料庫
+                if not await self.scheduler.restore_from_snapshot(self._snapshot_path()):
+                    await self.scheduler.restore_pending_timeouts(
+                        chunk_size=self.config["database"].get("restore_chunk_size", 500)
+                    )
+            
+            async with self.startup.phase("套用暫存事件"):
+                await self.startup.complete()
+        except Exception as e:
+            logger.critical(f"資料庫初始化失敗，關閉 Bot: {e}", exc_info=True)
+            await self.close()
 
-        print(f"--- 初始化完成，等待連線 ---")
+    def _snapshot_path(self) -> str:
+        return self.config["database"].get("snapshot_path", "database/scheduler_snapshot.json")
+
+    async def close(self) -> None:
+        """
+        正常關閉: 停止接受事件 → 清空工作佇列與處理中的寫入 → 寫入排程快照 → 斷線
+        """
+        if self.lifecycle.accepting:
+            self.lifecycle.stop_accepting()
+            logger.info("正在關閉 GhostBot...")
+            
+            if hasattr(self, "admission"):
+                await self.admission.drain()
+            await self.lifecycle.drain()
+            if hasattr(self, "admission"):
+                await self.admission.stop()
+            
+            # 尚未判定的語音加入立即判定 (需在排程器關閉前)
+            if hasattr(self, "voice"):
+                await self.voice.drain()
+            
+            if hasattr(self, "reloader"):
+                self.reloader.stop()
+            
+            # 進行中的 profiling 提前結束並寫出報告
+            await self.profiler.stop()
+            
+            if hasattr(self, "cards"):
+                self.cards.shutdown()
+            
+            restore_task = getattr(self, "_restore_task", None)
+            if restore_task is not None and not restore_task.done():
+                restore_task.cancel()
+            
+            if hasattr(self, "scheduler"):
+                # 恢復尚未完成時記憶體中的計時不完整，不寫快照 (下次改為完整恢復)
+                snapshot_path = self._snapshot_path() if self.startup.is_ready else None
+                await self.scheduler.shutdown(snapshot_path)
+            
+            if hasattr(self, "repository"):
+                # 寫完佇列中剩餘的寫入後關閉連線
+                await self.repository.close()
+        
+        await super().close()
 
     async def on_ready(self) -> None:
+        if "gateway ready" not in self.startup.timings:
+            self.startup.mark("gateway ready")
+            logger.info(f"啟動耗時: {self.startup.summary()}")
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info("------")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MentionDodger Discord bot")
+    parser.add_argument("--force-sync", action="store_true", help="無論指令樹是否變動都強制同步 Slash Commands")
+    args = parser.parse_args()
 
-    bot = GhostBot()
+    # 先設定 log，權限檔與各元件初始化時的訊息才會寫入 log 檔
+    config = GhostBot.load_config()
+    setup_logging(config.get("logging"))
+    bot = GhostBot(config, force_sync=args.force_sync)
 
     load_dotenv()
     token = os.getenv(bot.config.get("token"))
@@ -104,6 +302,7 @@ if __name__ == "__main__":
         logger.error("Config 中未找到 Token，請檢查設定檔。")
     else:
         try:
-            bot.run(token)
+            # log 已由 utils/logger.py 統一設定，不讓 discord.py 另外掛 handler
+            bot.run(token, log_handler=None)
         except discord.errors.LoginFailure:
             logger.error("Token 無效，無法登入。")
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+/export 指令 - 匯出本伺服器的資料 (管理員)
+"""
+import asyncio
+import os
+import tempfile
+from typing import Literal
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from database.export import csv_table_path, export_data, TABLES
+from utils.permissions import is_admin
+
+
+class ExportCommand(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+    
+    @app_commands.command(
+        name="export",
+        description="匯出本伺服器的詐欺紀錄 (管理員)"
+    )
+    @app_commands.describe(
+        format="檔案格式 (預設 jsonl)"
+    )
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        format: Literal["jsonl", "csv"] = "jsonl"
+    ):
+        """
+        匯出 ghost_stats / participants / mentions 為壓縮檔
+        匯入請使用 python -m tools.export_data import (需先停止 Bot)
+        """
+        if interaction.guild is None:
+            await interaction.response.send_message("❌ 此指令只能在伺服器中使用", ephemeral=True)
+            return
+        
+        if not is_admin(interaction.user, self.bot.permissions):
+            await interaction.response.send_message("❌ 只有管理員可以匯出資料", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        
+        guild_id = interaction.guild.id
+        repo = self.bot.repository
+        db_path = repo.shard_for_guild(guild_id).db_path if hasattr(repo, "shard_for_guild") else repo.db_path
+        
+        with tempfile.TemporaryDirectory() as directory:
+            out_path = os.path.join(directory, f"mentiondodger_{guild_id}.{format}.gz")
+            # sqlite3 分批讀寫，放到執行緒中避免阻塞 event loop
+            counts = await asyncio.to_thread(export_data, [db_path], out_path, guild_id)
+            
+            if format == "csv":
+                paths = [csv_table_path(out_path, table) for table in TABLES]
+            else:
+                paths = [out_path]
+            
+            size = sum(os.path.getsize(path) for path in paths)
+            summary = ", ".join(f"{table}: {count}" for table, count in counts.items())
+            if size > interaction.guild.filesize_limit:
+                await interaction.followup.send(
+                    f"❌ 檔案過大 ({size / 1024 / 1024:.1f} MB)，請在主機上使用 "
+                    f"`python -m tools.export_data export <檔案> --guild {guild_id}`\n{summary}",
+                    ephemeral=True
+                )
+                return
+            
+            await interaction.followup.send(
+                f"📦 匯出完成 ({summary})",
+                files=[discord.File(path) for path in paths],
+                ephemeral=True
+            )
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ExportCommand(bot))
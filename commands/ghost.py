@@ -5,6 +5,125 @@ import discord
 from discord import app_commands, Embed
 from discord.app_commands import Choice
 from discord.ext import commands
+from typing import List, Optional
+
+from database.models import MentionRecord
+from utils.permissions import is_admin
+from utils.sketch import format_latency
+
+
+class MentionHistoryView(discord.ui.View):
+    """
+    mention 紀錄的分頁按鈕
+    - 按下一頁時才讀取資料庫 (keyset 分頁，從上一頁最後一筆往後讀)
+    - 已讀取的頁面保留在此 view 中，返回上一頁不需再查詢
+    """
+    PAGE_SIZE = 10
+    
+    def __init__(self, bot: commands.Bot, owner_id: int, target: discord.abc.User, guild_id: int):
+        super().__init__(timeout=180)
+        self.bot = bot
+        self.owner_id = owner_id
+        self.target = target
+        self.guild_id = guild_id
+        self.ghost_only = False
+        self.message: Optional[discord.Message] = None
+        self._reset()
+    
+    def _reset(self) -> None:
+        self.pages: List[List[MentionRecord]] = []
+        self.page = 0
+        self.exhausted = False
+    
+    async def load_page(self, index: int) -> List[MentionRecord]:
+        """
+        取得第 index 頁 (只會往後多讀一頁)
+        """
+        if index < len(self.pages):
+            return self.pages[index]
+        
+        before = self.pages[-1][-1] if self.pages and self.pages[-1] else None
+        # 多讀一筆以判斷是否還有下一頁
+        records = await self.bot.repository.get_mention_history(
+            self.target.id,
+            self.guild_id,
+            limit=self.PAGE_SIZE + 1,
+            before=before,
+            ghost_only=self.ghost_only
+        )
+        if len(records) <= self.PAGE_SIZE:
+            self.exhausted = True
+        self.pages.append(records[:self.PAGE_SIZE])
+        return self.pages[index]
+    
+    def build_embed(self) -> Embed:
+        records = self.pages[self.page]
+        title = "詐欺紀錄" if self.ghost_only else "最近的 mention"
+        embed = Embed(title=f"📜 {self.target.display_name} 的{title}", color=0xFF6B6B)
+        
+        if not records:
+            embed.description = "沒有紀錄"
+        else:
+            lines = []
+            for record in records:
+                if record.is_ghost:
+                    status = "👻"
+                elif record.responded:
+                    status = "✅"
+                else:
+                    status = "⏳"
+                link = f"https://discord.com/channels/{record.guild_id}/{record.channel_id}/{record.message_id}"
+                lines.append(
+                    f"{status} <t:{int(record.mention_time.timestamp())}:f> "
+                    f"由 <@{record.mentioner_user_id}> [提及]({link})"
+                )
+            embed.description = "\n".join(lines)
+        
+        more = "" if self.exhausted and self.page == len(self.pages) - 1 else "+"
+        embed.set_footer(text=f"第 {self.page + 1} / {len(self.pages)}{more} 頁 • 👻 詐欺 ✅ 已回應 ⏳ 等待中")
+        return embed
+    
+    def update_buttons(self) -> None:
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.exhausted and self.page == len(self.pages) - 1
+        self.toggle_ghost_only.label = "顯示全部" if self.ghost_only else "只看詐欺"
+    
+    async def show(self, interaction: discord.Interaction) -> None:
+        await self.load_page(self.page)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("只有查詢者可以翻頁", ephemeral=True)
+            return False
+        return True
+    
+    async def on_timeout(self) -> None:
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+    
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self.show(interaction)
+    
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self.show(interaction)
+    
+    @discord.ui.button(label="只看詐欺", style=discord.ButtonStyle.danger)
+    async def toggle_ghost_only(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # 篩選條件改變，已快取的頁面不再適用
+        self.ghost_only = not self.ghost_only
+        self._reset()
+        await self.show(interaction)
 
 
 class GhostCommand(commands.Cog):
@@ -17,13 +136,17 @@ class GhostCommand(commands.Cog):
     )
     @app_commands.describe(
         user="目標使用者（不填則查詢自己）",
-        public="是否公開顯示（預設僅自己可見）"
+        public="是否公開顯示（預設僅自己可見）",
+        fresh="讀取最新資料而非快照（僅管理員）",
+        history="顯示最近的 mention 紀錄（可翻頁）"
     )
     async def ghost(
         self,
         interaction: discord.Interaction,
         user: discord.Member | None = None,
-        public: bool = False
+        public: bool = False,
+        fresh: bool = False,
+        history: bool = False
     ):
         """
         查詢使用者的詐欺紀錄
@@ -31,13 +154,28 @@ class GhostCommand(commands.Cog):
         參數:
             user: 要查詢的使用者（選填，預設為自己）
             public: True = 所有人可見, False = 僅自己可見（預設）
+            fresh: 略過快照直接讀取資料庫（僅管理員有效）
+            history: 改為顯示 mention 紀錄
         """
         target = user or interaction.user
         
         is_ephemeral = not public
         
-        # 取得統計資料
-        stats = await self.bot.repository.get_user_stats(user_id=target.id, guild_id=interaction.guild.id)
+        if history:
+            view = MentionHistoryView(self.bot, interaction.user.id, target, interaction.guild.id)
+            await view.load_page(0)
+            view.update_buttons()
+            await interaction.response.send_message(embed=view.build_embed(), view=view, ephemeral=is_ephemeral)
+            view.message = await interaction.original_response()
+            return
+        
+        # 取得統計資料 (讀取快照，不經過寫入連線)
+        fresh = fresh and is_admin(interaction.user, self.bot.permissions)
+        stats = await self.bot.read_model.get_user_stats(
+            user_id=target.id,
+            guild_id=interaction.guild.id,
+            fresh=fresh
+        )
         
         # 沒有紀錄
         if not stats or stats.mention_count == 0:
@@ -82,6 +220,28 @@ class GhostCommand(commands.Cog):
             inline=True
         )
         
+        # 回應延遲 (ghost_stats 中的 sketch，不掃描 mentions)
+        if stats.latency_count:
+            embed.add_field(
+                name="⏱️ 回應速度",
+                value=(
+                    f"平均 **{format_latency(stats.latency_mean)}** ｜ "
+                    f"中位數 **{format_latency(stats.latency_p50)}** ｜ "
+                    f"P90 **{format_latency(stats.latency_p90)}**"
+                ),
+                inline=False
+            )
+        
+        # 名次 (排名索引，O(log n))
+        rank = await self.bot.ranking.get_rank(user_id=target.id, guild_id=interaction.guild.id)
+        if rank is not None:
+            position, total = rank
+            embed.add_field(
+                name="🏆 排名",
+                value=f"第 **{position}** 名 / {total} 人（前 {self.bot.ranking.percentile(position, total):.1f}%）",
+                inline=True
+            )
+        
         # 顯示可見性提示
         if is_ephemeral:
             embed.set_footer(text="🔒 此訊息僅你可見")
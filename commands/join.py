@@ -18,7 +18,31 @@ class JoinCommand(commands.Cog):
         self,
         interaction: discord.Interaction
     ):
-        pass
+        """
+        將自己加入追蹤名單，之後被 mention 未回應會被記為詐欺
+        """
+        if interaction.guild is None:
+            await interaction.response.send_message("❌ 此指令只能在伺服器中使用", ephemeral=True)
+            return
+        
+        added = await self.bot.participants.join(interaction.guild.id, interaction.user.id)
+        
+        if not added:
+            await interaction.response.send_message("📋 你已經在詐欺排行榜中了！", ephemeral=True)
+            return
+        
+        timeout = self.bot.config["ghost_rules"]["response_timeout"]
+        embed = Embed(
+            title="👻 已加入詐欺排行榜",
+            color=0x4CAF50,
+            description=(
+                f"之後被 mention 時，若 **{timeout}** 秒內沒有回應就會被記為詐欺。\n"
+                f"隨時可以使用 /quit 退出。"
+            )
+        )
+        embed.set_footer(text=f"目前共 {self.bot.participants.get_count(interaction.guild.id)} 人參加")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 async def setup(bot: commands.Bot):
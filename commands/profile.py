@@ -0,0 +1,78 @@
+"""
+/profile 指令 - 效能診斷 (管理員)
+"""
+from typing import Literal
+
+import discord
+from discord import app_commands, Embed
+from discord.ext import commands
+
+from utils.permissions import is_admin
+
+
+class ProfileCommand(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+    
+    @app_commands.command(
+        name="profile",
+        description="效能診斷 (管理員)"
+    )
+    @app_commands.describe(
+        action="start = 開始 profiling / stats = 處理器執行時間 / reset = 清除統計",
+        seconds="profiling 秒數",
+        loop_debug="profiling 期間開啟 asyncio 慢 callback 警告",
+        slow_callback_ms="慢 callback 門檻 (毫秒)"
+    )
+    async def profile(
+        self,
+        interaction: discord.Interaction,
+        action: Literal["start", "stats", "reset"] = "stats",
+        seconds: app_commands.Range[int, 1, 600] = 30,
+        loop_debug: bool = False,
+        slow_callback_ms: app_commands.Range[int, 1, 10000] | None = None
+    ):
+        if not is_admin(interaction.user, self.bot.permissions):
+            await interaction.response.send_message("❌ 只有管理員可以使用此指令", ephemeral=True)
+            return
+        
+        profiler = self.bot.profiler
+        
+        if action == "reset":
+            profiler.reset_handlers()
+            await interaction.response.send_message("🧹 已清除處理器統計", ephemeral=True)
+            return
+        
+        if action == "start":
+            if slow_callback_ms is not None:
+                profiler.slow_callback_ms = slow_callback_ms
+            try:
+                base_path = profiler.start(seconds, loop_debug=loop_debug)
+            except RuntimeError:
+                await interaction.response.send_message("⏳ 已有進行中的 profiling", ephemeral=True)
+                return
+            await interaction.response.send_message(
+                f"🔬 開始 profiling {seconds} 秒，報告將寫入 `{base_path}.prof` / `.txt`"
+                + (f"\n慢 callback 門檻: {profiler.slow_callback_ms}ms" if loop_debug else ""),
+                ephemeral=True
+            )
+            return
+        
+        report = profiler.handler_report()
+        embed = Embed(title="⏱️ 處理器執行時間", color=0x5865F2)
+        if not report:
+            embed.description = "尚無資料"
+        else:
+            lines = [
+                f"`{name}` {stats.count} 次 ｜ 平均 {stats.mean * 1000:.1f}ms ｜ "
+                f"最大 {stats.max * 1000:.1f}ms ｜ 總計 {stats.total:.1f}s"
+                for name, stats in report[:20]
+            ]
+            embed.description = "\n".join(lines)
+        if profiler.is_profiling:
+            embed.set_footer(text="🔬 profiling 進行中")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ProfileCommand(bot))
@@ -18,7 +18,26 @@ class QuitCommand(commands.Cog):
         self,
         interaction: discord.Interaction
     ):
-        pass
+        """
+        將自己移出追蹤名單 (既有紀錄保留)
+        """
+        if interaction.guild is None:
+            await interaction.response.send_message("❌ 此指令只能在伺服器中使用", ephemeral=True)
+            return
+        
+        removed = await self.bot.participants.quit(interaction.guild.id, interaction.user.id)
+        
+        if not removed:
+            await interaction.response.send_message("📋 你目前不在詐欺排行榜中", ephemeral=True)
+            return
+        
+        embed = Embed(
+            title="👋 已退出詐欺排行榜",
+            color=0x9E9E9E,
+            description="之後被 mention 不會再被追蹤，既有的紀錄仍會保留。"
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 async def setup(bot: commands.Bot):
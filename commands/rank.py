@@ -1,11 +1,19 @@
 """
 /rank 指令 - 顯示詐欺排行榜
 """
+import io
+import logging
 import discord
 from discord import app_commands, Embed
 from typing import Literal
 from discord.ext import commands
 
+from core.cards import PERIOD_ALL
+
+from utils.permissions import is_admin
+from utils.sketch import format_latency
+
+logger = logging.getLogger("MentionDodger.Rank")
 
 class RankCommand(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -17,20 +25,33 @@ class RankCommand(commands.Cog):
     )
     @app_commands.describe(
         limit="顯示人數",
-        public="是否公開顯示 (預設為 False，只有自己看得到)"
+        public="是否公開顯示 (預設為 False，只有自己看得到)",
+        fresh="讀取最新資料而非快照 (僅管理員)",
+        mode="排行方式: ghost = 詐欺次數 / fastest = 回應最快",
+        image="以圖片顯示詐欺排行 (需安裝 Pillow)"
     )
     async def rank(
         self,
         interaction: discord.Interaction,
         limit: int = 10,
-        public: bool = False
+        public: bool = False,
+        fresh: bool = False,
+        mode: Literal["ghost", "fastest"] = "ghost",
+        image: bool = False
     ):
         limit = max(1, min(limit, 50))
         
-        # 從資料庫取得排行榜
-        stats = await self.bot.repository.get_leaderboard(
+        # 從快照取得排行榜 (最多 max_staleness 秒前的資料)
+        fresh = fresh and is_admin(interaction.user, self.bot.permissions)
+        if mode == "fastest":
+            await self.send_fastest(interaction, limit, public, fresh)
+            return
+        
+        # 排名版本與排行榜取自同一份快照 (圖片快取鍵)
+        stats, version = await self.bot.read_model.get_versioned_leaderboard(
             guild_id=interaction.guild.id,
-            limit=limit
+            limit=limit,
+            fresh=fresh
         )
         
         # 如果沒有資料
@@ -41,6 +62,19 @@ class RankCommand(commands.Cog):
             )
             return
         
+        if image and self.bot.cards.available:
+            await self.send_card(interaction, stats, version, public)
+            return
+        
+        await interaction.response.send_message(
+            embed=await self.build_embed(interaction.guild, stats),
+            ephemeral=not public
+        )
+    
+    async def build_embed(self, guild: discord.Guild, stats: list) -> Embed:
+        """
+        文字排行榜
+        """
         # 建立排行榜 Embed
         embed = Embed(
             title="👻 詐欺排行榜",
@@ -57,15 +91,8 @@ class RankCommand(commands.Cog):
         
         # 逐一添加排行
         for i, stat in enumerate(stats, start=1):
-            # 取得使用者資訊
-            try:
-                user = self.bot.get_user(stat.user_id)
-                if user is None:
-                    user = await self.bot.fetch_user(stat.user_id)
-                user_name = user.display_name
-            except:
-                # 如果使用者已離開伺服器或取得失敗
-                user_name = f"未知使用者 ({stat.user_id})"
+            # 取得使用者名稱 (名稱快取 → client 快取 → API)
+            user_name = await self.bot.names.resolve(self.bot, stat.user_id)
             
             # 排名顯示 (前三名加獎牌)
             rank_display = medals.get(i, f"{i}.")
@@ -100,15 +127,84 @@ class RankCommand(commands.Cog):
         )
         
         # 添加頁尾
+        age = self.bot.read_model.get_age(guild.id) or 0
         embed.set_footer(
-            text=f"📅 {interaction.guild.name} • 共 {len(stats)} 人上榜"
+            text=f"📅 {guild.name} • 共 {len(stats)} 人上榜 • {age:.0f} 秒前更新"
         )
+        return embed
+    
+    async def send_card(self, interaction: discord.Interaction, stats: list, version: int, public: bool):
+        """
+        圖片排行榜 (排名未變動時使用快取的 PNG，繪製失敗時改用文字排行榜)
+        """
+        guild = interaction.guild
+        await interaction.response.defer(ephemeral=not public, thinking=True)
         
-        # 發送訊息
-        await interaction.response.send_message(
+        try:
+            png = await self.bot.cards.get_card(
+                self.bot,
+                self.bot.names,
+                guild_id=guild.id,
+                version=version,
+                stats=stats,
+                guild_name=guild.name,
+                period=PERIOD_ALL
+            )
+        except Exception as e:
+            # 子程序異常終止、Pillow 或頭像檔寫入錯誤: 不讓使用者停在「思考中」
+            logger.warning("排行榜卡片繪製失敗，改用文字排行榜: %s", e, exc_info=True, extra={"guild_id": guild.id})
+            await interaction.followup.send(embed=await self.build_embed(guild, stats), ephemeral=not public)
+            return
+        
+        age = self.bot.read_model.get_age(guild.id) or 0
+        embed = Embed(color=0xFF6B6B)
+        embed.set_image(url="attachment://leaderboard.png")
+        embed.set_footer(text=f"📅 {guild.name} • {age:.0f} 秒前更新")
+        await interaction.followup.send(
             embed=embed,
+            file=discord.File(io.BytesIO(png), filename="leaderboard.png"),
             ephemeral=not public
         )
+    
+    async def send_fastest(self, interaction: discord.Interaction, limit: int, public: bool, fresh: bool):
+        """
+        回應最快排行 (依回應延遲中位數)
+        """
+        stats = await self.bot.read_model.get_fastest(
+            guild_id=interaction.guild.id,
+            limit=limit,
+            fresh=fresh
+        )
+        
+        if not stats:
+            await interaction.response.send_message(
+                "⏱️ 還沒有足夠的回應紀錄可以排名！",
+                ephemeral=not public
+            )
+            return
+        
+        embed = Embed(
+            title="⚡ 回應最快排行榜",
+            description=f"依回應時間中位數排序 (前 {len(stats)} 名)",
+            color=0x4CAF50
+        )
+        
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        for i, stat in enumerate(stats, start=1):
+            user_name = await self.bot.names.resolve(self.bot, stat.user_id)
+            embed.add_field(
+                name=f"{medals.get(i, f'{i}.')} {user_name}",
+                value=(
+                    f"⏱️ 中位數: **{format_latency(stat.latency_p50)}** ｜ "
+                    f"P90: **{format_latency(stat.latency_p90)}** ｜ "
+                    f"平均: **{format_latency(stat.latency_mean)}** ｜ "
+                    f"回應 **{stat.latency_count}** 次"
+                ),
+                inline=False
+            )
+        
+        embed.set_footer(text=f"📅 {interaction.guild.name}")
+        await interaction.response.send_message(embed=embed, ephemeral=not public)
 
 
 async def setup(bot: commands.Bot):
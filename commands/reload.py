@@ -0,0 +1,55 @@
+"""
+/reload 指令 - 重新載入 config.yaml 與 permissions.json (管理員)
+"""
+import discord
+from discord import app_commands, Embed
+from discord.ext import commands
+
+
+class ReloadCommand(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(
+        name="reload",
+        description="重新載入設定檔 (管理員)"
+    )
+    @app_commands.describe(
+        redeadline="進行中的計時是否依新的 response_timeout 重新計算 (預設只影響新的 mention)"
+    )
+    async def reload(self, interaction: discord.Interaction, redeadline: bool = False):
+        if not self.bot.permissions.can_use(interaction.user, "/reload"):
+            await interaction.response.send_message("❌ 只有管理員可以使用此指令", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            result = await self.bot.reloader.reload(redeadline=redeadline)
+        except (OSError, ValueError) as e:
+            await interaction.followup.send(f"❌ 設定檔有誤，已保留目前的設定\n```{e}```", ephemeral=True)
+            return
+
+        if result.is_noop:
+            await interaction.followup.send("✅ 設定檔沒有變動", ephemeral=True)
+            return
+
+        embed = Embed(title="🔄 設定已重新載入", color=0x57F287)
+        embed.add_field(name="變動區塊", value=", ".join(result.changed) or "-", inline=False)
+        if result.permissions_changed:
+            embed.add_field(name="權限", value="permissions.json 已更新", inline=False)
+        if result.redeadlined:
+            embed.add_field(name="計時", value=f"重新計算 {result.redeadlined} 個進行中的計時", inline=False)
+        if result.loaded or result.unloaded:
+            embed.add_field(
+                name="模組",
+                value=f"載入: {', '.join(result.loaded) or '-'}\n卸載: {', '.join(result.unloaded) or '-'}"
+                      + ("\n指令已同步" if result.synced else ""),
+                inline=False
+            )
+        if result.restart_required:
+            embed.add_field(name="⚠️ 需重新啟動", value=", ".join(result.restart_required), inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ReloadCommand(bot))
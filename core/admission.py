@@ -0,0 +1,216 @@
+"""
+Mention 流量控制 (admission control)
+職責:
+1. 限制每則訊息、每位使用者 (時間窗內)、每個伺服器 (進行中) 的 mention 數量，超出部分捨棄並計數
+2. 每個伺服器一條工作佇列，由固定數量的 worker 輪流處理，避免單一伺服器拖慢其他伺服器
+3. 每個伺服器佇列中的工作數 (含不建立 mention 的訊息與表情反應) 有硬上限，超出的工作捨棄並計數
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("MentionDodger.Admission")
+
+Job = Tuple[Callable[..., Awaitable[Any]], tuple, int]
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        open_count: Callable[[int], int],
+        max_mentions_per_message: int = 10,
+        max_mentions_per_user: int = 30,
+        user_window_seconds: float = 60.0,
+        max_open_per_guild: int = 500,
+        max_queued_per_guild: int = 200,
+        max_jobs_per_guild: int = 1000,
+        workers: int = 4
+    ):
+        """
+        Args:
+            open_count: 取得某伺服器進行中計時數的函式 (TimeoutScheduler.get_open_count)
+            max_jobs_per_guild: 每個伺服器佇列中的工作數上限
+        """
+        self.open_count = open_count
+        self.max_mentions_per_message = max_mentions_per_message
+        self.max_mentions_per_user = max_mentions_per_user
+        self.user_window = user_window_seconds
+        self.max_open_per_guild = max_open_per_guild
+        self.max_queued_per_guild = max_queued_per_guild
+        self.max_jobs_per_guild = max_jobs_per_guild
+        self.worker_count = workers
+
+        self.queues: Dict[int, Deque[Job]] = {}
+        # 已放行但尚未處理的 mention 數
+        self.queued: Dict[int, int] = {}
+        # (guild_id, user_id) -> 時間窗內放行的 mention 時間點
+        self._user_hits: Dict[Tuple[int, int], Deque[float]] = {}
+        self._last_prune = time.monotonic()
+        # 輪詢佇列: 有工作的伺服器依序排隊，處理完一件再排到最後
+        self._ready: Optional[asyncio.Queue] = None
+        self._active: Set[int] = set()
+        self._workers: List[asyncio.Task] = []
+        self.stats: Counter = Counter()
+
+    @classmethod
+    def from_config(cls, open_count: Callable[[int], int], config: dict) -> "AdmissionController":
+        admission = config.get("admission") or {}
+        return cls(
+            open_count,
+            max_mentions_per_message=admission.get("max_mentions_per_message", 10),
+            max_mentions_per_user=admission.get("max_mentions_per_user", 30),
+            user_window_seconds=admission.get("user_window_seconds", 60),
+            max_open_per_guild=admission.get("max_open_per_guild", 500),
+            max_queued_per_guild=admission.get("max_queued_per_guild", 200),
+            max_jobs_per_guild=admission.get("max_jobs_per_guild", 1000),
+            workers=admission.get("workers", 4)
+        )
+
+    # ==================== 放行判斷 ====================
+
+    def admit(self, guild_id: int, author_id: int, targets: Sequence) -> list:
+        """
+        依各項上限決定這則訊息中要追蹤的對象
+
+        Returns:
+            list: 放行的對象 (依原順序，超出上限的部分捨棄)
+        """
+        targets = list(targets)
+        if not targets:
+            return targets
+
+        targets = self._cap(targets, self.max_mentions_per_message, "shed_per_message")
+
+        now = time.monotonic()
+        if now - self._last_prune > self.user_window:
+            self._prune_user_hits(now)
+
+        hits = self._user_hits.get((guild_id, author_id))
+        if hits is None:
+            hits = self._user_hits[(guild_id, author_id)] = deque()
+        while hits and now - hits[0] > self.user_window:
+            hits.popleft()
+        targets = self._cap(targets, self.max_mentions_per_user - len(hits), "shed_user_rate")
+
+        open_now = self.open_count(guild_id) + self.queued.get(guild_id, 0)
+        targets = self._cap(targets, self.max_open_per_guild - open_now, "shed_guild_open")
+        targets = self._cap(targets, self.max_queued_per_guild - self.queued.get(guild_id, 0), "shed_queue_full")
+
+        hits.extend([now] * len(targets))
+        if not hits:
+            del self._user_hits[(guild_id, author_id)]
+
+        self.stats["admitted"] += len(targets)
+        return targets
+
+    def _prune_user_hits(self, now: float) -> None:
+        """
+        移除時間窗外已無紀錄的使用者，避免長時間運作後記憶體成長
+        """
+        stale = [key for key, hits in self._user_hits.items() if not hits or now - hits[-1] > self.user_window]
+        for key in stale:
+            del self._user_hits[key]
+        self._last_prune = now
+
+    def _cap(self, targets: list, limit: int, reason: str) -> list:
+        limit = max(limit, 0)
+        if len(targets) <= limit:
+            return targets
+        self.stats[reason] += len(targets) - limit
+        return targets[:limit]
+
+    # ==================== 工作佇列 ====================
+
+    def is_backlogged(self, guild_id: int) -> bool:
+        """伺服器佇列中的工作數已達上限 (新的工作會被捨棄)"""
+        return len(self.queues.get(guild_id, ())) >= self.max_jobs_per_guild
+
+    def submit(self, guild_id: int, handler: Callable[..., Awaitable[Any]], *args, mentions: int = 0) -> bool:
+        """
+        將工作排入該伺服器的佇列 (同一伺服器依序處理)
+
+        Args:
+            mentions: 此工作會建立的 mention 數 (計入伺服器的佇列上限)
+
+        Returns:
+            bool: 是否排入 (佇列已滿時捨棄)
+        """
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+
+        if self.is_backlogged(guild_id):
+            self.stats["shed_backlog"] += 1
+            if mentions:
+                self.stats["shed_backlog_mentions"] += mentions
+            return False
+
+        self.queues.setdefault(guild_id, deque()).append((handler, args, mentions))
+        if mentions:
+            self.queued[guild_id] = self.queued.get(guild_id, 0) + mentions
+
+        if guild_id not in self._active:
+            self._active.add(guild_id)
+            self._ready.put_nowait(guild_id)
+        return True
+
+    def start(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        for i in range(self.worker_count - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"admission_worker_{i}"))
+
+    async def _worker(self) -> None:
+        while True:
+            guild_id = await self._ready.get()
+            queue = self.queues[guild_id]
+            handler, args, mentions = queue.popleft()
+            try:
+                await handler(*args)
+            except Exception as e:
+                logger.error(f"處理伺服器 {guild_id} 的工作時發生錯誤: {e}", exc_info=True)
+            finally:
+                if mentions:
+                    remaining = self.queued.get(guild_id, 0) - mentions
+                    if remaining > 0:
+                        self.queued[guild_id] = remaining
+                    else:
+                        self.queued.pop(guild_id, None)
+
+                # 同一伺服器一次只處理一件，處理完再排到輪詢佇列最後
+                if queue:
+                    self._ready.put_nowait(guild_id)
+                else:
+                    self._active.discard(guild_id)
+                    del self.queues[guild_id]
+                self._ready.task_done()
+
+    async def drain(self, timeout: float = 10.0) -> bool:
+        """
+        等待佇列中的工作全部處理完
+
+        Returns:
+            bool: 是否在 timeout 內處理完
+        """
+        if self._ready is None:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"佇列未能在時限內清空 (剩餘 {sum(len(q) for q in self.queues.values())} 件)")
+            return False
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        logger.info(f"Admission 統計: {dict(self.stats)}")
+
+    def get_queue_depth(self, guild_id: Optional[int] = None) -> int:
+        """取得佇列中的工作數 (for monitoring)"""
+        if guild_id is not None:
+            return len(self.queues.get(guild_id, ()))
+        return sum(len(q) for q in self.queues.values())
@@ -0,0 +1,229 @@
+"""
+圖片排行榜 (/rank image)
+職責:
+1. 在 ProcessPoolExecutor 中繪製排行榜卡片，不佔用 event loop
+2. PNG 以 (伺服器, 期間, 排名版本, 人數) 快取，排名沒有變動時重複的 /rank 直接使用快取
+3. 頭像下載後存在磁碟，有效期間內不再向 Discord 下載
+
+Pillow 為選用套件 (pip install pillow)，未安裝時 available 為 False，/rank 改用文字排行榜
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from database.models import GhostStats
+from utils.name_cache import NameCache
+
+try:
+    from utils.leaderboard_card import CardRow, render_leaderboard
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+logger = logging.getLogger("MentionDodger.Cards")
+
+# 目前排行榜只有累計統計，期間固定為 all (快取鍵保留此欄位)
+PERIOD_ALL = "all"
+
+CardKey = Tuple[int, str, int, int]
+
+
+class AvatarCache:
+    def __init__(self, directory: str = "cache/avatars", max_age: float = 86400, size: int = 64):
+        """
+        Args:
+            directory: 頭像檔存放目錄 ({user_id}.png)
+            max_age: 頭像檔有效秒數 (過期才重新下載，下載失敗時仍使用舊檔)
+            size: 下載的頭像尺寸
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.size = size
+        self._downloading: Dict[int, asyncio.Task] = {}
+
+    def path_for(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"{user_id}.png")
+
+    async def get(self, client: discord.Client, user_id: int) -> Optional[str]:
+        """
+        返回頭像檔路徑 (無法取得時為 None)
+        """
+        path = self.path_for(user_id)
+        try:
+            if time.time() - os.path.getmtime(path) <= self.max_age:
+                return path
+        except OSError:
+            pass
+
+        # 同一人同時只下載一次
+        task = self._downloading.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._download(client, user_id, path))
+            self._downloading[user_id] = task
+            task.add_done_callback(lambda _: self._downloading.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def _download(self, client: discord.Client, user_id: int, path: str) -> Optional[str]:
+        try:
+            user = client.get_user(user_id) or await client.fetch_user(user_id)
+            data = await user.display_avatar.replace(size=self.size, format="png").read()
+        except discord.HTTPException as e:
+            logger.debug("無法下載頭像 %s: %s", user_id, e)
+            return path if os.path.exists(path) else None
+        await asyncio.to_thread(self._write, path, data)
+        return path
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class LeaderboardCards:
+    def __init__(
+        self,
+        avatars: AvatarCache,
+        workers: int = 1,
+        cache_size: int = 128,
+        font_path: Optional[str] = None
+    ):
+        """
+        Args:
+            workers: 繪圖子程序數
+            cache_size: 記憶體中保留的 PNG 數
+            font_path: 支援中文的字型檔 (None 時使用 Pillow 內建字型與英文標籤)
+        """
+        self.avatars = avatars
+        self.workers = workers
+        self.cache_size = cache_size
+        self.font_path = font_path
+        self._cache: "OrderedDict[CardKey, bytes]" = OrderedDict()
+        self._rendering: Dict[CardKey, asyncio.Task] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LeaderboardCards":
+        cards = config.get("cards") or {}
+        return cls(
+            AvatarCache(
+                directory=cards.get("avatar_dir", "cache/avatars"),
+                max_age=cards.get("avatar_max_age", 86400)
+            ),
+            workers=cards.get("workers", 1),
+            cache_size=cards.get("cache_size", 128),
+            font_path=cards.get("font_path")
+        )
+
+    @property
+    def available(self) -> bool:
+        return HAS_PILLOW
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # 第一次繪圖時才建立; 使用 spawn 避免 fork 時複製到其他執行緒持有的鎖 (資料庫、log)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    # ==================== 快取 ====================
+
+    async def get_card(
+        self,
+        client: discord.Client,
+        names: NameCache,
+        guild_id: int,
+        version: int,
+        stats: List[GhostStats],
+        guild_name: str,
+        period: str = PERIOD_ALL
+    ) -> bytes:
+        """
+        取得排行榜卡片 PNG (同一版本的排名只繪製一次)
+
+        Args:
+            version: StatsReadModel.get_versioned_leaderboard 的排名版本，排名改變時才遞增
+            stats: 要顯示的排名 (依名次排序)
+        """
+        key = (guild_id, period, version, len(stats))
+        png = self._cache.get(key)
+        if png is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return png
+
+        # 同一張卡片同時只繪製一次
+        task = self._rendering.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._render(key, client, names, stats, guild_name))
+            self._rendering[key] = task
+            task.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _render(
+        self,
+        key: CardKey,
+        client: discord.Client,
+        names: NameCache,
+        stats: List[GhostStats],
+        guild_name: str
+    ) -> bytes:
+        user_ids = [stat.user_id for stat in stats]
+        display_names, avatar_paths = await asyncio.gather(
+            asyncio.gather(*(names.resolve(client, user_id) for user_id in user_ids)),
+            asyncio.gather(*(self.avatars.get(client, user_id) for user_id in user_ids))
+        )
+        rows = [
+            CardRow(
+                rank=rank,
+                name=name,
+                ghost_count=stat.ghost_count,
+                mention_count=stat.mention_count,
+                avatar_path=avatar_path
+            )
+            for rank, (stat, name, avatar_path) in enumerate(zip(stats, display_names, avatar_paths), start=1)
+        ]
+
+        started = time.perf_counter()
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(
+                self._pool(), render_leaderboard, guild_name, rows, self.font_path
+            )
+        except BrokenProcessPool:
+            # 子程序異常終止後整個 pool 無法再使用，下次繪圖時重新建立
+            self.shutdown()
+            raise
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("已繪製排行榜卡片 %s (%.0f ms, %d bytes)", key, (time.perf_counter() - started) * 1000, len(png))
+
+        self._store(key, png)
+        return png
+
+    def _store(self, key: CardKey, png: bytes) -> None:
+        # 同伺服器、同期間的舊版本不會再被使用
+        guild_id, period, version, _ = key
+        for old in [k for k in self._cache if k[0] == guild_id and k[1] == period and k[2] < version]:
+            del self._cache[old]
+
+        self._cache[key] = png
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
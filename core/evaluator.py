@@ -1,34 +1,249 @@
 """
 回應判定器
 職責: 判斷一條訊息是否算「有效回應」
+
+判定規則由 config.yaml 的 ghost_rules 在啟動時編譯成 predicate chain:
+- 訊息層級的條件 (長度、emoji、是否為回覆) 每則訊息只計算一次
+- 紀錄層級的條件 (發送者、頻道範圍、回覆對象) 對每筆候選紀錄檢查
 """
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
 from discord import Message
 from database.models import MentionRecord
-from typing import Optional
+
+# 判定範圍
+SCOPE_CHANNEL = "channel"   # 必須在同一個頻道
+SCOPE_THREAD = "thread"     # 同頻道或其底下的討論串
+SCOPE_GUILD = "guild"       # 伺服器內任何地方
+VALID_SCOPES = (SCOPE_CHANNEL, SCOPE_THREAD, SCOPE_GUILD)
+
+_CUSTOM_EMOJI = re.compile(r"<a?:\w+:\d+>")
+# 組成 emoji 序列的輔助字元 (ZWJ、變體選擇符、keycap)
+_EMOJI_JOINERS = {"\u200d", "\ufe0e", "\ufe0f", "\u20e3"}
+
+
+class MessageFacts:
+    """
+    訊息層級的事實 (每則訊息只計算一次)
+    """
+    __slots__ = ("author_id", "guild_id", "channel_id", "parent_id", "content", "content_length", "reply_to", "_emoji_only")
+
+    def __init__(self, message: Message):
+        self.content = message.content.strip()
+        reference = message.reference
+        self.author_id: int = message.author.id
+        self.guild_id: Optional[int] = message.guild.id if message.guild else None
+        self.channel_id: int = message.channel.id
+        self.parent_id: Optional[int] = getattr(message.channel, "parent_id", None)
+        self.content_length = len(self.content)
+        self.reply_to: Optional[int] = reference.message_id if reference else None
+        self._emoji_only: Optional[bool] = None
+
+    @property
+    def emoji_only(self) -> bool:
+        # 只有規則真的需要時才掃描內容
+        if self._emoji_only is None:
+            self._emoji_only = _is_emoji_only(self.content)
+        return self._emoji_only
+
+
+def _is_emoji_only(content: str) -> bool:
+    """
+    判斷訊息內容是否只由 emoji 組成 (含自訂 emoji)
+    """
+    if not content:
+        return False
+
+    stripped = _CUSTOM_EMOJI.sub("", content)
+    for char in stripped:
+        if char.isspace() or char in _EMOJI_JOINERS:
+            continue
+        # So: 一般 emoji 與符號; 1F3FB-1F3FF: 膚色修飾
+        if unicodedata.category(char) == "So" or "\U0001F3FB" <= char <= "\U0001F3FF":
+            continue
+        return False
+    return True
+
+
+MessagePredicate = Callable[[MessageFacts], bool]
+RecordFilter = Callable[[MessageFacts, List[MentionRecord]], List[MentionRecord]]
+
+
+@dataclass
+class ResponseRules:
+    """
+    單一頻道適用的判定規則 (對應 config.yaml ghost_rules)
+    """
+    min_length: int = 1
+    scope: str = SCOPE_CHANNEL
+    require_reply: bool = False
+    allow_emoji_only: bool = True
+    allow_reaction: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict, base: Optional["ResponseRules"] = None) -> "ResponseRules":
+        """
+        從 config 字典建立規則，未指定的欄位沿用 base
+        """
+        base = base or cls()
+        rules = cls(
+            min_length=int(data.get("valid_response_min_length", base.min_length)),
+            scope=data.get("response_scope", base.scope),
+            require_reply=bool(data.get("require_reply", base.require_reply)),
+            allow_emoji_only=bool(data.get("allow_emoji_only", base.allow_emoji_only)),
+            allow_reaction=bool(data.get("allow_reaction", base.allow_reaction))
+        )
+        if rules.scope not in VALID_SCOPES:
+            raise ValueError(f"無效的 response_scope: {rules.scope} (可用: {', '.join(VALID_SCOPES)})")
+        return rules
+
+
+class CompiledRuleSet:
+    """
+    編譯後的規則: 訊息層級 predicate chain + 紀錄層級批次過濾
+    """
+    def __init__(self, rules: ResponseRules):
+        self.rules = rules
+        self.message_checks: List[MessagePredicate] = self._compile_message_checks(rules)
+        self.record_filter: RecordFilter = self._compile_record_filter(rules)
+
+    @staticmethod
+    def _compile_message_checks(rules: ResponseRules) -> List[MessagePredicate]:
+        checks: List[MessagePredicate] = []
+        min_length = rules.min_length
+
+        if rules.allow_emoji_only:
+            checks.append(lambda f: f.content_length >= min_length or f.emoji_only)
+        else:
+            checks.append(lambda f: not f.emoji_only and f.content_length >= min_length)
+
+        if rules.require_reply:
+            checks.append(lambda f: f.reply_to is not None)
+
+        return checks
+
+    @staticmethod
+    def _compile_record_filter(rules: ResponseRules) -> RecordFilter:
+        """
+        將紀錄層級的條件 (發送者、範圍、回覆對象) 合成單一批次過濾函式
+        """
+        if rules.scope == SCOPE_CHANNEL:
+            def in_scope(f: MessageFacts, records: List[MentionRecord]) -> List[MentionRecord]:
+                author, channel = f.author_id, f.channel_id
+                return [r for r in records if r.mentioned_user_id == author and r.channel_id == channel]
+        elif rules.scope == SCOPE_THREAD:
+            def in_scope(f: MessageFacts, records: List[MentionRecord]) -> List[MentionRecord]:
+                author, channel, parent = f.author_id, f.channel_id, f.parent_id
+                return [
+                    r for r in records
+                    if r.mentioned_user_id == author and (r.channel_id == channel or r.channel_id == parent)
+                ]
+        else:
+            def in_scope(f: MessageFacts, records: List[MentionRecord]) -> List[MentionRecord]:
+                author, guild = f.author_id, f.guild_id
+                return [r for r in records if r.mentioned_user_id == author and r.guild_id == guild]
+
+        if not rules.require_reply:
+            return in_scope
+
+        def replied(f: MessageFacts, records: List[MentionRecord]) -> List[MentionRecord]:
+            return [r for r in in_scope(f, records) if r.message_id == f.reply_to]
+        return replied
+
+    def accepts_message(self, facts: MessageFacts) -> bool:
+        for check in self.message_checks:
+            if not check(facts):
+                return False
+        return True
+
+    def select(self, facts: MessageFacts, records: List[MentionRecord]) -> List[MentionRecord]:
+        """
+        返回通過所有條件的紀錄
+        """
+        if not self.accepts_message(facts):
+            return []
+        return self.record_filter(facts, records)
+
 
 class ResponseEvaluator:
-    def __init__(self, min_length: int = 3):
-        self.min_length = min_length
-    
+    def __init__(self, min_length: int = 3, rules: Optional[dict] = None):
+        """
+        Args:
+            min_length: 最短有效回應長度 (rules 未指定時使用)
+            rules: config.yaml 的 ghost_rules 區塊
+        """
+        rules = rules or {}
+        self.default = CompiledRuleSet(
+            ResponseRules.from_dict(rules, ResponseRules(min_length=min_length))
+        )
+        self.min_length = self.default.rules.min_length
+
+        # 頻道覆寫規則，以 mention 所在頻道為準
+        self.overrides: Dict[int, CompiledRuleSet] = {
+            int(channel_id): CompiledRuleSet(ResponseRules.from_dict(data or {}, self.default.rules))
+            for channel_id, data in (rules.get("channel_overrides") or {}).items()
+        }
+
+        all_rules = [self.default.rules] + [r.rules for r in self.overrides.values()]
+        # 只要有任何規則允許跨頻道回應，候選紀錄就必須以整個伺服器查詢
+        self.needs_guild_candidates = any(r.scope != SCOPE_CHANNEL for r in all_rules)
+        self.allows_reaction = any(r.allow_reaction for r in all_rules)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ResponseEvaluator":
+        ghost_rules = config.get("ghost_rules") or {}
+        return cls(
+            min_length=ghost_rules.get("valid_response_min_length", 1),
+            rules=ghost_rules
+        )
+
+    def apply(self, other: "ResponseEvaluator") -> None:
+        """
+        熱重載: 改用另一個 evaluator 的規則 (同步替換，不會有判定看到一半新一半舊的規則)
+        """
+        self.default = other.default
+        self.overrides = other.overrides
+        self.min_length = other.min_length
+        self.needs_guild_candidates = other.needs_guild_candidates
+        self.allows_reaction = other.allows_reaction
+
+    def rules_for(self, channel_id: int) -> CompiledRuleSet:
+        return self.overrides.get(channel_id, self.default)
+
+    def evaluate(self, message: Message, candidates: List[MentionRecord]) -> List[MentionRecord]:
+        """
+        一次評估所有候選紀錄，返回被這則訊息有效回應的紀錄
+        """
+        if not candidates:
+            return []
+
+        facts = MessageFacts(message)
+        if not self.overrides:
+            return self.default.select(facts, candidates)
+
+        # 依 mention 所在頻道分組，每組規則的訊息層級條件只計算一次
+        groups: Dict[int, List[MentionRecord]] = {}
+        for record in candidates:
+            groups.setdefault(record.channel_id if record.channel_id in self.overrides else 0, []).append(record)
+
+        matched = []
+        for channel_id, records in groups.items():
+            matched.extend(self.rules_for(channel_id).select(facts, records))
+        return matched
+
     def is_valid_response(self, message: Message, original_mention: MentionRecord) -> bool:
         """
-        判定規則:
-        1. 在同個頻道
-        2. 發送者是被 mention 的人
-        3. 在 timeout 時間內
-        4. 訊息長度 >= min_length
+        判定單筆紀錄 (相容舊介面)
         """
-        # 檢查頻道
-        if message.channel.id != original_mention.channel_id:
-            return False
-        
-        # 檢查發送者
-        if message.author.id != original_mention.mentioned_user_id:
-            return False
-        
-        # 檢查內容長度
-        if len(message.content.strip()) < self.min_length:
+        return bool(self.evaluate(message, [original_mention]))
+
+    def is_valid_reaction(self, user_id: int, message_id: int, original_mention: MentionRecord) -> bool:
+        """
+        判定對 mention 訊息按表情反應是否算有效回應
+        """
+        if not self.rules_for(original_mention.channel_id).rules.allow_reaction:
             return False
-        
-        
-        return True
\ No newline at end of file
+        return user_id == original_mention.mentioned_user_id and message_id == original_mention.message_id
@@ -0,0 +1,60 @@
+"""
+Gateway 連線設定 (intents 與快取)
+
+config.yaml gateway.profile:
+- default: discord.py 預設快取 + members / message_content intent (原本的行為)
+- lean: 只保留追蹤需要的事件與最少的快取
+    - 不快取訊息 (max_messages=None)，判定只用事件本身的 id、mentions、content
+    - 不快取成員、不在啟動時 chunk 伺服器 (members intent 關閉)
+    - 顯示名稱改由 bot.names (NameCache) 提供，查不到才呼叫 API
+    - 只在開啟 events.on_voice_state 時訂閱語音狀態
+"""
+from typing import Any, Dict
+
+import discord
+
+PROFILE_DEFAULT = "default"
+PROFILE_LEAN = "lean"
+
+
+def _needs_reactions(config: dict) -> bool:
+    ghost_rules = config.get("ghost_rules") or {}
+    if ghost_rules.get("allow_reaction", False):
+        return True
+    return any((data or {}).get("allow_reaction", False) for data in (ghost_rules.get("channel_overrides") or {}).values())
+
+
+def _needs_voice_states(config: dict) -> bool:
+    return bool(((config.get("events") or {}).get("on_voice_state") or {}).get("enable", False))
+
+
+def build_gateway_options(config: dict) -> Dict[str, Any]:
+    """
+    依設定產生傳給 commands.Bot 的 intents 與快取參數
+    """
+    gateway = config.get("gateway") or {}
+    profile = gateway.get("profile", PROFILE_DEFAULT)
+
+    if profile == PROFILE_DEFAULT:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        return {"intents": intents}
+
+    if profile != PROFILE_LEAN:
+        raise ValueError(f"無效的 gateway.profile: {profile} (可用: {PROFILE_DEFAULT}, {PROFILE_LEAN})")
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.message_content = True
+    intents.guild_reactions = _needs_reactions(config)
+    intents.voice_states = _needs_voice_states(config)
+
+    max_messages = gateway.get("max_messages", 0)
+    return {
+        "intents": intents,
+        "max_messages": max_messages if max_messages > 0 else None,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False
+    }
@@ -0,0 +1,56 @@
+"""
+關閉流程管理
+職責:
+1. 關閉時停止接受新事件
+2. 等待處理中的事件 (含資料庫寫入) 完成
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("MentionDodger.Lifecycle")
+
+
+class ShutdownGate:
+    def __init__(self):
+        self.accepting = True
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @asynccontextmanager
+    async def track(self):
+        """
+        標記一段處理中的工作，關閉時會等待它完成
+        """
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.set()
+
+    def stop_accepting(self) -> None:
+        self.accepting = False
+
+    async def drain(self, timeout: float = 10.0) -> bool:
+        """
+        等待所有處理中的工作完成
+
+        Returns:
+            bool: 是否在 timeout 內全部完成
+        """
+        if self._inflight:
+            logger.info(f"等待 {self._inflight} 個處理中的事件完成...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"等待逾時，仍有 {self._inflight} 個事件未完成")
+            return False
@@ -0,0 +1,73 @@
+"""
+參加者名單
+職責: 維護自願加入排行榜的使用者 (/join, /quit)
+資料庫為準，記憶體中保留每個伺服器的 set 供追蹤時快速過濾
+"""
+import logging
+from typing import Dict, Iterable, List, Set
+
+from database.repository import GhostRepository
+
+logger = logging.getLogger("MentionDodger.Participants")
+
+
+class ParticipantRegistry:
+    def __init__(self, repository: GhostRepository, enabled: bool = True):
+        """
+        Args:
+            enabled: 對應 ghost_rules.need_permission2play；關閉時所有人都視為參加者
+        """
+        self.repo = repository
+        self.enabled = enabled
+        self.members: Dict[int, Set[int]] = {}
+
+    async def load(self) -> int:
+        """
+        從資料庫載入全部參加者
+        """
+        members: Dict[int, Set[int]] = {}
+        rows = await self.repo.get_all_participants()
+        for guild_id, user_id in rows:
+            members.setdefault(guild_id, set()).add(user_id)
+        self.members = members
+        logger.info("已載入參加者名單 (%d 個伺服器, %d 人)", len(members), len(rows))
+        return len(rows)
+
+    async def join(self, guild_id: int, user_id: int) -> bool:
+        """
+        加入名單，返回是否為新加入
+        """
+        added = await self.repo.add_participant(user_id, guild_id)
+        self.members.setdefault(guild_id, set()).add(user_id)
+        return added
+
+    async def quit(self, guild_id: int, user_id: int) -> bool:
+        """
+        退出名單，返回是否確實移除
+        """
+        removed = await self.repo.remove_participant(user_id, guild_id)
+        guild_members = self.members.get(guild_id)
+        if guild_members is not None:
+            guild_members.discard(user_id)
+            if not guild_members:
+                del self.members[guild_id]
+        return removed
+
+    def is_participant(self, guild_id: int, user_id: int) -> bool:
+        if not self.enabled:
+            return True
+        return user_id in self.members.get(guild_id, ())
+
+    def filter(self, guild_id: int, users: Iterable) -> List:
+        """
+        只保留參加者 (users 需有 id 屬性)
+        """
+        if not self.enabled:
+            return list(users)
+        guild_members = self.members.get(guild_id)
+        if not guild_members:
+            return []
+        return [user for user in users if user.id in guild_members]
+
+    def get_count(self, guild_id: int) -> int:
+        return len(self.members.get(guild_id, ()))
@@ -0,0 +1,182 @@
+"""
+效能診斷
+職責:
+1. 每個處理器的執行時間統計 (常駐，成本為兩次 perf_counter)
+2. 依需求開啟 cProfile N 秒，報告寫入檔案
+3. asyncio debug 模式的慢 callback 警告 (可設定門檻)
+
+開啟方式: /profile 指令，或啟動時設定環境變數 MENTIONDODGER_PROFILE=<秒數>
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from discord import Interaction, app_commands
+
+logger = logging.getLogger("MentionDodger.Profiling")
+
+
+@dataclass
+class HandlerStats:
+    """
+    單一處理器的累計執行時間 (秒)
+    """
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Profiler:
+    def __init__(self, output_dir: str = "logs/profiles", slow_callback_ms: float = 100, top: int = 40):
+        """
+        Args:
+            output_dir: cProfile 報告輸出目錄
+            slow_callback_ms: asyncio debug 模式下超過此時間的 callback 會記錄警告
+            top: 文字報告列出的函式數
+        """
+        self.output_dir = output_dir
+        self.slow_callback_ms = slow_callback_ms
+        self.top = top
+        self.handlers: Dict[str, HandlerStats] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._session: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Profiler":
+        profiling = config.get("profiling") or {}
+        return cls(
+            output_dir=profiling.get("output_dir", "logs/profiles"),
+            slow_callback_ms=profiling.get("slow_callback_ms", 100)
+        )
+
+    # ==================== 處理器計時 ====================
+
+    @asynccontextmanager
+    async def track(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self.handlers.get(name)
+            if stats is None:
+                stats = self.handlers[name] = HandlerStats()
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+
+    def handler_report(self) -> List[tuple]:
+        """
+        依總時間排序的 (名稱, 統計)
+        """
+        return sorted(self.handlers.items(), key=lambda item: item[1].total, reverse=True)
+
+    def reset_handlers(self) -> None:
+        self.handlers.clear()
+
+    # ==================== asyncio debug ====================
+
+    def set_loop_debug(self, enabled: bool, slow_callback_ms: Optional[float] = None) -> None:
+        """
+        開關 asyncio debug 模式 (慢 callback 由 asyncio logger 以 WARNING 記錄)
+        debug 模式本身有額外開銷，只在診斷時開啟
+        """
+        if slow_callback_ms is not None:
+            self.slow_callback_ms = slow_callback_ms
+        loop = asyncio.get_running_loop()
+        loop.slow_callback_duration = self.slow_callback_ms / 1000
+        loop.set_debug(enabled)
+        logger.info("asyncio debug 模式: %s (慢 callback 門檻 %sms)", "開啟" if enabled else "關閉", self.slow_callback_ms)
+
+    # ==================== cProfile ====================
+
+    @property
+    def is_profiling(self) -> bool:
+        return self._session is not None and not self._session.done()
+
+    def start(self, seconds: float, loop_debug: bool = False) -> str:
+        """
+        開始 seconds 秒的 cProfile (event loop 執行緒上的所有事件與指令)
+
+        Returns:
+            報告檔路徑 (不含副檔名，結束後產生 .prof 與 .txt)
+        """
+        if self.is_profiling:
+            raise RuntimeError("已有進行中的 profiling")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base_path = os.path.join(self.output_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        self._session = asyncio.create_task(self._run(seconds, base_path, loop_debug), name="profiling")
+        return base_path
+
+    async def _run(self, seconds: float, base_path: str, loop_debug: bool) -> None:
+        # 已常駐開啟 debug 模式時不在結束後關閉
+        loop_debug = loop_debug and not asyncio.get_running_loop().get_debug()
+        if loop_debug:
+            self.set_loop_debug(True)
+        self._profile = cProfile.Profile()
+        logger.info("開始 profiling %s 秒", seconds)
+        self._profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._profile.disable()
+            if loop_debug:
+                self.set_loop_debug(False)
+            # 寫檔放到執行緒，避免報告很大時阻塞 event loop
+            await asyncio.to_thread(self._write_report, self._profile, base_path)
+            self._profile = None
+
+    def _write_report(self, profile: cProfile.Profile, base_path: str) -> None:
+        profile.dump_stats(f"{base_path}.prof")
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profile, stream=buffer)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+
+        buffer.write("\n處理器執行時間 (次數 / 總計 / 平均 / 最大, 秒)\n")
+        for name, handler in self.handler_report():
+            buffer.write(f"{name:<32} {handler.count:>8} {handler.total:>10.3f} {handler.mean:>8.4f} {handler.max:>8.4f}\n")
+
+        with open(f"{base_path}.txt", "w", encoding="utf-8") as f:
+            f.write(buffer.getvalue())
+        logger.info("Profiling 報告已寫入 %s.prof / .txt", base_path)
+
+    async def stop(self) -> None:
+        """
+        結束進行中的 profiling (仍會寫出報告)
+        """
+        if self.is_profiling:
+            self._session.cancel()
+            try:
+                await self._session
+            except asyncio.CancelledError:
+                pass
+
+
+class ProfiledCommandTree(app_commands.CommandTree):
+    """
+    依 slash command 名稱累計執行時間 (bot.profiler)
+    覆寫 CommandTree._call: 所有 slash command 都經過這裡分派
+    """
+    async def _call(self, interaction: Interaction) -> None:
+        profiler: Optional[Profiler] = getattr(self.client, "profiler", None)
+        if profiler is None:
+            return await super()._call(interaction)
+
+        async with profiler.track(f"/{(interaction.data or {}).get('name', '?')}"):
+            await super()._call(interaction)
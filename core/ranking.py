@@ -0,0 +1,172 @@
+"""
+排名索引
+職責: 在記憶體中維護每個伺服器的詐欺次數分布，以 O(log n) 查詢名次與百分位
+
+每個伺服器一棵 Fenwick tree (以 ghost_count 為索引，值為該次數的人數):
+- 名次 = 1 + 詐欺次數嚴格大於自己的人數 (同次數同名次)
+- 只計入 mention_count > 0 的使用者 (與排行榜相同)
+尚未載入的伺服器先以 SQL 計算，並在背景載入索引
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database.repository import GhostRepository
+
+logger = logging.getLogger("MentionDodger.Ranking")
+
+
+class FenwickTree:
+    """
+    計數用的 Fenwick tree，索引超出範圍時自動擴充
+    """
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def _grow(self, index: int) -> None:
+        size = self.size
+        while size <= index:
+            size *= 2
+        counts = [self.count(i) for i in range(self.size)]
+        self.size = size
+        self.tree = [0] * (size + 1)
+        for i, count in enumerate(counts):
+            if count:
+                self.add(i, count)
+
+    def add(self, index: int, delta: int) -> None:
+        if index >= self.size:
+            self._grow(index)
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        """索引 0..index (含) 的總和"""
+        i = min(index, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def count(self, index: int) -> int:
+        return self.prefix(index) - (self.prefix(index - 1) if index > 0 else 0)
+
+
+class GuildRanking:
+    """
+    單一伺服器的詐欺次數分布
+    """
+    def __init__(self, ghost_counts: Iterable[Tuple[int, int]] = ()):
+        self.ghost_counts: Dict[int, int] = {}
+        self.tree = FenwickTree()
+        for user_id, ghost_count in ghost_counts:
+            self.set(user_id, ghost_count)
+
+    def __len__(self) -> int:
+        return len(self.ghost_counts)
+
+    def set(self, user_id: int, ghost_count: int) -> None:
+        old = self.ghost_counts.get(user_id)
+        if old == ghost_count:
+            return
+        if old is not None:
+            self.tree.add(old, -1)
+        self.tree.add(ghost_count, 1)
+        self.ghost_counts[user_id] = ghost_count
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, int]]:
+        ghost_count = self.ghost_counts.get(user_id)
+        if ghost_count is None:
+            return None
+        total = len(self.ghost_counts)
+        return total - self.tree.prefix(ghost_count) + 1, total
+
+
+class RankIndex:
+    def __init__(self, repository: GhostRepository):
+        self.repo = repository
+        self.guilds: Dict[int, GuildRanking] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        # 載入期間的變動: (user_id, 詐欺次數)，None 表示開始計入 (載入完成後依序套用)
+        self._buffered: Dict[int, List[Tuple[int, Optional[int]]]] = {}
+
+    # ==================== 查詢 ====================
+
+    async def get_rank(self, user_id: int, guild_id: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns:
+            (名次, 上榜人數)，未上榜則為 None
+        """
+        ranking = self.guilds.get(guild_id)
+        if ranking is not None:
+            return ranking.rank(user_id)
+
+        self.warm(guild_id)
+        return await self.repo.get_user_rank(user_id, guild_id)
+
+    @staticmethod
+    def percentile(rank: int, total: int) -> float:
+        """名次換算為「前 x%」"""
+        return rank / total * 100 if total else 100.0
+
+    # ==================== 載入 ====================
+
+    def warm(self, guild_id: int) -> None:
+        """
+        在背景載入伺服器的索引 (已載入或載入中則忽略)
+        """
+        if guild_id in self.guilds or guild_id in self._loading:
+            return
+        self._buffered[guild_id] = []
+        task = asyncio.create_task(self._load(guild_id), name=f"rank_load_{guild_id}")
+        self._loading[guild_id] = task
+        task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+    async def _load(self, guild_id: int) -> None:
+        try:
+            stats = await self.repo.get_guild_stats(guild_id)
+        except Exception as e:
+            self._buffered.pop(guild_id, None)
+            logger.error("載入排名索引失敗 (guild=%s): %s", guild_id, e, extra={"guild_id": guild_id})
+            return
+
+        ranking = GuildRanking((stat.user_id, stat.ghost_count) for stat in stats)
+        # 查詢期間寫入的變動可能不在查詢結果中，依序重新套用 (詐欺次數為絕對值，重複套用不會多算)
+        for user_id, ghost_count in self._buffered.pop(guild_id, ()):
+            self._apply(ranking, user_id, ghost_count)
+        self.guilds[guild_id] = ranking
+        logger.debug("已載入排名索引 (guild=%s, %d 人)", guild_id, len(ranking), extra={"guild_id": guild_id})
+
+    # ==================== 更新 (寫入資料庫後呼叫) ====================
+
+    @staticmethod
+    def _apply(ranking: GuildRanking, user_id: int, ghost_count: Optional[int]) -> None:
+        if ghost_count is not None:
+            ranking.set(user_id, ghost_count)
+        elif user_id not in ranking.ghost_counts:
+            ranking.set(user_id, 0)
+
+    def _update(self, guild_id: int, user_id: int, ghost_count: Optional[int]) -> None:
+        ranking = self.guilds.get(guild_id)
+        if ranking is not None:
+            self._apply(ranking, user_id, ghost_count)
+        elif guild_id in self._buffered:
+            self._buffered[guild_id].append((user_id, ghost_count))
+
+    def record_mentions(self, guild_id: int, user_ids: List[int]) -> None:
+        """
+        被提及的使用者開始計入排名 (詐欺次數 0 起算)
+        """
+        for user_id in user_ids:
+            self._update(guild_id, user_id, None)
+
+    def record_ghost(self, guild_id: int, user_id: int, ghost_count: int) -> None:
+        """
+        Args:
+            ghost_count: 資料庫更新後的詐欺次數 (絕對值，重複套用也不會多算)
+        """
+        self._update(guild_id, user_id, ghost_count)
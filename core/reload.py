@@ -0,0 +1,284 @@
+"""
+設定熱重載 (config.yaml / permissions.json)
+職責:
+1. 讀取並驗證新設定，全部成功才替換 (任何錯誤都保留舊設定)
+2. 將新值同步到已建立的元件 (tracker / evaluator / scheduler 等)，不重啟、不遺失記憶體中的計時
+3. 依 commands / events 的 enable 增量載入或卸載模組，指令樹有變動才同步
+4. 背景輪詢兩個檔案的修改時間，內容變動時自動重載
+
+觸發方式: /reload 指令，或 config.yaml reload.watch 開啟時自動偵測
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import yaml
+
+from core.admission import AdmissionController
+from core.evaluator import ResponseEvaluator
+from core.gateway import build_gateway_options
+from core.voice import VoiceResponder
+from utils.permissions import PermissionTable, read_permissions
+
+logger = logging.getLogger("MentionDodger.Reload")
+
+CONFIG_PATH = "config/config.yaml"
+PERMISSIONS_PATH = "config/permissions.json"
+
+# 這些區塊在啟動時就已套用 (連線、intents、檔案路徑)，變動需重新啟動
+RESTART_REQUIRED = ("token", "database", "gateway", "logging", "scheduler", "command_sync", "cards", "startup")
+
+
+def read_config(path: str = CONFIG_PATH) -> dict:
+    """
+    讀取並驗證 config.yaml (格式錯誤時拋出 ValueError)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            config = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"無法解析 YAML: {e}") from e
+    validate_config(config)
+    return config
+
+
+def validate_config(config: dict) -> None:
+    if not isinstance(config, dict):
+        raise ValueError("最上層必須是對應表")
+
+    ghost_rules = config.get("ghost_rules")
+    if not isinstance(ghost_rules, dict):
+        raise ValueError("缺少 ghost_rules")
+    timeout = ghost_rules.get("response_timeout")
+    if not isinstance(timeout, int) or isinstance(timeout, bool) or timeout <= 0:
+        raise ValueError(f"ghost_rules.response_timeout 必須是正整數 (目前: {timeout!r})")
+
+    for section in ("commands", "events"):
+        entries = config.get(section)
+        if not isinstance(entries, dict):
+            raise ValueError(f"缺少 {section}")
+        for name, entry in entries.items():
+            if not isinstance(entry, dict) or not isinstance(entry.get("enable"), bool):
+                raise ValueError(f"{section}.{name}.enable 必須是 true / false")
+
+    # 判定規則 (範圍、頻道覆寫) 由 evaluator 驗證
+    ResponseEvaluator.from_config(config)
+
+
+def _file_digest(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class ReloadResult:
+    changed: List[str] = field(default_factory=list)            # 有變動的 config 區塊
+    permissions_changed: bool = False
+    restart_required: List[str] = field(default_factory=list)   # 有變動但需重新啟動才生效的區塊
+    redeadlined: int = 0
+    loaded: List[str] = field(default_factory=list)
+    unloaded: List[str] = field(default_factory=list)
+    synced: bool = False
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.changed and not self.permissions_changed
+
+
+class ConfigReloader:
+    def __init__(
+        self,
+        bot,
+        config_path: str = CONFIG_PATH,
+        permissions_path: str = PERMISSIONS_PATH,
+        watch: bool = True,
+        poll_seconds: float = 2.0,
+        redeadline: bool = False
+    ):
+        """
+        Args:
+            bot: GhostBot (元件需已建立)
+            watch: 是否在背景偵測檔案變動
+            poll_seconds: 檢查修改時間的間隔
+            redeadline: 自動重載時，進行中的計時是否依新的 response_timeout 重新計算
+        """
+        self.bot = bot
+        self.config_path = config_path
+        self.permissions_path = permissions_path
+        self.watch = watch
+        self.poll_seconds = poll_seconds
+        self.redeadline = redeadline
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # 目前套用中的檔案內容雜湊 (只修改時間變動、內容不變時不重載)
+        self._digests: Tuple[Optional[str], Optional[str]] = (
+            _file_digest(config_path), _file_digest(permissions_path)
+        )
+        self._stamps = self._stat()
+
+    @classmethod
+    def from_config(cls, bot) -> "ConfigReloader":
+        reload = bot.config.get("reload") or {}
+        return cls(
+            bot,
+            watch=reload.get("watch", True),
+            poll_seconds=reload.get("poll_seconds", 2.0),
+            redeadline=reload.get("redeadline", False)
+        )
+
+    # ==================== 重載 ====================
+
+    async def reload(self, redeadline: Optional[bool] = None) -> ReloadResult:
+        """
+        讀取兩個檔案並套用 (驗證失敗時拋出 ValueError，舊設定不變)
+
+        Args:
+            redeadline: 進行中的計時是否依新的 response_timeout 重新計算 (None 使用設定值)
+        """
+        if redeadline is None:
+            redeadline = self.redeadline
+
+        async with self._lock:
+            # 讀檔與驗證放到執行緒; 任何一個失敗都不套用
+            config, permissions, digests = await asyncio.to_thread(self._read)
+            evaluator = ResponseEvaluator.from_config(config)
+            return await self._apply(config, permissions, evaluator, digests, redeadline)
+
+    def _read(self) -> Tuple[dict, PermissionTable, Tuple[Optional[str], Optional[str]]]:
+        digests = (_file_digest(self.config_path), _file_digest(self.permissions_path))
+        config = read_config(self.config_path)
+        permissions = read_permissions(self.permissions_path)
+        return config, permissions, digests
+
+    async def _apply(
+        self,
+        config: dict,
+        permissions: PermissionTable,
+        evaluator: ResponseEvaluator,
+        digests: Tuple[Optional[str], Optional[str]],
+        redeadline: bool
+    ) -> ReloadResult:
+        bot = self.bot
+        old = bot.config
+        result = ReloadResult(
+            changed=[key for key in sorted(set(old) | set(config)) if old.get(key) != config.get(key)],
+            permissions_changed=digests[1] != self._digests[1]
+        )
+        result.restart_required = [key for key in result.changed if key in RESTART_REQUIRED]
+        # lean 模式的 intents 由 events / ghost_rules 推導 (語音狀態、表情反應)，連線後無法變更:
+        # 模組仍會載入，但重新連線前收不到事件
+        intents = build_gateway_options(config)["intents"]
+        if intents != bot.intents and "gateway" not in result.restart_required:
+            result.restart_required.append("gateway.intents")
+        old_workers = (old.get("admission") or {}).get("workers", 4)
+        if (config.get("admission") or {}).get("workers", 4) != old_workers:
+            result.restart_required.append("admission.workers")
+
+        # 1. 同步替換 (中間沒有 await，事件處理不會看到一半新一半舊的設定)
+        # 需重新啟動的區塊保留啟動時的值: 執行中仍會讀取 bot.config 的部分 (快照路徑、還原批次、指令雜湊檔)
+        # 不會換成尚未生效的設定，之後的重載也會繼續回報這些區塊需重新啟動
+        installed = dict(config)
+        for key in RESTART_REQUIRED:
+            if key in old:
+                installed[key] = old[key]
+            else:
+                installed.pop(key, None)
+        bot.config = installed
+        bot.permissions = permissions
+        ghost_rules = config["ghost_rules"]
+        timeout = ghost_rules["response_timeout"]
+        bot.tracker.timeout = timeout
+        bot.evaluator.apply(evaluator)
+        bot.participants.enabled = ghost_rules.get("need_permission2play", False)
+        bot.read_model.max_staleness = (config.get("read_model") or {}).get("max_staleness", 30)
+
+        admission = AdmissionController.from_config(bot.admission.open_count, config)
+        bot.admission.max_mentions_per_message = admission.max_mentions_per_message
+        bot.admission.max_mentions_per_user = admission.max_mentions_per_user
+        bot.admission.user_window = admission.user_window
+        bot.admission.max_open_per_guild = admission.max_open_per_guild
+        bot.admission.max_queued_per_guild = admission.max_queued_per_guild
+        bot.admission.max_jobs_per_guild = admission.max_jobs_per_guild
+
+        voice = VoiceResponder.from_config(bot.repository, bot.scheduler, config)
+        bot.voice.enabled = voice.enabled
+        bot.voice.guild_overrides = voice.guild_overrides
+        bot.voice.coalesce_seconds = voice.coalesce_seconds
+        bot.voice.ignore_afk_channel = voice.ignore_afk_channel
+
+        reload = config.get("reload") or {}
+        self.poll_seconds = reload.get("poll_seconds", self.poll_seconds)
+        self.redeadline = reload.get("redeadline", self.redeadline)
+        self._digests = digests
+
+        # 2. 計時: 新的 timeout，視 redeadline 重新計算進行中的計時
+        result.redeadlined = await bot.scheduler.set_timeout(timeout, redeadline=redeadline)
+
+        # 3. 模組: 只處理 enable 有變動的部分
+        if "commands" in result.changed or "events" in result.changed:
+            result.loaded, result.unloaded = await bot.reconcile_extensions()
+            if result.loaded or result.unloaded:
+                result.synced = await bot.sync_commands()
+
+        if result.is_noop:
+            logger.info("重載完成: 設定未變動")
+        else:
+            logger.info(
+                "重載完成: 變動區塊 %s%s, 載入 %s, 卸載 %s, 重新計算 %d 個計時",
+                result.changed or "-", " (含權限)" if result.permissions_changed else "",
+                result.loaded or "-", result.unloaded or "-", result.redeadlined
+            )
+        if result.restart_required:
+            logger.warning("以下設定需重新啟動才會生效: %s", ", ".join(result.restart_required))
+        return result
+
+    # ==================== 檔案監看 ====================
+
+    def _stat(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        stamps = []
+        for path in (self.config_path, self.permissions_path):
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def start(self) -> None:
+        if self.watch and self._task is None:
+            self._task = asyncio.create_task(self._watch(), name="config_watcher")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self) -> None:
+        """
+        輪詢修改時間 (不需額外套件)，內容雜湊與目前套用的不同才重載
+        編輯器分段寫入時可能讀到不完整的檔案: 驗證失敗只記錄錯誤，下次變動再重試
+        """
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            stamps = self._stat()
+            if stamps == self._stamps:
+                continue
+            self._stamps = stamps
+
+            digests = await asyncio.to_thread(
+                lambda: (_file_digest(self.config_path), _file_digest(self.permissions_path))
+            )
+            if digests == self._digests:
+                continue
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("自動重載失敗，保留目前的設定: %s", e)
@@ -1,30 +1,78 @@
 """
 Timeout 排程器
 職責: 在 mention 發生後啟動計時器,若超時則標記為詐欺
+
+視窗模式 (horizon > 0):
+只有 horizon 秒內會到期的 mention 在記憶體中有計時，更晚到期的留在資料庫，
+由背景 loader 每 horizon/2 秒依 mention_time 索引載入下一段。
+遠期 mention 被回應時只需更新資料庫 (mark_as_responded)，loader 不會再載入它。
+記憶體用量 ≈ mention 速率 × horizon，與 response_timeout 長短無關。
 """
 import asyncio
+import json
 import logging
-from typing import Dict
-from datetime import datetime
+import os
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 from database.repository import GhostRepository
 from database.models import MentionRecord
+from core.ranking import RankIndex
 
 logger = logging.getLogger("MentionDodger.Scheduler")
 
 
+def _ids(record: MentionRecord) -> dict:
+    """結構化 log 欄位"""
+    return {"record_id": record.id, "guild_id": record.guild_id, "user_id": record.mentioned_user_id}
+
+
 class TimeoutScheduler:
-    def __init__(self, repository: GhostRepository, timeout_seconds: int):
+    def __init__(
+        self,
+        repository: GhostRepository,
+        timeout_seconds: int,
+        ranking: Optional[RankIndex] = None,
+        horizon_seconds: int = 0
+    ):
+        """
+        Args:
+            horizon_seconds: 記憶體中只保留多少秒內到期的計時 (0 = 全部保留)
+        """
         self.repo = repository
         self.timeout = timeout_seconds
+        self.ranking = ranking
+        self.horizon = horizon_seconds
+        # 視窗模式: 到期時間 <= _loaded_until 的 mention 都已在記憶體中
+        self._loaded_until: Optional[datetime] = None
+        # 視窗模式: 各伺服器尚未載入 (遠期) 的 mention 數，loader 定期以資料庫校正
+        self.far_open: Dict[int, int] = {}
+        self._loader_task: Optional[asyncio.Task] = None
+        # 背景 loader 與熱重載 / 快照恢復可能同時載入視窗，一次只允許一個
+        self._horizon_lock = asyncio.Lock()
         self.pending_tasks: Dict[int, asyncio.Task] = {}
-        logger.info(f"TimeoutScheduler 已初始化 (timeout: {timeout_seconds}s)")
+        # record_id -> (record, 到期時間)，寫入快照用
+        self.deadlines: Dict[int, Tuple[MentionRecord, datetime]] = {}
+        # guild_id -> 進行中的計時數 (admission control 用)
+        self.guild_open: Dict[int, int] = {}
+        # (guild_id, user_id) -> 進行中計時的 record_id (語音回應判定用，不查資料庫)
+        self.user_open: Dict[Tuple[int, int], Set[int]] = {}
+        # 已過等待時間、正在寫入資料庫的任務 (關閉時需等它完成)
+        self._firing: Set[int] = set()
+        logger.info("TimeoutScheduler 已初始化 (timeout: %ss)", timeout_seconds)
     
-    def schedule_timeout(self, record: MentionRecord) -> None:
+    def schedule_timeout(
+        self,
+        record: MentionRecord,
+        delay: Optional[float] = None,
+        deadline: Optional[datetime] = None
+    ) -> None:
         """
         為一筆 mention 設定 timeout 任務
         
         Args:
             record: MentionRecord 物件 (必須有 id)
+            delay: 自訂等待秒數 (預設為 self.timeout，恢復排程時使用剩餘時間)
+            deadline: 絕對到期時間 (loader 載入的紀錄使用，已確定在視窗內，不再判斷是否為遠期)
         """
         if record.id is None:
             logger.error("無法排程 timeout: record.id 為 None")
@@ -32,12 +80,23 @@ class TimeoutScheduler:
         
         # 如果該 record 已有任務在執行，先取消舊的
         if record.id in self.pending_tasks:
-            logger.warning(f"Record {record.id} 已有 timeout 任務，將取消舊任務")
+            logger.warning("Record %s 已有 timeout 任務，將取消舊任務", record.id, extra=_ids(record))
             self.cancel_timeout(record.id)
         
+        if deadline is not None:
+            delay = max((deadline - datetime.now()).total_seconds(), 0.0)
+        else:
+            delay = self.timeout if delay is None else delay
+            deadline = datetime.now() + timedelta(seconds=delay)
+            
+            if self._loaded_until is not None and deadline > self._loaded_until:
+                # 視窗外: 留在資料庫，到期前由 loader 載入
+                self.far_open[record.guild_id] = self.far_open.get(record.guild_id, 0) + 1
+                return
+        
         # 建立新任務
         task = asyncio.create_task(
-            self._timeout_handler(record),
+            self._timeout_handler(record, delay),
             name=f"timeout_{record.id}"  # 便於 debug
         )
         
@@ -45,9 +104,11 @@ class TimeoutScheduler:
         task.add_done_callback(lambda t: self._cleanup_task(record.id, t))
         
         self.pending_tasks[record.id] = task
-        logger.debug(f"已排程 timeout 任務: record_id={record.id}, timeout={self.timeout}s")
+        self._register(record, deadline)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("已排程 timeout 任務: record_id=%s, timeout=%ss", record.id, delay, extra=_ids(record))
     
-    async def _timeout_handler(self, record: MentionRecord) -> None:
+    async def _timeout_handler(self, record: MentionRecord, delay: float) -> None:
         """
         等待 timeout 時間後執行詐欺判定
         
@@ -57,38 +118,41 @@ class TimeoutScheduler:
         3. 若仍未回應，標記為詐欺
         """
         try:
-            logger.debug(f"Timeout 計時開始: record_id={record.id}")
-            await asyncio.sleep(self.timeout)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Timeout 計時開始: record_id=%s", record.id, extra=_ids(record))
+            await asyncio.sleep(delay)
+            self._firing.add(record.id)
             
             # 從資料庫讀取最新狀態 (避免使用過期的記憶體資料)
             updated_record = await self.repo.get_mention_by_id(record.id)
             
             if updated_record is None:
-                logger.warning(f"Record {record.id} 已不存在於資料庫")
+                logger.warning("Record %s 已不存在於資料庫", record.id, extra=_ids(record))
                 return
             
             # 判定是否已回應
             if not updated_record.responded:
-                logger.info(f"使用者 {record.mentioned_user_id} 超時未回應，標記為詐欺")
+                logger.info("使用者 %s 超時未回應，標記為詐欺", record.mentioned_user_id, extra=_ids(record))
                 
-                # 原子性更新 (先標記 ghost，再更新統計)
-                await self.repo.mark_as_ghost(record.id)
-                await self.repo.increment_ghost_count(
-                    user_id=record.mentioned_user_id,
-                    guild_id=record.guild_id
-                )
-                
-                logger.debug(f"詐欺紀錄已更新: record_id={record.id}")
-            else:
-                logger.debug(f"Record {record.id} 已被標記為已回應，跳過詐欺判定")
+                # 先標記 ghost，確實標記 (讀取之後沒有被回應) 才更新統計
+                if await self.repo.mark_as_ghost(record.id):
+                    await self._count_ghost(record)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("詐欺紀錄已更新: record_id=%s", record.id, extra=_ids(record))
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Record %s 已被標記為已回應，跳過詐欺判定", record.id, extra=_ids(record))
         
         except asyncio.CancelledError:
             # 任務被取消 (使用者及時回應)
-            logger.debug(f"Timeout 任務已取消: record_id={record.id} (使用者已回應)")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Timeout 任務已取消: record_id=%s (使用者已回應)", record.id, extra=_ids(record))
             raise  # 重新拋出以正確結束任務
         
         except Exception as e:
-            logger.error(f"Timeout 處理發生錯誤: record_id={record.id}, error={e}", exc_info=True)
+            logger.error("Timeout 處理發生錯誤: record_id=%s, error=%s", record.id, e, exc_info=True, extra=_ids(record))
+        
+        finally:
+            self._firing.discard(record.id)
     
     def cancel_timeout(self, record_id: int) -> bool:
         """
@@ -101,22 +165,24 @@ class TimeoutScheduler:
             bool: 是否成功取消 (False 表示任務不存在或已完成)
         """
         if record_id not in self.pending_tasks:
-            logger.debug(f"嘗試取消不存在的任務: record_id={record_id}")
+            logger.debug("嘗試取消不存在的任務: record_id=%s", record_id)
             return False
         
         task = self.pending_tasks[record_id]
         
         if task.done():
             # 任務已完成 (可能已超時或已被取消)
-            logger.debug(f"任務已完成，無需取消: record_id={record_id}")
+            logger.debug("任務已完成，無需取消: record_id=%s", record_id)
             return False
         
         # 取消任務
         task.cancel()
-        logger.debug(f"已取消 timeout 任務: record_id={record_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("已取消 timeout 任務: record_id=%s", record_id, extra={"record_id": record_id})
         
         # 立即清理 (不等待 done_callback)
         self.pending_tasks.pop(record_id, None)
+        self._unregister(record_id)
         return True
     
     def _cleanup_task(self, record_id: int, task: asyncio.Task) -> None:
@@ -127,20 +193,70 @@ class TimeoutScheduler:
             record_id: Record ID
             task: 已完成的 Task
         """
-        # 從 pending_tasks 中移除
-        self.pending_tasks.pop(record_id, None)
+        # 從 pending_tasks 中移除 (若已被新任務取代則保留新任務)
+        if self.pending_tasks.get(record_id) is task:
+            self.pending_tasks.pop(record_id, None)
+            self._unregister(record_id)
         
         # 處理任務異常 (非 CancelledError)
         if not task.cancelled() and task.exception() is not None:
             logger.error(
-                f"任務執行時發生未捕獲的異常: record_id={record_id}, "
-                f"exception={task.exception()}"
+                "任務執行時發生未捕獲的異常: record_id=%s, exception=%s",
+                record_id, task.exception(),
+                extra={"record_id": record_id}
             )
     
+    def _register(self, record: MentionRecord, deadline: datetime) -> None:
+        if record.id not in self.deadlines:
+            self.guild_open[record.guild_id] = self.guild_open.get(record.guild_id, 0) + 1
+            self.user_open.setdefault((record.guild_id, record.mentioned_user_id), set()).add(record.id)
+        self.deadlines[record.id] = (record, deadline)
+    
+    def _unregister(self, record_id: int) -> None:
+        entry = self.deadlines.pop(record_id, None)
+        if entry is None:
+            return
+        record = entry[0]
+        guild_id = record.guild_id
+        remaining = self.guild_open.get(guild_id, 0) - 1
+        if remaining > 0:
+            self.guild_open[guild_id] = remaining
+        else:
+            self.guild_open.pop(guild_id, None)
+        
+        key = (guild_id, record.mentioned_user_id)
+        open_ids = self.user_open.get(key)
+        if open_ids is not None:
+            open_ids.discard(record_id)
+            if not open_ids:
+                del self.user_open[key]
+    
+    def get_open_count(self, guild_id: int) -> int:
+        """取得某伺服器進行中的計時數 (含視窗外尚未載入的)"""
+        return self.guild_open.get(guild_id, 0) + self.far_open.get(guild_id, 0)
+    
+    def has_open(self, guild_id: int, user_id: int) -> bool:
+        """某使用者在某伺服器是否有記憶體中進行中的計時 (O(1))"""
+        return (guild_id, user_id) in self.user_open
+    
+    def get_open_mentions(self, guild_id: int, user_id: int) -> List[MentionRecord]:
+        """
+        某使用者在某伺服器記憶體中進行中的 mention (不含視窗外尚未載入的)
+        """
+        return [
+            self.deadlines[record_id][0]
+            for record_id in self.user_open.get((guild_id, user_id), ())
+            if record_id not in self._firing
+        ]
+    
     def get_pending_count(self) -> int:
         """取得目前 pending 的任務數量 (for monitoring)"""
         return len(self.pending_tasks)
     
+    def is_firing(self, record_id: int) -> bool:
+        """檢查某個 record 是否已過等待時間、正在寫入詐欺判定"""
+        return record_id in self._firing
+    
     def is_pending(self, record_id: int) -> bool:
         """檢查某個 record 是否有 pending 的 timeout"""
         return record_id in self.pending_tasks and not self.pending_tasks[record_id].done()
@@ -149,7 +265,7 @@ class TimeoutScheduler:
         """
         取消所有 pending 的任務
         """
-        logger.info(f"取消所有 timeout 任務 (共 {len(self.pending_tasks)} 個)")
+        logger.info("取消所有 timeout 任務 (共 %d 個)", len(self.pending_tasks))
         
         for record_id, task in list(self.pending_tasks.items()):
             if not task.done():
@@ -160,34 +276,282 @@ class TimeoutScheduler:
             await asyncio.gather(*self.pending_tasks.values(), return_exceptions=True)
         
         self.pending_tasks.clear()
+        self.deadlines.clear()
+        self.guild_open.clear()
+        self.user_open.clear()
         logger.info("所有 timeout 任務已取消")
     
-    async def restore_pending_timeouts(self) -> None:
+    async def _resume(
+        self,
+        mention: MentionRecord,
+        deadline: datetime,
+        now: datetime,
+        in_window: bool = False
+    ) -> None:
+        """
+        依到期時間重新排程，已超時則直接標記為詐欺
+        
+        Args:
+            in_window: 由 loader 依視窗查出的紀錄，以原到期時間排程
+                       (以剩餘時間重算會晚於查詢時的 now，視窗邊緣的紀錄會被誤判為遠期而不再載入)
+        """
+        remaining = (deadline - now).total_seconds()
+        
+        if remaining > 0 and in_window:
+            self.schedule_timeout(mention, deadline=deadline)
+        elif remaining > 0:
+            # 還沒超時，以剩餘時間重新排程
+            self.schedule_timeout(mention, delay=remaining)
+        else:
+            # 已超時，直接標記為詐欺 (查詢之後已被回應或判定的不重複計算)
+            if await self.repo.mark_as_ghost(mention.id):
+                await self._count_ghost(mention)
+    
+    async def _count_ghost(self, record: MentionRecord) -> None:
+        """
+        增加詐欺次數並同步排名索引
+        """
+        ghost_count = await self.repo.increment_ghost_count(
+            user_id=record.mentioned_user_id,
+            guild_id=record.guild_id
+        )
+        if self.ranking is not None:
+            self.ranking.record_ghost(record.guild_id, record.mentioned_user_id, ghost_count)
+    
+    async def restore_pending_timeouts(self, chunk_size: int = 500) -> int:
         """
         Bot 重啟後恢復未完成的 timeout
         
-        查詢資料庫中所有 responded=False 且 is_ghost=False 的紀錄
+        分批讀取資料庫中所有 responded=False 且 is_ghost=False 的紀錄
         計算剩餘時間並重新排程
+        
+        Returns:
+            int: 恢復 (重新排程或直接判定) 的紀錄數
         """
         logger.info("嘗試恢復 pending timeouts...")
+        if self.horizon:
+            # 視窗模式只載入即將到期的部分
+            return await self.load_horizon(initial=True)
+        
+        restored = 0
+        
+        async for chunk in self.repo.iter_pending_mentions(chunk_size):
+            now = datetime.now()
+            for mention in chunk:
+                deadline = mention.mention_time + timedelta(seconds=self.timeout)
+                await self._resume(mention, deadline, now)
+            restored += len(chunk)
+        
+        logger.info("Timeout 恢復完成 (共 %d 筆)", restored)
+        return restored
+    
+    async def set_timeout(self, timeout_seconds: int, redeadline: bool = False) -> int:
+        """
+        熱重載時變更 response_timeout
         
-        pending_mentions = await self.repo.get_all_pending_mentions()
+        Args:
+            redeadline: True 時進行中的計時改為 mention_time + 新 timeout (已超過的直接判定)，
+                        False 時只影響之後建立的計時
+                        (視窗模式下尚未載入的遠期 mention 一律以新 timeout 計算)
+        
+        Returns:
+            int: 重新排程的計時數
+        """
+        if timeout_seconds == self.timeout:
+            return 0
+        logger.info("response_timeout 變更: %ss → %ss (%s)", self.timeout, timeout_seconds,
+                    "重新計算進行中的計時" if redeadline else "只影響新的計時")
+        self.timeout = timeout_seconds
         
-        for mention in pending_mentions:
-            # 計算從 mention_time 到現在經過的時間
-            elapsed = (datetime.now() - mention.mention_time).total_seconds()
-            remaining = max(0, self.timeout - elapsed)
+        moved = 0
+        if redeadline:
+            now = datetime.now()
+            for record_id, (record, deadline) in list(self.deadlines.items()):
+                if record_id in self._firing or not self.is_pending(record_id):
+                    continue
+                new_deadline = record.mention_time + timedelta(seconds=timeout_seconds)
+                if new_deadline == deadline:
+                    continue
+                self.cancel_timeout(record_id)
+                await self._resume(record, new_deadline, now)
+                moved += 1
+        
+        if self._loaded_until is not None:
+            # loader 依 mention_time 範圍查詢，timeout 變動後重新載入整段視窗 (記憶體中已有的以 pending_tasks 去重)
+            await self.load_horizon(initial=True)
+        return moved
+    
+    # ==================== 關閉與快照 ====================
+    
+    async def shutdown(self, snapshot_path: Optional[str] = None, drain_timeout: float = 10.0) -> int:
+        """
+        關閉排程器: 等待正在寫入的任務完成，取消其餘計時並寫入快照
+        
+        Args:
+            snapshot_path: 快照檔路徑 (None 則不寫入)
+            drain_timeout: 等待寫入中任務的秒數上限
+        
+        Returns:
+            int: 寫入快照的計時數
+        """
+        if self._loader_task is not None:
+            self._loader_task.cancel()
+            self._loader_task = None
+        
+        firing = [task for rid, task in self.pending_tasks.items() if rid in self._firing]
+        if firing:
+            logger.info("等待 %d 個詐欺判定寫入完成...", len(firing))
+            await asyncio.wait(firing, timeout=drain_timeout)
+        
+        # 仍在等待中的計時才寫入快照
+        timers = [
+            self.deadlines[rid] for rid, task in self.pending_tasks.items()
+            if not task.done() and rid not in self._firing and rid in self.deadlines
+        ]
+        
+        if snapshot_path is not None:
+            self.write_snapshot(snapshot_path, timers)
+        
+        await self.cancel_all()
+        return len(timers)
+    
+    def write_snapshot(self, path: str, timers: list) -> None:
+        """
+        將計時寫入快照
+        格式: [id, 到期時間, 被提及者, 伺服器, 頻道, 訊息, 提及者, mention 時間] (時間皆為 timestamp)
+        """
+        snapshot = {
+            "version": 1,
+            "taken_at": datetime.now().isoformat(),
+            "timeout": self.timeout,
+            "timers": [
+                [
+                    record.id,
+                    deadline.timestamp(),
+                    record.mentioned_user_id,
+                    record.guild_id,
+                    record.channel_id,
+                    record.message_id,
+                    record.mentioner_user_id,
+                    record.mention_time.timestamp()
+                ]
+                for record, deadline in timers
+            ]
+        }
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        logger.info("已寫入排程快照: %s (共 %d 個計時)", path, len(timers))
+    
+    async def restore_from_snapshot(self, path: str) -> bool:
+        """
+        從快照恢復計時，只向資料庫查詢快照之後有變動的紀錄
+        快照使用後即刪除 (避免之後異常關閉時誤用舊快照)
+        
+        Returns:
+            bool: 是否成功使用快照 (False 時應改用 restore_pending_timeouts)
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            taken_at = datetime.fromisoformat(snapshot["taken_at"])
+            snapshot_timeout = snapshot["timeout"]
+            timers = snapshot["timers"]
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("排程快照無效，改為完整恢復: %s", e)
+            return False
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        
+        if self.horizon:
+            # 對帳新增的遠期 mention 不建立計時
+            self._loaded_until = datetime.now() + timedelta(seconds=self.horizon)
+        
+        # timeout 設定變更時，依差值調整到期時間
+        shift = timedelta(seconds=self.timeout - snapshot_timeout)
+        known: Dict[int, Tuple[MentionRecord, datetime]] = {}
+        for rid, deadline, user_id, guild_id, channel_id, message_id, mentioner_id, mention_time in timers:
+            record = MentionRecord(
+                id=rid,
+                guild_id=guild_id,
+                channel_id=channel_id,
+                message_id=message_id,
+                mentioned_user_id=user_id,
+                mentioner_user_id=mentioner_id,
+                mention_time=datetime.fromtimestamp(mention_time)
+            )
+            known[rid] = (record, datetime.fromtimestamp(deadline) + shift)
+        
+        # 對帳: 快照之後新增的 pending 補上，已回應或已判定的移除
+        changed = await self.repo.get_mentions_changed_since(taken_at)
+        for mention in changed:
+            if mention.responded or mention.is_ghost:
+                known.pop(mention.id, None)
+            elif mention.id not in known:
+                known[mention.id] = (mention, mention.mention_time + timedelta(seconds=self.timeout))
+        
+        now = datetime.now()
+        for record, deadline in known.values():
+            await self._resume(record, deadline, now)
+        
+        logger.info("已從快照恢復 %d 個計時 (對帳 %d 筆變動)", len(known), len(changed))
+        if self.horizon:
+            # 快照只含當時視窗內的計時，其餘由資料庫補上
+            await self.load_horizon(initial=True)
+        return True
+    
+    # ==================== 視窗模式 ====================
+    
+    async def load_horizon(self, initial: bool = False) -> int:
+        """
+        載入到期時間落在下一段視窗內的 mention，並啟動背景 loader
+        
+        Args:
+            initial: 不設下界 (啟動時，含已過期的)
+        
+        Returns:
+            int: 新載入 (排程或直接判定) 的紀錄數
+        """
+        async with self._horizon_lock:
+            timeout = timedelta(seconds=self.timeout)
+            after = None if initial or self._loaded_until is None else self._loaded_until
+            until = datetime.now() + timedelta(seconds=self.horizon)
+            # 先推進視窗再查詢: 查詢期間新增的 mention 由 schedule_timeout 直接放入記憶體，
+            # 同時被查詢到的以 pending_tasks 去重
+            self._loaded_until = until
+            
+            due = await self.repo.get_open_mentions_between(after - timeout if after else None, until - timeout)
+            now = datetime.now()
+            loaded = 0
+            for mention in due:
+                if mention.id in self.pending_tasks:
+                    continue
+                await self._resume(mention, mention.mention_time + timeout, now, in_window=True)
+                loaded += 1
             
-            if remaining > 0:
-                # 還沒超時，重新排程
-                # 需要修改 schedule_timeout 支援自訂 timeout
-                self.schedule_timeout(mention)
-            else:
-                # 已超時，直接標記為詐欺
-                await self.repo.mark_as_ghost(mention.id)
-                await self.repo.increment_ghost_count(
-                    mention.mentioned_user_id,
-                    mention.guild_id
-                )
-        
-        logger.info("Timeout 恢復完成")
\ No newline at end of file
+            self.far_open = await self.repo.count_open_mentions_by_guild(until - timeout)
+        
+        if self._loader_task is None:
+            self._loader_task = asyncio.create_task(self._horizon_loop(), name="scheduler_horizon")
+        if loaded and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("已載入 %d 筆視窗內的 timeout (視窗至 %s)", loaded, until.isoformat())
+        return loaded
+    
+    async def _horizon_loop(self) -> None:
+        interval = max(1.0, self.horizon / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load_horizon()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("載入視窗內的 timeout 失敗: %s", e, exc_info=True)
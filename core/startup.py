@@ -0,0 +1,97 @@
+"""
+啟動流程管理
+職責:
+1. 記錄每個啟動階段的耗時
+2. 在資料還原完成前暫存事件，完成後依序套用
+   暫存已滿時不丟棄事件: 該事件的處理等到還原完成後才執行 (backpressure)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+logger = logging.getLogger("MentionDodger.Startup")
+
+EventHandler = Callable[..., Awaitable[Any]]
+
+
+class StartupPipeline:
+    def __init__(self, buffer_limit: int = 5000):
+        """
+        Args:
+            buffer_limit: 暫存的事件數上限 (超過的事件在各自的任務中等待還原完成)
+        """
+        self.started_at = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.ready = asyncio.Event()
+        self._buffer: Deque[Tuple[EventHandler, tuple]] = deque()
+        self._buffer_limit = buffer_limit
+        self.overflowed = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "StartupPipeline":
+        startup = config.get("startup") or {}
+        return cls(buffer_limit=startup.get("buffer_limit", 5000))
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready.is_set()
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """
+        量測一個啟動階段的耗時
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = elapsed
+            logger.info(f"[啟動] {name}: {elapsed * 1000:.1f} ms")
+
+    def mark(self, name: str) -> None:
+        """
+        記錄從啟動開始到某個時間點的耗時 (例如 gateway ready)
+        """
+        elapsed = time.perf_counter() - self.started_at
+        self.timings[name] = elapsed
+        logger.info(f"[啟動] {name}: 距啟動 {elapsed * 1000:.1f} ms")
+
+    async def defer(self, handler: EventHandler, *args) -> None:
+        """
+        還原完成前收到的事件先暫存
+        暫存已滿時改為等待還原完成後直接處理 (事件不會遺失，只佔用該事件自己的任務)
+        """
+        if len(self._buffer) < self._buffer_limit:
+            self._buffer.append((handler, args))
+            return
+
+        self.overflowed += 1
+        if self.overflowed == 1:
+            logger.warning(f"[啟動] 暫存事件已達上限 ({self._buffer_limit})，之後的事件等待還原完成後處理")
+        await self.ready.wait()
+        await handler(*args)
+
+    async def complete(self) -> None:
+        """
+        還原完成: 依收到順序套用暫存事件，再開放即時處理
+        """
+        applied = 0
+        # 套用過程中仍可能有新事件進入暫存，持續清空直到沒有為止
+        while self._buffer:
+            handler, args = self._buffer.popleft()
+            try:
+                await handler(*args)
+                applied += 1
+            except Exception as e:
+                logger.error(f"套用暫存事件失敗: {e}", exc_info=True)
+        self.ready.set()
+
+        if applied or self.overflowed:
+            logger.info(f"[啟動] 已套用 {applied} 個暫存事件 (另有 {self.overflowed} 個超過暫存上限，等待後處理)")
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.timings.items())
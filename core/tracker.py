@@ -6,38 +6,75 @@ Mention 追蹤核心
 3. 與 scheduler 協作設定 timeout
 """
 from discord import Message, Member
-from typing import List
+from typing import List, Optional, Sequence
 from database.repository import GhostRepository
 from database.models import MentionRecord
+from core.participants import ParticipantRegistry
+from core.ranking import RankIndex
 from datetime import datetime
 
 class MentionTracker:
-    def __init__(self, repository: GhostRepository, timeout: int):
+    def __init__(
+        self,
+        repository: GhostRepository,
+        timeout: int,
+        participants: Optional[ParticipantRegistry] = None,
+        ranking: Optional[RankIndex] = None
+    ):
         self.repo = repository
         self.timeout = timeout  # 從 config 讀取
+        self.participants = participants
+        self.ranking = ranking
     
-    async def track_mentions(self, message: Message) -> List[MentionRecord]:
+    def trackable_mentions(self, message: Message) -> List[Member]:
         """
-        從訊息中提取所有 mention 並建立追蹤
+        訊息中需要追蹤的 mention (排除 bot、重複、未加入排行榜的人)
+        在任何資料庫寫入或計時建立之前過濾
         """
-        records = []
+        seen = set()
+        targets = []
         for mentioned in message.mentions:
-            if mentioned.bot:  # 忽略 bot
+            if mentioned.bot or mentioned.id in seen:  # 忽略 bot
                 continue
-            
-            record = MentionRecord(
+            seen.add(mentioned.id)
+            targets.append(mentioned)
+        
+        if self.participants is not None:
+            targets = self.participants.filter(message.guild.id, targets)
+        return targets
+    
+    async def track_mentions(self, message: Message, targets: Optional[Sequence[Member]] = None) -> List[MentionRecord]:
+        """
+        從訊息中提取所有 mention 並建立追蹤
+        
+        Args:
+            message: 原始訊息
+            targets: 經 admission control 放行的對象 (None 則追蹤全部)
+        """
+        if targets is None:
+            targets = self.trackable_mentions(message)
+        
+        now = datetime.now()
+        records = [
+            MentionRecord(
                 guild_id=message.guild.id,
                 channel_id=message.channel.id,
                 message_id=message.id,
                 mentioned_user_id=mentioned.id,
                 mentioner_user_id=message.author.id,
-                mention_time=datetime.now(),
+                mention_time=now,
                 responded=False
             )
-            
-            record_id = await self.repo.add_mention(record)
+            for mentioned in targets
+        ]
+        
+        # 同一則訊息的 mention 在單一交易中寫入
+        record_ids = await self.repo.add_mentions(records)
+        for record, record_id in zip(records, record_ids):
             record.id = record_id
-            records.append(record)
+        
+        if self.ranking is not None and records:
+            self.ranking.record_mentions(message.guild.id, [record.mentioned_user_id for record in records])
         
         return records
     
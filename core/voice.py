@@ -0,0 +1,165 @@
+"""
+語音頻道回應
+職責: 使用者加入語音頻道時，視為回應了他在該伺服器中尚未回應的 mention (可依伺服器開關)
+
+voice_state_update 非常頻繁 (靜音、拒聽、直播開關都會觸發)，分三段處理:
+1. 過濾: 只有「進入新頻道」且在記憶體索引中有進行中計時的 (伺服器, 使用者) 才會送進來，不查資料庫
+2. 合併: coalesce_seconds 內的加入合併成一批，同一人重複進出只保留第一次加入的時間
+3. 批次判定: 以 scheduler 的 (guild, user) 索引找出 mention，寫入同時送出 (WriteQueue 合併為一次 commit)
+   視窗模式下尚未載入的遠期 mention，每批每個伺服器只查詢一次資料庫
+
+批次不經過 admission 佇列，可能與訊息處理或詐欺判定同時處理同一筆 mention:
+mark_as_responded / mark_as_ghost 只更新未結案的紀錄，先寫入的一方生效，另一方不會重複計算
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from database.models import MentionRecord
+from database.repository import GhostRepository
+from core.scheduler import TimeoutScheduler
+
+logger = logging.getLogger("MentionDodger.Voice")
+
+
+class VoiceResponder:
+    def __init__(
+        self,
+        repository: GhostRepository,
+        scheduler: TimeoutScheduler,
+        enabled: bool = False,
+        guild_overrides: Optional[Dict[int, bool]] = None,
+        coalesce_seconds: float = 1.0,
+        ignore_afk_channel: bool = True
+    ):
+        """
+        Args:
+            enabled: 預設是否把加入語音頻道算作回應
+            guild_overrides: 依伺服器覆寫 enabled
+            coalesce_seconds: 合併語音事件的時間窗
+            ignore_afk_channel: 進入 AFK 頻道不算回應
+        """
+        self.repo = repository
+        self.scheduler = scheduler
+        self.enabled = enabled
+        self.guild_overrides = {int(guild_id): bool(value) for guild_id, value in (guild_overrides or {}).items()}
+        self.coalesce_seconds = coalesce_seconds
+        self.ignore_afk_channel = ignore_afk_channel
+        # (guild_id, user_id) -> 第一次加入的時間 (下一批待判定)
+        self._pending: Dict[Tuple[int, int], datetime] = {}
+        # 等待合併時間窗中的任務 / 已開始寫入的任務
+        self._flush_task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.resolved = 0
+
+    @classmethod
+    def from_config(cls, repository: GhostRepository, scheduler: TimeoutScheduler, config: dict) -> "VoiceResponder":
+        voice = config.get("voice_response") or {}
+        return cls(
+            repository,
+            scheduler,
+            enabled=voice.get("enable", False),
+            guild_overrides=voice.get("guild_overrides"),
+            coalesce_seconds=voice.get("coalesce_seconds", 1.0),
+            ignore_afk_channel=voice.get("ignore_afk_channel", True)
+        )
+
+    def enabled_for(self, guild_id: int) -> bool:
+        return self.guild_overrides.get(guild_id, self.enabled)
+
+    def wants(self, guild_id: int, user_id: int) -> bool:
+        """
+        這次加入是否可能回應了 mention (O(1)，事件處理器據此丟棄絕大多數事件)
+        """
+        if not self.enabled_for(guild_id):
+            return False
+        return self.scheduler.has_open(guild_id, user_id) or self.scheduler.far_open.get(guild_id, 0) > 0
+
+    # ==================== 合併 ====================
+
+    def submit(self, guild_id: int, user_id: int, joined_at: datetime) -> None:
+        """
+        記下一次加入，coalesce_seconds 後與同一批的其他加入一起判定
+        """
+        self._pending.setdefault((guild_id, user_id), joined_at)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later(), name="voice_flush")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.coalesce_seconds)
+        # 之後的加入開始下一批; 這一批改由 _inflight 追蹤 (drain 時等待而不取消)
+        task = self._flush_task
+        self._flush_task = None
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        batch, self._pending = self._pending, {}
+        try:
+            await self.resolve(batch)
+        except Exception as e:
+            logger.error("語音回應判定失敗 (%d 人): %s", len(batch), e, exc_info=True)
+
+    async def drain(self) -> None:
+        """
+        關閉前立即判定尚未處理的一批
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            await self.resolve(batch)
+
+    # ==================== 批次判定 ====================
+
+    async def resolve(self, batch: Dict[Tuple[int, int], datetime]) -> int:
+        """
+        將一批加入與進行中的 mention 配對並標記為已回應 (加入之後才發生的 mention 不算)
+
+        Returns:
+            int: 標記為已回應的 mention 數
+        """
+        matched: Dict[int, Tuple[MentionRecord, datetime]] = {}
+        far_users: Dict[int, List[int]] = {}
+
+        for (guild_id, user_id), joined_at in batch.items():
+            for record in self.scheduler.get_open_mentions(guild_id, user_id):
+                if record.mention_time <= joined_at:
+                    matched[record.id] = (record, joined_at)
+            if self.scheduler.far_open.get(guild_id, 0) > 0:
+                far_users.setdefault(guild_id, []).append(user_id)
+
+        # 視窗模式: 尚未載入記憶體的 mention
+        for guild_id, user_ids in far_users.items():
+            until = max(batch[(guild_id, user_id)] for user_id in user_ids)
+            for record in await self.repo.get_pending_mentions_for_users(guild_id, user_ids, until):
+                joined_at = batch[(guild_id, record.mentioned_user_id)]
+                if record.id in matched:
+                    continue
+                if record.mention_time <= joined_at:
+                    matched[record.id] = (record, joined_at)
+
+        # 已在寫入詐欺判定的計時不取消 (含查詢遠期 mention 期間才到期的)，由判定的一方結案
+        for record_id in [rid for rid in matched if self.scheduler.is_firing(rid)]:
+            del matched[record_id]
+
+        if not matched:
+            return 0
+
+        # 先取消計時: 批次寫入期間到期的計時不會再判定為詐欺
+        for record_id in matched:
+            self.scheduler.cancel_timeout(record_id)
+        marked = await asyncio.gather(*(
+            self.repo.mark_as_responded(record_id, joined_at)
+            for record_id, (_, joined_at) in matched.items()
+        ))
+
+        # 已被訊息回應或判定為詐欺的不計入
+        resolved = sum(1 for ok in marked if ok)
+        self.resolved += resolved
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("語音回應: %d 人加入，%d 筆 mention 標記為已回應", len(batch), resolved)
+        return resolved
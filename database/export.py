@@ -0,0 +1,291 @@
+"""
+資料匯出 / 匯入 (備份或搬移伺服器資料)
+
+以固定大小的批次讀寫，記憶體用量與資料量無關:
+- 匯出: 每個資料表以 cursor.fetchmany 分批讀出，逐行寫入壓縮檔
+- 匯入: 逐行讀取，依 guild_id 分到對應分片，每批在單一交易中寫入
+
+格式 (依副檔名判斷):
+- *.jsonl / *.jsonl.gz: 單一檔案，每行 {"table": ..., 欄位...}
+- *.csv / *.csv.gz: 每個資料表一個檔案 (例: backup.csv.gz → backup.mentions.csv.gz)
+mentions 的 id 不匯出，匯入時重新編號
+
+匯入不合併: 目標資料庫中已有資料的伺服器需指定 replace (mentions 沒有唯一鍵，
+重複匯入會使每筆 mention 出現兩次，而 ghost_stats 被覆寫，回應率因此超過 100%)
+"""
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger("MentionDodger.Export")
+
+CHUNK_SIZE = 5000
+
+# 資料表 → (欄位, 匯出排序)
+TABLES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "ghost_stats": (
+        ("user_id", "guild_id", "ghost_count", "mention_count", "response_rate", "last_updated",
+         "latency_count", "latency_sum", "latency_p50", "latency_p90", "latency_sketch"),
+        "guild_id, user_id"
+    ),
+    "participants": (
+        ("user_id", "guild_id", "joined_at"),
+        "guild_id, user_id"
+    ),
+    "mentions": (
+        ("guild_id", "channel_id", "message_id", "mentioned_user_id", "mentioner_user_id",
+         "mention_time", "responded", "response_time", "is_ghost", "updated_at"),
+        "id"
+    ),
+}
+
+# CSV 讀回時需轉型的欄位 (其餘為整數)
+_TEXT_COLUMNS = {"last_updated", "joined_at", "mention_time", "response_time", "updated_at", "latency_sketch"}
+_REAL_COLUMNS = {"response_rate", "latency_sum", "latency_p50", "latency_p90"}
+
+_INSERT = {
+    "ghost_stats": """
+        INSERT INTO ghost_stats (user_id, guild_id, ghost_count, mention_count, response_rate, last_updated,
+                                 latency_count, latency_sum, latency_p50, latency_p90, latency_sketch)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, guild_id) DO UPDATE SET
+            ghost_count = excluded.ghost_count,
+            mention_count = excluded.mention_count,
+            response_rate = excluded.response_rate,
+            last_updated = excluded.last_updated,
+            latency_count = excluded.latency_count,
+            latency_sum = excluded.latency_sum,
+            latency_p50 = excluded.latency_p50,
+            latency_p90 = excluded.latency_p90,
+            latency_sketch = excluded.latency_sketch
+    """,
+    "participants": """
+        INSERT OR IGNORE INTO participants (user_id, guild_id, joined_at)
+        VALUES (?, ?, ?)
+    """,
+    "mentions": """
+        INSERT INTO mentions (guild_id, channel_id, message_id, mentioned_user_id, mentioner_user_id,
+                              mention_time, responded, response_time, is_ghost, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".jsonl"):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"無法判斷格式 (需為 .jsonl[.gz] 或 .csv[.gz]): {path}")
+
+
+def csv_table_path(path: str, table: str) -> str:
+    """
+    backup.csv.gz → backup.mentions.csv.gz
+    """
+    suffix = ".csv.gz" if path.endswith(".csv.gz") else ".csv"
+    return f"{path[:-len(suffix)]}.{table}{suffix}"
+
+
+def _open_text(path: str, mode: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+# ==================== 匯出 ====================
+
+def _iter_rows(db_paths: List[str], table: str, guild_id: Optional[int]) -> Iterator[tuple]:
+    """
+    分批讀出所有分片的資料列
+    """
+    columns, order_by = TABLES[table]
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    params: tuple = ()
+    if guild_id is not None:
+        query += " WHERE guild_id = ?"
+        params = (guild_id,)
+    query += f" ORDER BY {order_by}"
+
+    for path in db_paths:
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            cursor = source.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            source.close()
+
+
+def export_data(db_paths: List[str], out_path: str, guild_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    匯出 ghost_stats / participants / mentions
+
+    Args:
+        db_paths: 資料庫檔 (分片時為所有分片，或只傳該伺服器所在的分片)
+        guild_id: 只匯出此伺服器 (None 為全部)
+
+    Returns:
+        各資料表匯出的筆數
+    """
+    fmt = detect_format(out_path)
+    counts = {table: 0 for table in TABLES}
+
+    if fmt == "jsonl":
+        with _open_text(out_path, "w") as f:
+            for table, (columns, _) in TABLES.items():
+                for row in _iter_rows(db_paths, table, guild_id):
+                    payload = {"table": table}
+                    payload.update(zip(columns, row))
+                    f.write(json.dumps(payload, ensure_ascii=False))
+                    f.write("\n")
+                    counts[table] += 1
+    else:
+        for table, (columns, _) in TABLES.items():
+            with _open_text(csv_table_path(out_path, table), "w") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in _iter_rows(db_paths, table, guild_id):
+                    writer.writerow(row)
+                    counts[table] += 1
+
+    logger.info("匯出完成 %s: %s", out_path, counts, extra={"guild_id": guild_id})
+    return counts
+
+
+# ==================== 匯入 ====================
+
+def _parse_csv_value(column: str, value: str):
+    if value == "":
+        return None
+    if column in _TEXT_COLUMNS:
+        return value
+    if column in _REAL_COLUMNS:
+        return float(value)
+    return int(value)
+
+
+def _iter_file(in_path: str) -> Iterator[Tuple[str, tuple]]:
+    """
+    逐行讀出 (資料表, 資料列)
+    """
+    if detect_format(in_path) == "jsonl":
+        with _open_text(in_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                payload = json.loads(line)
+                table = payload["table"]
+                yield table, tuple(payload.get(column) for column in TABLES[table][0])
+        return
+
+    for table, (columns, _) in TABLES.items():
+        path = csv_table_path(in_path, table)
+        if not os.path.exists(path):
+            continue
+        with _open_text(path, "r") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                continue
+            positions = [header.index(column) for column in columns]
+            for row in reader:
+                yield table, tuple(_parse_csv_value(c, row[p]) for c, p in zip(columns, positions))
+
+
+def _existing_guilds(targets: List[sqlite3.Connection], in_path: str) -> List[int]:
+    """
+    匯入檔中出現、且目標資料庫已有資料的伺服器 (先掃過一次匯入檔，只保留 guild_id)
+    """
+    guild_index = {table: columns.index("guild_id") for table, (columns, _) in TABLES.items()}
+    guild_ids = {row[guild_index[table]] for table, row in _iter_file(in_path)}
+
+    existing = []
+    for guild_id in sorted(guild_ids):
+        target = targets[guild_id % len(targets)]
+        if any(
+            target.execute(f"SELECT 1 FROM {table} WHERE guild_id = ? LIMIT 1", (guild_id,)).fetchone()
+            for table in TABLES
+        ):
+            existing.append(guild_id)
+    return existing
+
+
+def import_data(db_paths: List[str], in_path: str, replace: bool = False) -> Dict[str, int]:
+    """
+    將匯出檔寫回資料庫 (資料表需已建立)
+
+    Args:
+        db_paths: 目標資料庫 (分片時依序傳入所有分片，依 guild_id % N 分配)
+        replace: 先刪除匯入檔中出現的伺服器原有的資料
+            (未指定時若有伺服器已有資料，拋出 ValueError 且不寫入任何資料)
+
+    Returns:
+        各資料表匯入的筆數
+    """
+    shard_count = len(db_paths)
+    targets = [sqlite3.connect(path, isolation_level=None) for path in db_paths]
+    for target in targets:
+        target.execute("PRAGMA busy_timeout = 5000")
+
+    buffers: Dict[Tuple[int, str], list] = {}
+    counts = {table: 0 for table in TABLES}
+    cleared = set()
+
+    def flush(shard: int, table: str) -> None:
+        rows = buffers.pop((shard, table), None)
+        if not rows:
+            return
+        target = targets[shard]
+        target.execute("BEGIN")
+        try:
+            target.executemany(_INSERT[table], rows)
+            target.execute("COMMIT")
+        except Exception:
+            target.execute("ROLLBACK")
+            raise
+        counts[table] += len(rows)
+
+    try:
+        if not replace:
+            existing = _existing_guilds(targets, in_path)
+            if existing:
+                raise ValueError(
+                    f"以下伺服器已有資料，重複匯入會使 mention 重複計算: "
+                    f"{', '.join(map(str, existing))} (請使用 --replace 取代原有資料)"
+                )
+
+        guild_index = {table: columns.index("guild_id") for table, (columns, _) in TABLES.items()}
+        for table, row in _iter_file(in_path):
+            guild_id = row[guild_index[table]]
+            shard = guild_id % shard_count
+
+            if replace and guild_id not in cleared:
+                target = targets[shard]
+                target.execute("BEGIN")
+                for name in TABLES:
+                    target.execute(f"DELETE FROM {name} WHERE guild_id = ?", (guild_id,))
+                target.execute("COMMIT")
+                cleared.add(guild_id)
+
+            buffer = buffers.setdefault((shard, table), [])
+            buffer.append(row)
+            if len(buffer) >= CHUNK_SIZE:
+                flush(shard, table)
+
+        for key in list(buffers):
+            flush(*key)
+    finally:
+        for target in targets:
+            target.close()
+
+    logger.info("匯入完成 %s: %s", in_path, counts)
+    return counts
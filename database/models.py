@@ -31,4 +31,9 @@ class GhostStats:
     ghost_count: int = 0
     mention_count: int = 0
     response_rate: float = 0.0
-    last_updated: datetime = None
\ No newline at end of file
+    last_updated: datetime = None
+    # 回應延遲 (秒)，由 ghost_stats 的 sketch 維護
+    latency_count: int = 0
+    latency_mean: Optional[float] = None
+    latency_p50: Optional[float] = None
+    latency_p90: Optional[float] = None
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+分片資料庫 (依 guild_id 分到 N 個 SQLite 檔)
+
+每個分片是一個獨立的 GhostRepository，有自己的寫入連線與寫入佇列，
+不同伺服器的寫入不再互相搶同一把 writer lock。
+- 以 guild 查詢的操作 → guild_id % N
+- 以 record_id 查詢的操作 → record_id % N (見 GhostRepository 的 id 編碼)
+- 跨伺服器的查詢 (管理用) → 所有分片並行查詢後合併
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from database.models import GhostStats, MentionRecord
+from database.repository import GhostRepository
+
+
+def shard_paths(db_path: str, shard_count: int) -> List[str]:
+    """
+    database/ghost_rank.sqlite → database/ghost_rank.shard0.sqlite, ...
+    """
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{i}{ext}" for i in range(shard_count)]
+
+
+def create_repository(db_config: dict) -> Union[GhostRepository, "PartitionedGhostRepository"]:
+    """
+    依 config.yaml 的 database 區塊建立 repository
+    """
+    shard_count = int(db_config.get("shards", 1))
+    if shard_count <= 1:
+        return GhostRepository(db_config["path"])
+    return PartitionedGhostRepository(db_config["path"], shard_count)
+
+
+class PartitionedGhostRepository:
+    def __init__(self, db_path: str, shard_count: int):
+        self.db_path = db_path
+        self.shard_count = shard_count
+        self.shards = [
+            GhostRepository(path, shard_index=i, shard_count=shard_count)
+            for i, path in enumerate(shard_paths(db_path, shard_count))
+        ]
+
+    def shard_for_guild(self, guild_id: int) -> GhostRepository:
+        return self.shards[guild_id % self.shard_count]
+
+    def shard_for_record(self, record_id: int) -> GhostRepository:
+        return self.shards[record_id % self.shard_count]
+
+    async def fan_out(self, method: str, *args, **kwargs) -> list:
+        """
+        在所有分片上並行執行同一個方法 (跨伺服器查詢用)
+        """
+        return await asyncio.gather(*(getattr(shard, method)(*args, **kwargs) for shard in self.shards))
+
+    # ==================== 連線 ====================
+
+    async def init_db(self):
+        await self.fan_out("init_db")
+
+    async def start(self) -> None:
+        await self.fan_out("start")
+
+    async def close(self) -> None:
+        await self.fan_out("close")
+
+    # ==================== Mention 相關操作 ====================
+
+    async def add_mention(self, record: MentionRecord) -> int:
+        return await self.shard_for_guild(record.guild_id).add_mention(record)
+
+    async def add_mentions(self, records: List[MentionRecord]) -> List[int]:
+        # 依分片分組後並行寫入，再依原順序組回 id
+        groups: Dict[int, List[int]] = {}
+        for position, record in enumerate(records):
+            groups.setdefault(record.guild_id % self.shard_count, []).append(position)
+
+        results = await asyncio.gather(*(
+            self.shards[shard].add_mentions([records[p] for p in positions])
+            for shard, positions in groups.items()
+        ))
+
+        record_ids = [0] * len(records)
+        for positions, ids in zip(groups.values(), results):
+            for position, record_id in zip(positions, ids):
+                record_ids[position] = record_id
+        return record_ids
+
+    async def get_mention_by_id(self, record_id: int) -> Optional[MentionRecord]:
+        return await self.shard_for_record(record_id).get_mention_by_id(record_id)
+
+    async def get_pending_mentions(
+        self,
+        user_id: int,
+        channel_id: int,
+        guild_id: Optional[int] = None
+    ) -> List[MentionRecord]:
+        if guild_id is not None:
+            return await self.shard_for_guild(guild_id).get_pending_mentions(user_id, channel_id, guild_id)
+
+        results = await self.fan_out("get_pending_mentions", user_id, channel_id)
+        return sorted((r for rows in results for r in rows), key=lambda r: r.mention_time, reverse=True)
+
+    async def get_pending_mentions_in_guild(self, user_id: int, guild_id: int) -> List[MentionRecord]:
+        return await self.shard_for_guild(guild_id).get_pending_mentions_in_guild(user_id, guild_id)
+
+    async def get_pending_mentions_for_users(
+        self,
+        guild_id: int,
+        user_ids: List[int],
+        until: Optional[datetime] = None
+    ) -> List[MentionRecord]:
+        return await self.shard_for_guild(guild_id).get_pending_mentions_for_users(guild_id, user_ids, until)
+
+    async def get_mention_history(
+        self,
+        user_id: int,
+        guild_id: int,
+        limit: int = 10,
+        before: Optional[MentionRecord] = None,
+        ghost_only: bool = False
+    ) -> List[MentionRecord]:
+        return await self.shard_for_guild(guild_id).get_mention_history(
+            user_id, guild_id, limit, before, ghost_only
+        )
+
+    async def mark_as_responded(self, record_id: int, response_time: datetime) -> bool:
+        return await self.shard_for_record(record_id).mark_as_responded(record_id, response_time)
+
+    async def mark_as_ghost(self, record_id: int) -> bool:
+        return await self.shard_for_record(record_id).mark_as_ghost(record_id)
+
+    # ==================== 參加者操作 ====================
+
+    async def add_participant(self, user_id: int, guild_id: int) -> bool:
+        return await self.shard_for_guild(guild_id).add_participant(user_id, guild_id)
+
+    async def remove_participant(self, user_id: int, guild_id: int) -> bool:
+        return await self.shard_for_guild(guild_id).remove_participant(user_id, guild_id)
+
+    async def get_all_participants(self) -> List[tuple]:
+        results = await self.fan_out("get_all_participants")
+        return [row for rows in results for row in rows]
+
+    # ==================== 統計資料操作 ====================
+
+    async def increment_ghost_count(self, user_id: int, guild_id: int) -> int:
+        return await self.shard_for_guild(guild_id).increment_ghost_count(user_id, guild_id)
+
+    async def get_user_stats(self, user_id: int, guild_id: int) -> Optional[GhostStats]:
+        return await self.shard_for_guild(guild_id).get_user_stats(user_id, guild_id)
+
+    async def get_leaderboard(self, guild_id: int, limit: int = 10) -> List[GhostStats]:
+        return await self.shard_for_guild(guild_id).get_leaderboard(guild_id, limit)
+
+    async def get_guild_stats(self, guild_id: int) -> List[GhostStats]:
+        return await self.shard_for_guild(guild_id).get_guild_stats(guild_id)
+
+    async def get_user_rank(self, user_id: int, guild_id: int) -> Optional[Tuple[int, int]]:
+        return await self.shard_for_guild(guild_id).get_user_rank(user_id, guild_id)
+
+    async def reset_user_stats(self, user_id: int, guild_id: int):
+        return await self.shard_for_guild(guild_id).reset_user_stats(user_id, guild_id)
+
+    async def reset_guild_stats(self, guild_id: int):
+        return await self.shard_for_guild(guild_id).reset_guild_stats(guild_id)
+
+    # ==================== 跨伺服器 (管理用) ====================
+
+    async def get_global_leaderboard(self, limit: int = 10) -> List[GhostStats]:
+        results = await self.fan_out("get_global_leaderboard", limit)
+        merged = [stat for rows in results for stat in rows]
+        merged.sort(key=lambda s: (-s.ghost_count, s.response_rate))
+        return merged[:limit]
+
+    async def get_all_pending_mentions(self) -> List[MentionRecord]:
+        results = await self.fan_out("get_all_pending_mentions")
+        return sorted((r for rows in results for r in rows), key=lambda r: r.mention_time)
+
+    async def get_mentions_changed_since(self, since: datetime) -> List[MentionRecord]:
+        results = await self.fan_out("get_mentions_changed_since", since)
+        return [r for rows in results for r in rows]
+
+    async def get_open_mentions_between(
+        self,
+        after: Optional[datetime],
+        until: datetime
+    ) -> List[MentionRecord]:
+        results = await self.fan_out("get_open_mentions_between", after, until)
+        return sorted((r for rows in results for r in rows), key=lambda r: r.mention_time)
+
+    async def count_open_mentions_by_guild(self, after: datetime) -> Dict[int, int]:
+        # 每個伺服器只在一個分片中，直接合併
+        merged: Dict[int, int] = {}
+        for counts in await self.fan_out("count_open_mentions_by_guild", after):
+            merged.update(counts)
+        return merged
+
+    async def iter_pending_mentions(self, chunk_size: int = 500) -> AsyncIterator[List[MentionRecord]]:
+        for shard in self.shards:
+            async for chunk in shard.iter_pending_mentions(chunk_size):
+                yield chunk
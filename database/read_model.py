@@ -0,0 +1,128 @@
+"""
+排行榜讀取模型
+/rank 與 /ghost 讀取每個伺服器 ghost_stats 的記憶體快照，不與寫入路徑搶連線:
+- 快照超過 max_staleness 秒才經由唯讀連線重新載入
+- 同一伺服器同時只會有一次重新載入，其他請求等待同一個結果
+- fresh=True (管理員) 時忽略快取直接重新載入
+- 每個伺服器有一個排名版本號，只有重新載入後名次或次數真的改變才會遞增 (圖片排行榜的快取鍵)
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from database.models import GhostStats
+
+# 「回應最快」排行至少需要的回應次數
+MIN_LATENCY_SAMPLES = 3
+
+
+@dataclass
+class GuildSnapshot:
+    """
+    單一伺服器的 ghost_stats 快照 (依詐欺次數排序)
+    """
+    loaded_at: float
+    leaderboard: List[GhostStats]
+    by_user: Dict[int, GhostStats] = field(default_factory=dict)
+    # 依回應延遲中位數排序 (第一次查詢時才建立)
+    fastest: Optional[List[GhostStats]] = None
+    # 這份快照的排名版本 (與 leaderboard 同時決定)
+    version: int = 0
+
+    def __post_init__(self):
+        if not self.by_user:
+            self.by_user = {stat.user_id: stat for stat in self.leaderboard}
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+class StatsReadModel:
+    def __init__(self, repository, max_staleness: float = 30.0):
+        """
+        Args:
+            repository: GhostRepository 或 PartitionedGhostRepository
+            max_staleness: 快照最長可使用的秒數
+        """
+        self.repo = repository
+        self.max_staleness = max_staleness
+        self.snapshots: Dict[int, GuildSnapshot] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        # guild_id -> (排名版本, 排名內容雜湊)；快照被淘汰後仍保留，版本號不會倒退
+        self._standings: Dict[int, Tuple[int, int]] = {}
+
+    async def _snapshot(self, guild_id: int, fresh: bool = False) -> GuildSnapshot:
+        snapshot = self.snapshots.get(guild_id)
+        if snapshot is not None and not fresh and snapshot.age <= self.max_staleness:
+            return snapshot
+
+        # 合併同時發生的重新載入
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.create_task(self._load(guild_id))
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id: int) -> GuildSnapshot:
+        leaderboard = await self.repo.get_guild_stats(guild_id)
+        snapshot = GuildSnapshot(loaded_at=time.monotonic(), leaderboard=leaderboard)
+        digest = hash(tuple((stat.user_id, stat.ghost_count, stat.mention_count) for stat in leaderboard))
+        version, previous = self._standings.get(guild_id, (0, None))
+        if digest != previous:
+            version += 1
+            self._standings[guild_id] = (version, digest)
+        snapshot.version = version
+        self._evict_idle()
+        self.snapshots[guild_id] = snapshot
+        return snapshot
+
+    def _evict_idle(self) -> None:
+        # 很久沒被查詢的伺服器不再佔用記憶體
+        idle = [gid for gid, snapshot in self.snapshots.items() if snapshot.age > self.max_staleness * 10]
+        for gid in idle:
+            del self.snapshots[gid]
+
+    async def get_user_stats(self, user_id: int, guild_id: int, fresh: bool = False) -> Optional[GhostStats]:
+        snapshot = await self._snapshot(guild_id, fresh)
+        return snapshot.by_user.get(user_id)
+
+    async def get_leaderboard(self, guild_id: int, limit: int = 10, fresh: bool = False) -> List[GhostStats]:
+        snapshot = await self._snapshot(guild_id, fresh)
+        return snapshot.leaderboard[:limit]
+
+    async def get_fastest(
+        self,
+        guild_id: int,
+        limit: int = 10,
+        fresh: bool = False
+    ) -> List[GhostStats]:
+        """
+        回應最快的使用者 (依延遲中位數，至少 MIN_LATENCY_SAMPLES 次回應)
+        """
+        snapshot = await self._snapshot(guild_id, fresh)
+        if snapshot.fastest is None:
+            snapshot.fastest = sorted(
+                (stat for stat in snapshot.leaderboard if stat.latency_count >= MIN_LATENCY_SAMPLES and stat.latency_p50 is not None),
+                key=lambda stat: (stat.latency_p50, stat.latency_p90 or 0)
+            )
+        return snapshot.fastest[:limit]
+
+    async def get_versioned_leaderboard(
+        self,
+        guild_id: int,
+        limit: int = 10,
+        fresh: bool = False
+    ) -> Tuple[List[GhostStats], int]:
+        """
+        排行榜與其排名版本號 (取自同一份快照，圖片排行榜的快取鍵不會對應到其他版本的內容)
+        """
+        snapshot = await self._snapshot(guild_id, fresh)
+        return snapshot.leaderboard[:limit], snapshot.version
+
+    def get_age(self, guild_id: int) -> Optional[float]:
+        """快照已存在的秒數 (沒有快照時為 None)"""
+        snapshot = self.snapshots.get(guild_id)
+        return snapshot.age if snapshot else None
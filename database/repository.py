@@ -1,15 +1,198 @@
 """
 資料庫操作封裝 (Repository Pattern)
+
+寫入操作以 op(db) 的形式交給 _write 執行:
+- start() 之後: 由單一寫入連線 (WriteQueue) 依序執行，多筆寫入合併為一次 commit
+- 未 start (例如離線工具): 每次開新連線執行並 commit
 """
+import asyncio
+import logging
 import aiosqlite
-from typing import List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from database.models import MentionRecord, GhostStats
+from utils.sketch import LatencySketch
 from datetime import datetime
 import hashlib # 之後新增 敏感資料進行 SHA-256
 
+logger = logging.getLogger("MentionDodger.Repository")
+
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+
+class WriteQueue:
+    """
+    單一資料庫檔案的寫入連線與佇列
+    佇列中累積的寫入在同一個交易中執行 (每筆各自一個 SAVEPOINT，失敗只回滾該筆)
+    """
+    def __init__(self, db_path: str, batch_size: int = 64):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.db: Optional[aiosqlite.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        self.db = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self.db.row_factory = aiosqlite.Row
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute("PRAGMA synchronous=NORMAL")
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name=f"writer:{self.db_path}")
+    
+    async def submit(self, op: WriteOp) -> Any:
+        if self._task is None or self._task.done():
+            raise RuntimeError(f"寫入佇列未啟動或已停止 ({self.db_path})")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+    
+    async def _run(self) -> None:
+        try:
+            while True:
+                batch: List[Tuple[WriteOp, asyncio.Future]] = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                
+                results = None
+                try:
+                    results = await self._execute(batch)
+                except Exception as e:
+                    logger.error("寫入交易失敗 (%s): %s", self.db_path, e, exc_info=True)
+                    results = [(future, None, e) for _, future in batch]
+                    await self._rollback()
+                finally:
+                    # 不論成功與否 (含取消) 都要通知呼叫端，否則 submit 與 close 會永遠等待
+                    self._resolve(batch, results)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            logger.critical("寫入工作異常終止 (%s): %r，之後的寫入將直接失敗", self.db_path, e)
+            raise
+        finally:
+            self._fail_pending()
+    
+    async def _execute(self, batch: List[Tuple[WriteOp, asyncio.Future]]) -> list:
+        results = []
+        await self.db.execute("BEGIN")
+        for op, future in batch:
+            await self.db.execute("SAVEPOINT op")
+            try:
+                results.append((future, await op(self.db), None))
+                await self.db.execute("RELEASE op")
+            except Exception as e:
+                await self.db.execute("ROLLBACK TO op")
+                await self.db.execute("RELEASE op")
+                results.append((future, None, e))
+        await self.db.execute("COMMIT")
+        return results
+    
+    async def _rollback(self) -> None:
+        # ROLLBACK 本身失敗 (例如磁碟錯誤) 時不讓寫入工作中止，下一批的 BEGIN 會再回報錯誤
+        try:
+            if self.db.in_transaction:
+                await self.db.execute("ROLLBACK")
+        except Exception as e:
+            logger.error("寫入交易回滾失敗 (%s): %s", self.db_path, e)
+    
+    def _resolve(self, batch: List[Tuple[WriteOp, asyncio.Future]], results: Optional[list]) -> None:
+        """
+        commit 之後才通知呼叫端 (results 為 None 表示交易中途被中斷，整批以錯誤結束)
+        """
+        if results is None:
+            error = RuntimeError(f"寫入交易中斷 ({self.db_path})")
+            results = [(future, None, error) for _, future in batch]
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        for _ in batch:
+            self._queue.task_done()
+    
+    def _fail_pending(self) -> None:
+        """
+        寫入工作結束時，佇列中剩餘的操作直接以錯誤結束
+        """
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"寫入佇列已停止 ({self.db_path})"))
+            self._queue.task_done()
+    
+    async def close(self, timeout: float = 30.0) -> None:
+        """
+        寫完佇列中剩餘的操作後關閉連線
+        
+        Args:
+            timeout: 等待剩餘寫入的秒數上限 (逾時的寫入以錯誤結束)
+        """
+        if self._task is None:
+            return
+        if not self._task.done():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("寫入佇列未能在 %.0f 秒內清空 (%s)", timeout, self.db_path)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.db.close()
+        self._task = None
+
+
 class GhostRepository:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, shard_index: int = 0, shard_count: int = 1):
+        """
+        Args:
+            db_path: SQLite 檔案路徑
+            shard_index / shard_count: 分片模式下此檔案的編號與總數
+                record_id 以 local_id * shard_count + shard_index 對外編碼，
+                由 id 即可找回所屬分片 (單檔模式時與資料庫 id 相同)
+        """
         self.db_path = db_path
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.writer: Optional[WriteQueue] = None
+        # 唯讀連線 (WAL 模式下讀取不會阻塞寫入)，供排行榜等查詢使用
+        self.reader: Optional[aiosqlite.Connection] = None
+    
+    # ==================== 連線與寫入 ====================
+    
+    async def start(self) -> None:
+        """
+        開啟常駐寫入與唯讀連線 (需在 init_db 之後)
+        """
+        if self.writer is None:
+            self.writer = WriteQueue(self.db_path)
+            await self.writer.start()
+        if self.reader is None:
+            self.reader = await aiosqlite.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self.reader.row_factory = aiosqlite.Row
+    
+    async def close(self) -> None:
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+        if self.reader is not None:
+            await self.reader.close()
+            self.reader = None
+    
+    async def _write(self, op: WriteOp) -> Any:
+        if self.writer is not None:
+            return await self.writer.submit(op)
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            result = await op(db)
+            await db.commit()
+            return result
+    
+    def _to_global(self, local_id: int) -> int:
+        return local_id * self.shard_count + self.shard_index
+    
+    def _to_local(self, record_id: int) -> int:
+        return record_id // self.shard_count
     
     async def init_db(self):
         """
@@ -27,10 +210,17 @@ class GhostRepository:
                     mention_time TIMESTAMP NOT NULL,
                     responded BOOLEAN DEFAULT FALSE,
                     response_time TIMESTAMP,
-                    is_ghost BOOLEAN DEFAULT FALSE
+                    is_ghost BOOLEAN DEFAULT FALSE,
+                    updated_at TIMESTAMP
                 )
             """)
             
+            # 舊版資料庫沒有 updated_at 欄位 (重啟時以快照對帳用)
+            cursor = await db.execute("PRAGMA table_info(mentions)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            if "updated_at" not in columns:
+                await db.execute("ALTER TABLE mentions ADD COLUMN updated_at TIMESTAMP")
+            
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS ghost_stats (
                     user_id INTEGER NOT NULL,
@@ -43,12 +233,74 @@ class GhostRepository:
                 )
             """)
             
+            # 回應延遲統計 (舊版資料庫沒有這些欄位)
+            cursor = await db.execute("PRAGMA table_info(ghost_stats)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            for column, definition in (
+                ("latency_count", "INTEGER DEFAULT 0"),
+                ("latency_sum", "REAL DEFAULT 0.0"),
+                ("latency_p50", "REAL"),
+                ("latency_p90", "REAL"),
+                ("latency_sketch", "TEXT")
+            ):
+                if column not in columns:
+                    await db.execute(f"ALTER TABLE ghost_stats ADD COLUMN {column} {definition}")
+            
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS participants (
+                    user_id INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL,
+                    joined_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (user_id, guild_id)
+                )
+            """)
+            
+            # 分片設定寫入檔案，避免以不同的分片數開啟造成 record_id 對不上
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            await db.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('shard', ?)",
+                (f"{self.shard_index}/{self.shard_count}",)
+            )
+            cursor = await db.execute("SELECT value FROM meta WHERE key = 'shard'")
+            stored = (await cursor.fetchone())[0]
+            if stored != f"{self.shard_index}/{self.shard_count}":
+                raise RuntimeError(
+                    f"{self.db_path} 的分片設定為 {stored}，與目前設定 "
+                    f"{self.shard_index}/{self.shard_count} 不符 (請使用 tools/split_database.py 重新分片)"
+                )
+            
             # 建立索引以提升查詢效能
             await db.execute("""
                 CREATE INDEX IF NOT EXISTS idx_mentions_pending 
                 ON mentions(mentioned_user_id, channel_id, responded)
             """)
             
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mentions_pending_guild 
+                ON mentions(mentioned_user_id, guild_id, responded)
+            """)
+            
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mentions_updated 
+                ON mentions(updated_at)
+            """)
+            
+            # 排程視窗載入用 (只索引未結案的 mention，依 mention_time 取出即將到期的)
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mentions_open_time 
+                ON mentions(mention_time) WHERE responded = FALSE AND is_ghost = FALSE
+            """)
+            
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mentions_history 
+                ON mentions(mentioned_user_id, guild_id, mention_time DESC, id DESC)
+            """)
+            
             await db.execute("""
                 CREATE INDEX IF NOT EXISTS idx_ghost_stats_guild 
                 ON ghost_stats(guild_id, ghost_count DESC)
@@ -63,23 +315,24 @@ class GhostRepository:
         新增一筆 mention 紀錄
         返回: 新建立的 record_id
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             # 1. 插入 mention 紀錄
             cursor = await db.execute("""
                 INSERT INTO mentions (
                     guild_id, channel_id, message_id,
-                    mentioned_user_id, mentioner_user_id, mention_time
-                ) VALUES (?, ?, ?, ?, ?, ?)
+                    mentioned_user_id, mentioner_user_id, mention_time, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (
                 record.guild_id,
                 record.channel_id,
                 record.message_id,
                 record.mentioned_user_id,
                 record.mentioner_user_id,
-                record.mention_time.isoformat()
+                record.mention_time.isoformat(),
+                datetime.now().isoformat()
             ))
             
-            record_id = cursor.lastrowid
+            record_id = self._to_global(cursor.lastrowid)
             
             # 2. 更新統計
             await db.execute("""
@@ -95,9 +348,50 @@ class GhostRepository:
                 datetime.now().isoformat()
             ))
             
-            await db.commit()
-            
             return record_id
+        
+        return await self._write(op)
+    
+    async def add_mentions(self, records: List[MentionRecord]) -> List[int]:
+        """
+        在單一交易中新增多筆 mention 紀錄 (同一則訊息的多個 mention)
+        返回: 依序對應的 record_id
+        """
+        if not records:
+            return []
+        
+        async def op(db):
+            now = datetime.now().isoformat()
+            record_ids = []
+            
+            for record in records:
+                cursor = await db.execute("""
+                    INSERT INTO mentions (
+                        guild_id, channel_id, message_id,
+                        mentioned_user_id, mentioner_user_id, mention_time, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    record.guild_id,
+                    record.channel_id,
+                    record.message_id,
+                    record.mentioned_user_id,
+                    record.mentioner_user_id,
+                    record.mention_time.isoformat(),
+                    now
+                ))
+                record_ids.append(self._to_global(cursor.lastrowid))
+            
+            await db.executemany("""
+                INSERT INTO ghost_stats (user_id, guild_id, mention_count, last_updated)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                    mention_count = mention_count + 1,
+                    last_updated = ?
+            """, [(record.mentioned_user_id, record.guild_id, now, now) for record in records])
+            
+            return record_ids
+        
+        return await self._write(op)
     
     async def get_mention_by_id(self, record_id: int) -> Optional[MentionRecord]:
         """
@@ -107,7 +401,7 @@ class GhostRepository:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 "SELECT * FROM mentions WHERE id = ?", 
-                (record_id,)
+                (self._to_local(record_id),)
             )
             row = await cursor.fetchone()
             
@@ -119,10 +413,12 @@ class GhostRepository:
     async def get_pending_mentions(
         self, 
         user_id: int, 
-        channel_id: int
+        channel_id: int,
+        guild_id: Optional[int] = None
     ) -> List[MentionRecord]:
         """
         取得某使用者在某頻道中尚未回應的 mention
+        (guild_id 僅供分片模式選擇分片)
         """
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
@@ -138,33 +434,141 @@ class GhostRepository:
             rows = await cursor.fetchall()
             return [self._row_to_mention_record(row) for row in rows]
     
-    async def mark_as_responded(self, record_id: int, response_time: datetime):
+    async def get_pending_mentions_in_guild(
+        self, 
+        user_id: int, 
+        guild_id: int
+    ) -> List[MentionRecord]:
         """
-        標記為已回應
+        取得某使用者在整個伺服器中尚未回應的 mention
+        (判定範圍為 thread / guild 時使用)
         """
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM mentions
+                WHERE mentioned_user_id = ?
+                  AND guild_id = ?
+                  AND responded = FALSE
+                  AND is_ghost = FALSE
+                ORDER BY mention_time DESC
+            """, (user_id, guild_id))
             
+            rows = await cursor.fetchall()
+            return [self._row_to_mention_record(row) for row in rows]
+    
+    async def get_pending_mentions_for_users(
+        self,
+        guild_id: int,
+        user_ids: List[int],
+        until: Optional[datetime] = None
+    ) -> List[MentionRecord]:
+        """
+        一次取得多位使用者在某伺服器尚未回應的 mention (語音回應批次判定用)
+        
+        Args:
+            until: 只取 mention_time 不晚於此時間的紀錄
+        """
+        if not user_ids:
+            return []
+        
+        placeholders = ", ".join("?" for _ in user_ids)
+        query = f"""
+            SELECT * FROM mentions
+            WHERE guild_id = ?
+              AND mentioned_user_id IN ({placeholders})
+              AND responded = FALSE
+              AND is_ghost = FALSE
+        """
+        params: list = [guild_id, *user_ids]
+        if until is not None:
+            query += " AND mention_time <= ?"
+            params.append(until.isoformat())
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [self._row_to_mention_record(row) for row in rows]
+    
+    async def get_mention_history(
+        self,
+        user_id: int,
+        guild_id: int,
+        limit: int = 10,
+        before: Optional[MentionRecord] = None,
+        ghost_only: bool = False
+    ) -> List[MentionRecord]:
+        """
+        取得使用者在伺服器中的 mention 紀錄 (新到舊)
+        
+        以 (mention_time, id) 做 keyset 分頁，每一頁的成本與頁數無關
+        
+        Args:
+            before: 上一頁的最後一筆 (None 則從最新開始)
+            ghost_only: 只列出詐欺紀錄
+        """
+        conditions = ["mentioned_user_id = ?", "guild_id = ?"]
+        params: list = [user_id, guild_id]
+        if ghost_only:
+            conditions.append("is_ghost = TRUE")
+        if before is not None:
+            conditions.append("(mention_time < ? OR (mention_time = ? AND id < ?))")
+            cursor_time = before.mention_time.isoformat()
+            params += [cursor_time, cursor_time, self._to_local(before.id)]
+        params.append(limit)
+        
+        query = f"""
+            SELECT * FROM mentions
+            WHERE {" AND ".join(conditions)}
+            ORDER BY mention_time DESC, id DESC
+            LIMIT ?
+        """
+        if self.reader is not None:
+            cursor = await self.reader.execute(query, params)
+            rows = await cursor.fetchall()
+            await cursor.close()
+            return [self._row_to_mention_record(row) for row in rows]
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [self._row_to_mention_record(row) for row in rows]
+    
+    async def mark_as_responded(self, record_id: int, response_time: datetime) -> bool:
+        """
+        標記為已回應
+        返回: 是否確實標記 (已回應或已判定詐欺的紀錄不重複計算)
+        """
+        local_id = self._to_local(record_id)
+        
+        async def op(db):
             # 1. 先取得 mention 資訊 (需要 user_id 和 guild_id)
             cursor = await db.execute(
-                "SELECT mentioned_user_id, guild_id FROM mentions WHERE id = ?",
-                (record_id,)
+                "SELECT mentioned_user_id, guild_id, mention_time FROM mentions WHERE id = ?",
+                (local_id,)
             )
             row = await cursor.fetchone()
             
             if not row:
-                return  # 找不到紀錄
+                return False  # 找不到紀錄
             
             user_id = row["mentioned_user_id"]
             guild_id = row["guild_id"]
             
-            # 2. 更新 mention 狀態
-            await db.execute("""
+            # 2. 更新 mention 狀態 (只更新未結案的紀錄; 訊息與語音可能同時標記同一筆)
+            cursor = await db.execute("""
                 UPDATE mentions
                 SET responded = TRUE,
-                    response_time = ?
+                    response_time = ?,
+                    updated_at = ?
                 WHERE id = ?
-            """, (response_time.isoformat(), record_id))
+                  AND responded = FALSE
+                  AND is_ghost = FALSE
+            """, (response_time.isoformat(), datetime.now().isoformat(), local_id))
+            if cursor.rowcount == 0:
+                return False
             
             # 3. 重新計算回應率
             # 計算已回應的次數
@@ -198,30 +602,109 @@ class GhostRepository:
                     user_id, 
                     guild_id
                 ))
+                
+                # 4. 更新回應延遲 sketch (只讀寫這一列，與歷史 mention 數量無關)
+                latency = (response_time - datetime.fromisoformat(row["mention_time"])).total_seconds()
+                await self._record_latency(db, user_id, guild_id, latency)
             
-            await db.commit()
+            return True
+        
+        return await self._write(op)
     
-    async def mark_as_ghost(self, record_id: int):
+    async def mark_as_ghost(self, record_id: int) -> bool:
         """
         標記為詐欺 (timeout 時觸發)
+        返回: 是否確實標記 (False 表示已回應或已被標記，呼叫端不應再計入詐欺次數)
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            # 只更新尚未被標記的紀錄
-            await db.execute("""
+        local_id = self._to_local(record_id)
+        
+        async def op(db):
+            # 只更新尚未結案的紀錄
+            cursor = await db.execute("""
                 UPDATE mentions
-                SET is_ghost = TRUE
+                SET is_ghost = TRUE,
+                    updated_at = ?
                 WHERE id = ?
                   AND is_ghost = FALSE
-            """, (record_id,))
-            await db.commit()
+                  AND responded = FALSE
+            """, (datetime.now().isoformat(), local_id))
+            return cursor.rowcount > 0
+        
+        return await self._write(op)
     
-    # ==================== 統計資料操作 ====================
+    # ==================== 參加者操作 ====================
+    
+    async def add_participant(self, user_id: int, guild_id: int) -> bool:
+        """
+        加入追蹤名單
+        返回: 是否為新加入 (False 表示原本就在名單中)
+        """
+        async def op(db):
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO participants (user_id, guild_id, joined_at)
+                VALUES (?, ?, ?)
+            """, (user_id, guild_id, datetime.now().isoformat()))
+            return cursor.rowcount > 0
+        
+        return await self._write(op)
     
-    async def increment_ghost_count(self, user_id: int, guild_id: int):
+    async def remove_participant(self, user_id: int, guild_id: int) -> bool:
         """
-        增加詐欺計數 (當 timeout 觸發時)
+        退出追蹤名單
+        返回: 是否確實移除 (False 表示原本就不在名單中)
+        """
+        async def op(db):
+            cursor = await db.execute("""
+                DELETE FROM participants
+                WHERE user_id = ? AND guild_id = ?
+            """, (user_id, guild_id))
+            return cursor.rowcount > 0
+        
+        return await self._write(op)
+    
+    async def get_all_participants(self) -> List[tuple]:
+        """
+        取得所有參加者 (guild_id, user_id)，啟動時載入記憶體用
         """
         async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("SELECT guild_id, user_id FROM participants")
+            return await cursor.fetchall()
+    
+    # ==================== 統計資料操作 ====================
+    
+    @staticmethod
+    async def _record_latency(db, user_id: int, guild_id: int, latency: float) -> None:
+        cursor = await db.execute("""
+            SELECT latency_sketch FROM ghost_stats
+            WHERE user_id = ? AND guild_id = ?
+        """, (user_id, guild_id))
+        row = await cursor.fetchone()
+        
+        sketch = LatencySketch.from_json(row[0] if row else None)
+        sketch.add(max(latency, 0.0))
+        await db.execute("""
+            UPDATE ghost_stats
+            SET latency_count = ?,
+                latency_sum = ?,
+                latency_p50 = ?,
+                latency_p90 = ?,
+                latency_sketch = ?
+            WHERE user_id = ? AND guild_id = ?
+        """, (
+            sketch.count,
+            sketch.total,
+            sketch.quantile(0.5),
+            sketch.quantile(0.9),
+            sketch.to_json(),
+            user_id,
+            guild_id
+        ))
+    
+    async def increment_ghost_count(self, user_id: int, guild_id: int) -> int:
+        """
+        增加詐欺計數 (當 timeout 觸發時)，返回更新後的 ghost_count
+        """
+        async def op(db):
             # 1. 增加 ghost_count
             await db.execute("""
                 INSERT INTO ghost_stats (user_id, guild_id, ghost_count, last_updated)
@@ -246,7 +729,7 @@ class GhostRepository:
             responded_count = (await cursor.fetchone())[0]
             
             cursor = await db.execute("""
-                SELECT mention_count FROM ghost_stats
+                SELECT mention_count, ghost_count FROM ghost_stats
                 WHERE user_id = ? AND guild_id = ?
             """, (user_id, guild_id))
             row = await cursor.fetchone()
@@ -261,7 +744,9 @@ class GhostRepository:
                     WHERE user_id = ? AND guild_id = ?
                 """, (response_rate, user_id, guild_id))
             
-            await db.commit()
+            return row[1] if row else 0
+        
+        return await self._write(op)
     
     async def get_user_stats(self, user_id: int, guild_id: int) -> Optional[GhostStats]:
         """
@@ -297,11 +782,76 @@ class GhostRepository:
             rows = await cursor.fetchall()
             return [self._row_to_ghost_stats(row) for row in rows]
     
+    async def get_guild_stats(self, guild_id: int) -> List[GhostStats]:
+        """
+        取得整個伺服器的統計 (讀取模型快照用，優先使用唯讀連線)
+        """
+        query = """
+            SELECT * FROM ghost_stats
+            WHERE guild_id = ?
+              AND mention_count > 0
+            ORDER BY ghost_count DESC, response_rate ASC
+        """
+        if self.reader is not None:
+            cursor = await self.reader.execute(query, (guild_id,))
+            rows = await cursor.fetchall()
+            await cursor.close()
+            return [self._row_to_ghost_stats(row) for row in rows]
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, (guild_id,))
+            rows = await cursor.fetchall()
+            return [self._row_to_ghost_stats(row) for row in rows]
+    
+    async def get_user_rank(self, user_id: int, guild_id: int) -> Optional[Tuple[int, int]]:
+        """
+        以 SQL 計算名次 (排名索引尚未載入該伺服器時使用)
+        
+        Returns:
+            (名次, 上榜人數)；同詐欺次數者同名次，未上榜則為 None
+        """
+        query = """
+            SELECT
+                (SELECT COUNT(*) FROM ghost_stats
+                 WHERE guild_id = s.guild_id AND mention_count > 0 AND ghost_count > s.ghost_count) + 1,
+                (SELECT COUNT(*) FROM ghost_stats
+                 WHERE guild_id = s.guild_id AND mention_count > 0)
+            FROM ghost_stats s
+            WHERE s.user_id = ? AND s.guild_id = ? AND s.mention_count > 0
+        """
+        if self.reader is not None:
+            cursor = await self.reader.execute(query, (user_id, guild_id))
+            row = await cursor.fetchone()
+            await cursor.close()
+        else:
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute(query, (user_id, guild_id))
+                row = await cursor.fetchone()
+        
+        return (row[0], row[1]) if row else None
+    
+    async def get_global_leaderboard(self, limit: int = 10) -> List[GhostStats]:
+        """
+        取得跨伺服器的排行榜 (管理用)
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM ghost_stats
+                WHERE mention_count > 0
+                ORDER BY ghost_count DESC, response_rate ASC
+                LIMIT ?
+            """, (limit,))
+            
+            rows = await cursor.fetchall()
+            return [self._row_to_ghost_stats(row) for row in rows]
+    
     async def reset_user_stats(self, user_id: int, guild_id: int):
         """
         重置特定使用者的統計
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             await db.execute("""
                 DELETE FROM ghost_stats
                 WHERE user_id = ? AND guild_id = ?
@@ -311,17 +861,18 @@ class GhostRepository:
                 DELETE FROM mentions
                 WHERE mentioned_user_id = ? AND guild_id = ?
             """, (user_id, guild_id))
-            
-            await db.commit()
+        
+        return await self._write(op)
     
     async def reset_guild_stats(self, guild_id: int):
         """
         重置整個伺服器的統計
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db):
             await db.execute("DELETE FROM ghost_stats WHERE guild_id = ?", (guild_id,))
             await db.execute("DELETE FROM mentions WHERE guild_id = ?", (guild_id,))
-            await db.commit()
+        
+        return await self._write(op)
     
     async def get_all_pending_mentions(self) -> List[MentionRecord]:
         """
@@ -338,15 +889,95 @@ class GhostRepository:
             rows = await cursor.fetchall()
             return [self._row_to_mention_record(row) for row in rows]
     
+    async def get_mentions_changed_since(self, since: datetime) -> List[MentionRecord]:
+        """
+        取得 since 之後有變動 (新增、回應、判定詐欺) 的 mention
+        用於以排程快照重啟時對帳
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM mentions
+                WHERE updated_at >= ?
+                ORDER BY id ASC
+            """, (since.isoformat(),))
+            rows = await cursor.fetchall()
+            return [self._row_to_mention_record(row) for row in rows]
+    
+    async def iter_pending_mentions(self, chunk_size: int = 500) -> AsyncIterator[List[MentionRecord]]:
+        """
+        分批取得所有 pending mention (以 id 做 keyset 分頁，避免一次載入全部)
+        """
+        last_id = 0
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            while True:
+                cursor = await db.execute("""
+                    SELECT * FROM mentions
+                    WHERE responded = FALSE
+                      AND is_ghost = FALSE
+                      AND id > ?
+                    ORDER BY id ASC
+                    LIMIT ?
+                """, (last_id, chunk_size))
+                rows = await cursor.fetchall()
+                if not rows:
+                    return
+                
+                last_id = rows[-1]["id"]
+                yield [self._row_to_mention_record(row) for row in rows]
+    
+    async def get_open_mentions_between(
+        self,
+        after: Optional[datetime],
+        until: datetime
+    ) -> List[MentionRecord]:
+        """
+        取得 mention_time 在 (after, until] 之間仍未結案的 mention (排程視窗載入用)
+        
+        Args:
+            after: 下界 (None 則包含所有更早的，啟動時使用)
+        """
+        query = """
+            SELECT * FROM mentions
+            WHERE responded = FALSE
+              AND is_ghost = FALSE
+              AND mention_time <= ?
+        """
+        params = [until.isoformat()]
+        if after is not None:
+            query += " AND mention_time > ?"
+            params.append(after.isoformat())
+        query += " ORDER BY mention_time ASC"
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [self._row_to_mention_record(row) for row in rows]
+    
+    async def count_open_mentions_by_guild(self, after: datetime) -> Dict[int, int]:
+        """
+        各伺服器 mention_time 晚於 after 的未結案 mention 數 (尚未載入排程的部分)
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT guild_id, COUNT(*) FROM mentions
+                WHERE responded = FALSE
+                  AND is_ghost = FALSE
+                  AND mention_time > ?
+                GROUP BY guild_id
+            """, (after.isoformat(),))
+            return {guild_id: count for guild_id, count in await cursor.fetchall()}
+    
     # ==================== 內部輔助方法 ====================
     
-    @staticmethod
-    def _row_to_mention_record(row) -> MentionRecord:
+    def _row_to_mention_record(self, row) -> MentionRecord:
         """
-        將資料庫 Row 轉換為 MentionRecord
+        將資料庫 Row 轉換為 MentionRecord (id 轉為對外編碼)
         """
         return MentionRecord(
-            id=row["id"],
+            id=self._to_global(row["id"]),
             guild_id=row["guild_id"],
             channel_id=row["channel_id"],
             message_id=row["message_id"],
@@ -369,7 +1000,11 @@ class GhostRepository:
             ghost_count=row["ghost_count"],
             mention_count=row["mention_count"],
             response_rate=row["response_rate"],
-            last_updated=datetime.fromisoformat(row["last_updated"]) if row["last_updated"] else None
+            last_updated=datetime.fromisoformat(row["last_updated"]) if row["last_updated"] else None,
+            latency_count=row["latency_count"] or 0,
+            latency_mean=row["latency_sum"] / row["latency_count"] if row["latency_count"] else None,
+            latency_p50=row["latency_p50"],
+            latency_p90=row["latency_p90"]
         )
     
         
\ No newline at end of file
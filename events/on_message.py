@@ -3,10 +3,13 @@
 職責:
 1. 偵測新訊息是否包含 mention → 建立追蹤
 2. 偵測新訊息是否為回應 → 取消 timeout
+3. 偵測對 mention 訊息的表情反應 → 取消 timeout (選用)
 """
 from datetime import datetime, timedelta
 from discord.ext import commands
-from discord import Message
+from discord import Member, Message, RawReactionActionEvent
+from typing import List
+from core.admission import AdmissionController
 from core.tracker import MentionTracker
 from core.evaluator import ResponseEvaluator
 from core.scheduler import TimeoutScheduler
@@ -18,31 +21,127 @@ class MessageEvents(commands.Cog):
         self.tracker: MentionTracker = bot.tracker
         self.evaluator: ResponseEvaluator = bot.evaluator
         self.scheduler: TimeoutScheduler = bot.scheduler
+        self.admission: AdmissionController = bot.admission
     
     @commands.Cog.listener()
     async def on_message(self, message: Message):
-        if message.author.bot:
+        if message.author.bot or not self.bot.lifecycle.accepting:
             return
         
         if message.content.startswith("/"):
             return
         
-
-        # 這邊之後會整合到 tracker.py
-        # 1. 檢查是否有新的 mention
-        if message.mentions:
-            records = await self.tracker.track_mentions(message)
+        # 記下顯示名稱 (lean 模式下 /rank 不需再向 API 查詢)
+        self.bot.names.remember(message.author)
+        for mentioned in message.mentions:
+            self.bot.names.remember(mentioned)
+        
+        # 啟動還原尚未完成: 先暫存，完成後依序套用
+        if not self.bot.startup.is_ready:
+            await self.bot.startup.defer(self.enqueue_message, message)
+            return
+        
+        await self.enqueue_message(message)
+    
+    async def enqueue_message(self, message: Message):
+        """
+        經 admission control 篩選 mention 後排入該伺服器的工作佇列
+        """
+        if message.guild is None:
+            return
+        
+        targets = []
+        # 佇列已滿時整則訊息會被捨棄，不先佔用放行額度
+        if message.mentions and not self.admission.is_backlogged(message.guild.id):
+            targets = self.admission.admit(
+                message.guild.id,
+                message.author.id,
+                self.tracker.trackable_mentions(message)
+            )
+        
+        # 不建立 mention 也不可能回應任何 mention 的訊息不排入佇列
+        if not targets and not self._may_respond(message.guild.id, message.author.id):
+            return
+        
+        self.admission.submit(
+            message.guild.id, self._run, self.handle_message, message, targets,
+            mentions=len(targets)
+        )
+    
+    def _may_respond(self, guild_id: int, user_id: int) -> bool:
+        """
+        使用者在此伺服器可能有進行中的 mention
+        (記憶體中有計時、有視窗外尚未載入的 mention，或佇列中還有待建立的 mention)
+        """
+        return (
+            self.scheduler.has_open(guild_id, user_id)
+            or self.scheduler.far_open.get(guild_id, 0) > 0
+            or self.admission.queued.get(guild_id, 0) > 0
+        )
+    
+    async def _run(self, handler, *args):
+        async with self.bot.lifecycle.track(), self.bot.profiler.track(handler.__name__):
+            await handler(*args)
+    
+    async def handle_message(self, message: Message, targets: List[Member]):
+        """
+        建立新 mention 的追蹤並判定是否回應了之前的 mention
+        """
+        # 1. 為放行的 mention 建立追蹤
+        if targets:
+            records = await self.tracker.track_mentions(message, targets)
             for record in records:
                 self.scheduler.schedule_timeout(record)
         
         # 2. 檢查是否回應了之前的 mention
+        if self.evaluator.needs_guild_candidates:
+            pending = await self.bot.repository.get_pending_mentions_in_guild(
+                user_id=message.author.id,
+                guild_id=message.guild.id
+            )
+        else:
+            pending = await self.bot.repository.get_pending_mentions(
+                user_id=message.author.id,
+                channel_id=message.channel.id,
+                guild_id=message.guild.id
+            )
+        
+        for mention_record in self.evaluator.evaluate(message, pending):
+            await self.bot.repository.mark_as_responded(mention_record.id, datetime.now())
+            self.scheduler.cancel_timeout(mention_record.id)
+    
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
+        """
+        對 mention 訊息按表情反應 (需在 ghost_rules 開啟 allow_reaction)
+        """
+        if not self.evaluator.allows_reaction or payload.guild_id is None or not self.bot.lifecycle.accepting:
+            return
+        
+        if not self.bot.startup.is_ready:
+            await self.bot.startup.defer(self.enqueue_reaction, payload)
+            return
+        
+        await self.enqueue_reaction(payload)
+    
+    async def enqueue_reaction(self, payload: RawReactionActionEvent):
+        if not self._may_respond(payload.guild_id, payload.user_id):
+            return
+        # 與訊息排入同一佇列，確保同伺服器內的處理順序
+        self.admission.submit(payload.guild_id, self._run, self.handle_reaction, payload)
+    
+    async def handle_reaction(self, payload: RawReactionActionEvent):
+        """
+        判定表情反應是否回應了之前的 mention
+        """
         pending = await self.bot.repository.get_pending_mentions(
-            user_id=message.author.id,
-            channel_id=message.channel.id
+            user_id=payload.user_id,
+            channel_id=payload.channel_id,
+            guild_id=payload.guild_id
         )
         
         for mention_record in pending:
-            if self.evaluator.is_valid_response(message, mention_record):
+            if self.evaluator.is_valid_reaction(payload.user_id, payload.message_id, mention_record):
                 await self.bot.repository.mark_as_responded(mention_record.id, datetime.now())
                 self.scheduler.cancel_timeout(mention_record.id)
 
@@ -1,16 +1,19 @@
 """
 Bot 啟動事件
 """
+import logging
 from discord.ext import commands
 
+logger = logging.getLogger("MentionDodger")
+
 class ReadyEvents(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f"✅ {self.bot.user} 已上線!")
-        print(f"📊 已加入 {len(self.bot.guilds)} 個伺服器")
+        logger.info("✅ %s 已上線!", self.bot.user)
+        logger.info("📊 已加入 %d 個伺服器", len(self.bot.guilds))
 
 async def setup(bot):
     await bot.add_cog(ReadyEvents(bot))
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+語音狀態事件監聽
+職責: 偵測使用者加入語音頻道 → 交給 VoiceResponder 合併後批次判定是否回應了 mention
+
+靜音、拒聽、直播等狀態切換 (頻道未改變) 與離開頻道在這裡直接丟棄
+"""
+from datetime import datetime
+from discord.ext import commands
+from discord import Member, VoiceState
+from core.voice import VoiceResponder
+
+class VoiceStateEvents(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.voice: VoiceResponder = bot.voice
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: Member, before: VoiceState, after: VoiceState):
+        if member.bot or not self.bot.lifecycle.accepting:
+            return
+
+        # 只處理進入新頻道 (包含從其他頻道移動過來)
+        channel = after.channel
+        if channel is None or (before.channel is not None and before.channel.id == channel.id):
+            return
+
+        guild = member.guild
+        if self.voice.ignore_afk_channel and guild.afk_channel is not None and channel.id == guild.afk_channel.id:
+            return
+
+        joined_at = datetime.now()
+        # 啟動還原尚未完成: 記憶體索引還不完整，先暫存
+        if not self.bot.startup.is_ready:
+            await self.bot.startup.defer(self.submit, guild.id, member.id, joined_at)
+            return
+
+        await self.submit(guild.id, member.id, joined_at)
+
+    async def submit(self, guild_id: int, user_id: int, joined_at: datetime):
+        if self.voice.wants(guild_id, user_id):
+            self.voice.submit(guild_id, user_id, joined_at)
+
+async def setup(bot):
+    await bot.add_cog(VoiceStateEvents(bot))
@@ -0,0 +1,7 @@
+"""
+pytest 設定: 以專案根目錄為 import 起點 (與 python bot.py 相同)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+"""
+core/admission.py: 每個伺服器佇列的工作數上限
+"""
+import asyncio
+
+from core.admission import AdmissionController
+
+
+def test_backlogged_guild_sheds_jobs():
+    async def main():
+        admission = AdmissionController(lambda guild_id: 0, max_jobs_per_guild=2)
+        done = []
+
+        async def job(value):
+            done.append(value)
+
+        submitted = [admission.submit(1, job, i, mentions=i) for i in range(4)]
+        # 其他伺服器不受影響
+        submitted.append(admission.submit(2, job, "other"))
+        admission.start()
+        await admission.drain()
+        await admission.stop()
+        return submitted, done, admission
+
+    submitted, done, admission = asyncio.run(main())
+    assert submitted == [True, True, False, False, True]
+    assert sorted(map(str, done)) == ["0", "1", "other"]
+    assert admission.stats["shed_backlog"] == 2
+    assert admission.stats["shed_backlog_mentions"] == 5
+    assert admission.queued == {}
+    assert admission.get_queue_depth() == 0
@@ -0,0 +1,112 @@
+"""
+core/evaluator.py: 編譯後的判定規則
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from core.evaluator import ResponseEvaluator, _is_emoji_only
+from database.models import MentionRecord
+
+GUILD, CHANNEL, THREAD, OTHER = 1, 10, 11, 12
+USER = 100
+
+
+def _message(content="ok thanks", channel_id=CHANNEL, parent_id=None, reply_to=None, author_id=USER):
+    return SimpleNamespace(
+        content=content,
+        author=SimpleNamespace(id=author_id),
+        guild=SimpleNamespace(id=GUILD),
+        channel=SimpleNamespace(id=channel_id, parent_id=parent_id),
+        reference=SimpleNamespace(message_id=reply_to) if reply_to is not None else None
+    )
+
+
+def _record(record_id, channel_id=CHANNEL, message_id=None, user_id=USER):
+    return MentionRecord(
+        id=record_id, guild_id=GUILD, channel_id=channel_id,
+        message_id=message_id or record_id, mentioned_user_id=user_id
+    )
+
+
+def _evaluator(**rules):
+    return ResponseEvaluator.from_config({"ghost_rules": rules})
+
+
+def _ids(records):
+    return sorted(record.id for record in records)
+
+
+def test_min_length_and_author():
+    evaluator = _evaluator(valid_response_min_length=3, allow_emoji_only=False)
+    candidates = [_record(1), _record(2, user_id=999)]
+    assert _ids(evaluator.evaluate(_message("hey"), candidates)) == [1]
+    assert evaluator.evaluate(_message("hi"), candidates) == []
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("👍", True),
+    ("👍🏽 ❤️", True),
+    ("<:pog:123456> <a:dance:42>", True),
+    ("👨‍👩‍👧", True),
+    ("ok 👍", False),
+    ("", False),
+])
+def test_emoji_only_detection(content, expected):
+    assert _is_emoji_only(content) is expected
+
+
+def test_emoji_only_toggle():
+    allowed = _evaluator(valid_response_min_length=5, allow_emoji_only=True)
+    denied = _evaluator(valid_response_min_length=1, allow_emoji_only=False)
+    assert _ids(allowed.evaluate(_message("👍"), [_record(1)])) == [1]
+    assert denied.evaluate(_message("👍"), [_record(1)]) == []
+
+
+@pytest.mark.parametrize("scope, expected", [
+    ("channel", [1]),
+    ("thread", [1, 2]),
+    ("guild", [1, 2, 3]),
+])
+def test_scopes(scope, expected):
+    evaluator = _evaluator(response_scope=scope)
+    # 在 CHANNEL 底下的討論串 THREAD 中回應
+    message = _message(channel_id=THREAD, parent_id=CHANNEL)
+    candidates = [_record(1, channel_id=THREAD), _record(2, channel_id=CHANNEL), _record(3, channel_id=OTHER)]
+    assert _ids(evaluator.evaluate(message, candidates)) == expected
+    assert evaluator.needs_guild_candidates is (scope != "channel")
+
+
+def test_require_reply_matches_only_the_replied_mention():
+    evaluator = _evaluator(require_reply=True)
+    candidates = [_record(1, message_id=500), _record(2, message_id=501)]
+    assert evaluator.evaluate(_message(), candidates) == []
+    assert _ids(evaluator.evaluate(_message(reply_to=501), candidates)) == [2]
+
+
+def test_channel_override_applies_by_mention_channel():
+    evaluator = _evaluator(
+        valid_response_min_length=1,
+        response_scope="guild",
+        channel_overrides={OTHER: {"valid_response_min_length": 10, "allow_reaction": True}}
+    )
+    candidates = [_record(1, channel_id=CHANNEL), _record(2, channel_id=OTHER)]
+    # OTHER 的覆寫要求較長的回應，其餘規則 (scope) 沿用預設
+    assert _ids(evaluator.evaluate(_message("short"), candidates)) == [1]
+    assert _ids(evaluator.evaluate(_message("a much longer reply"), candidates)) == [1, 2]
+
+    assert evaluator.allows_reaction
+    assert evaluator.is_valid_reaction(USER, 2, candidates[1])
+    assert not evaluator.is_valid_reaction(USER, 1, candidates[0])
+
+
+def test_invalid_scope_rejected():
+    with pytest.raises(ValueError):
+        _evaluator(response_scope="planet")
+
+
+def test_apply_swaps_rules():
+    evaluator = _evaluator(valid_response_min_length=1)
+    evaluator.apply(_evaluator(valid_response_min_length=20, allow_emoji_only=False))
+    assert evaluator.min_length == 20
+    assert evaluator.evaluate(_message("not long enough"), [_record(1)]) == []
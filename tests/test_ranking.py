@@ -0,0 +1,94 @@
+"""
+core/ranking.py: Fenwick tree、同分同名次與載入期間的變動
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+from core.ranking import FenwickTree, GuildRanking, RankIndex
+
+
+def _brute_rank(ghost_counts: dict, user_id: int):
+    mine = ghost_counts[user_id]
+    return 1 + sum(1 for count in ghost_counts.values() if count > mine), len(ghost_counts)
+
+
+def test_fenwick_prefix_and_count():
+    tree = FenwickTree(size=8)
+    for index, delta in [(0, 2), (3, 1), (3, 4), (7, 1)]:
+        tree.add(index, delta)
+    assert tree.count(3) == 5
+    assert tree.prefix(2) == 2
+    assert tree.prefix(7) == 8
+    # 超出範圍的查詢視為全部
+    assert tree.prefix(100) == 8
+
+
+def test_fenwick_grows_and_keeps_counts():
+    tree = FenwickTree(size=4)
+    tree.add(1, 3)
+    tree.add(2, 1)
+    tree.add(37, 2)
+    assert tree.size >= 38
+    assert [tree.count(i) for i in (1, 2, 37)] == [3, 1, 2]
+    assert tree.prefix(36) == 4
+    assert tree.prefix(37) == 6
+
+
+def test_ties_share_rank():
+    ranking = GuildRanking([(1, 5), (2, 5), (3, 2), (4, 0)])
+    assert ranking.rank(1) == (1, 4)
+    assert ranking.rank(2) == (1, 4)
+    assert ranking.rank(3) == (3, 4)
+    assert ranking.rank(4) == (4, 4)
+    assert ranking.rank(99) is None
+
+
+def test_updates_move_rank_and_are_idempotent():
+    ranking = GuildRanking([(1, 1), (2, 3)])
+    ranking.set(1, 4)
+    ranking.set(1, 4)
+    assert ranking.rank(1) == (1, 2)
+    assert ranking.rank(2) == (2, 2)
+    assert ranking.tree.prefix(1000) == 2
+
+
+def test_matches_brute_force_with_growth():
+    rng = random.Random(7)
+    ranking = GuildRanking()
+    counts = {}
+    for _ in range(2000):
+        user_id = rng.randrange(200)
+        # 偶爾出現遠大於初始大小的次數，觸發擴充
+        count = rng.randrange(500) if rng.random() < 0.05 else rng.randrange(20)
+        ranking.set(user_id, count)
+        counts[user_id] = count
+    for user_id in counts:
+        assert ranking.rank(user_id) == _brute_rank(counts, user_id)
+
+
+def test_updates_during_load_are_replayed():
+    class _Repo:
+        def __init__(self):
+            self.release = asyncio.Event()
+
+        async def get_guild_stats(self, guild_id):
+            await self.release.wait()
+            # 查詢結果不含載入期間的變動
+            return [SimpleNamespace(user_id=1, ghost_count=2), SimpleNamespace(user_id=2, ghost_count=0)]
+
+    async def main():
+        repo = _Repo()
+        index = RankIndex(repo)
+        index.warm(7)
+        await asyncio.sleep(0)
+        index.record_mentions(7, [2, 3])
+        index.record_ghost(7, 2, 5)
+        repo.release.set()
+        while 7 in index._loading:
+            await asyncio.sleep(0)
+        return index.guilds[7]
+
+    ranking = asyncio.run(main())
+    assert ranking.ghost_counts == {1: 2, 2: 5, 3: 0}
+    assert ranking.rank(2) == (1, 3)
@@ -0,0 +1,45 @@
+"""
+database/repository.py: 訊息、語音與詐欺判定同時結案同一筆 mention 時只生效一次
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.models import MentionRecord
+from database.repository import GhostRepository
+
+
+def test_mention_is_closed_once(tmp_path):
+    db_path = str(tmp_path / "ghost.sqlite")
+
+    async def main():
+        repo = GhostRepository(db_path)
+        await repo.init_db()
+        await repo.start()
+        mention_time = datetime.now() - timedelta(seconds=30)
+        records = [
+            MentionRecord(guild_id=1, channel_id=2, message_id=i, mentioned_user_id=3,
+                          mentioner_user_id=4, mention_time=mention_time)
+            for i in (1, 2)
+        ]
+        first, second = await repo.add_mentions(records)
+
+        # 訊息與語音同時回應同一筆
+        responded = await asyncio.gather(
+            repo.mark_as_responded(first, datetime.now()), repo.mark_as_responded(first, datetime.now())
+        )
+        ghost_after_response = await repo.mark_as_ghost(first)
+        ghosted = [await repo.mark_as_ghost(second), await repo.mark_as_ghost(second)]
+        responded_after_ghost = await repo.mark_as_responded(second, datetime.now())
+        stats = await repo.get_user_stats(3, 1)
+        await repo.close()
+        return responded, ghost_after_response, ghosted, responded_after_ghost, stats
+
+    responded, ghost_after_response, ghosted, responded_after_ghost, stats = asyncio.run(main())
+    assert sorted(responded) == [False, True]
+    assert ghost_after_response is False
+    assert ghosted == [True, False]
+    assert responded_after_ghost is False
+    assert stats.latency_count == 1
+    assert stats.response_rate == pytest.approx(0.5)
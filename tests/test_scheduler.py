@@ -0,0 +1,52 @@
+"""
+core/scheduler.py: 視窗模式下 loader 查出的紀錄一律排程，視窗邊緣的不會被當成遠期
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from core.scheduler import TimeoutScheduler
+from database.models import MentionRecord
+
+TIMEOUT = 60
+
+
+class _Repo:
+    """只實作 load_horizon 用到的方法；判定詐欺時稍作等待，讓後面的紀錄在時間推進後才排程"""
+
+    def __init__(self):
+        self.edge_id = None
+
+    async def get_open_mentions_between(self, after, until):
+        overdue = MentionRecord(id=1, guild_id=1, mentioned_user_id=1,
+                                mention_time=until - timedelta(seconds=TIMEOUT * 2))
+        # 到期時間比視窗終點早 1ms
+        edge = MentionRecord(id=2, guild_id=1, mentioned_user_id=2,
+                             mention_time=until - timedelta(milliseconds=1))
+        self.edge_id = edge.id
+        return [overdue, edge]
+
+    async def mark_as_ghost(self, record_id):
+        await asyncio.sleep(0.01)
+        return True
+
+    async def increment_ghost_count(self, user_id, guild_id):
+        return 1
+
+    async def count_open_mentions_by_guild(self, until):
+        return {}
+
+
+def test_loader_schedules_rows_at_window_edge():
+    async def main():
+        repo = _Repo()
+        scheduler = TimeoutScheduler(repo, TIMEOUT, horizon_seconds=10)
+        loaded = await scheduler.load_horizon(initial=True)
+        _, deadline = scheduler.deadlines.get(repo.edge_id, (None, None))
+        result = (loaded, scheduler.is_pending(repo.edge_id), deadline, scheduler._loaded_until)
+        await scheduler.shutdown()
+        return result
+
+    loaded, pending, deadline, loaded_until = asyncio.run(main())
+    assert loaded == 2
+    assert pending
+    assert deadline is not None and deadline <= loaded_until
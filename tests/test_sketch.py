@@ -0,0 +1,69 @@
+"""
+utils/sketch.py: 分位數精度與序列化
+"""
+import random
+
+import pytest
+
+from utils.sketch import LatencySketch, format_latency
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize("sigma", [0.5, 2.0, 3.0])
+def test_quantiles_within_relative_accuracy(sigma):
+    rng = random.Random(1)
+    values = [rng.lognormvariate(3, sigma) for _ in range(10000)]
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = _exact(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=sketch.relative_accuracy * 1.01)
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_default_size_covers_full_range_without_collapsing():
+    sketch = LatencySketch()
+    for exponent in range(-2, 7):
+        sketch.add(10.0 ** exponent)
+    assert len(sketch.buckets) == 9
+    assert sketch.quantile(0.0) == pytest.approx(0.01, rel=0.02)
+
+
+def test_collapse_keeps_bucket_limit():
+    sketch = LatencySketch(max_buckets=10)
+    for i in range(100):
+        sketch.add(1.1 ** i)
+    assert len(sketch.buckets) == 10
+    assert sketch.count == 100
+
+
+def test_json_round_trip_and_merge():
+    a, b = LatencySketch(), LatencySketch()
+    for value in (0.5, 3.0, 12.0, 12.5):
+        a.add(value)
+    for value in (40.0, 90.0):
+        b.add(value)
+
+    restored = LatencySketch.from_json(a.to_json())
+    assert restored.buckets == a.buckets
+    assert restored.count == a.count
+    assert restored.quantile(0.5) == a.quantile(0.5)
+
+    restored.merge(b)
+    assert restored.count == 6
+    assert restored.quantile(1.0) == pytest.approx(90.0, rel=0.02)
+
+
+def test_empty_sketch():
+    sketch = LatencySketch.from_json(None)
+    assert sketch.quantile(0.5) is None
+    assert sketch.mean is None
+    assert format_latency(None) == "-"
+    assert format_latency(95) == "1.6 分"
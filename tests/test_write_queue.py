@@ -0,0 +1,102 @@
+"""
+database/repository.py: WriteQueue 的批次交易與 SAVEPOINT 隔離
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from database.repository import WriteQueue
+
+
+def _rows(db_path):
+    with sqlite3.connect(db_path) as db:
+        return [row[0] for row in db.execute("SELECT x FROM t ORDER BY x")]
+
+
+def _insert(value):
+    async def op(db):
+        await db.execute("INSERT INTO t (x) VALUES (?)", (value,))
+        return value
+    return op
+
+
+async def _failing(db):
+    await db.execute("INSERT INTO t (x) VALUES (-1)")
+    raise ValueError("op failed")
+
+
+def test_failed_op_rolls_back_only_itself(tmp_path):
+    db_path = str(tmp_path / "q.sqlite")
+
+    async def main():
+        queue = WriteQueue(db_path)
+        await queue.start()
+        await queue.submit(lambda db: db.execute("CREATE TABLE t (x INTEGER)"))
+        # 同時送出: 合併為同一個交易
+        results = await asyncio.gather(
+            queue.submit(_insert(1)), queue.submit(_failing), queue.submit(_insert(2)),
+            return_exceptions=True
+        )
+        await queue.close()
+        return results
+
+    results = asyncio.run(main())
+    assert results[0] == 1 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+    assert _rows(db_path) == [1, 2]
+
+
+def test_commit_failure_fails_batch_and_writer_survives(tmp_path):
+    db_path = str(tmp_path / "q.sqlite")
+
+    async def main():
+        queue = WriteQueue(db_path)
+        await queue.start()
+        await queue.submit(lambda db: db.execute("CREATE TABLE t (x INTEGER)"))
+
+        execute = queue.db.execute
+
+        async def broken(sql, *args):
+            if sql in ("COMMIT", "ROLLBACK"):
+                raise sqlite3.OperationalError(f"{sql} failed")
+            return await execute(sql, *args)
+
+        queue.db.execute = broken
+        failed = await asyncio.gather(queue.submit(_insert(1)), return_exceptions=True)
+        queue.db.execute = execute
+        await execute("ROLLBACK")
+
+        value = await queue.submit(_insert(2))
+        await asyncio.wait_for(queue.close(), 5)
+        return failed, value
+
+    failed, value = asyncio.run(main())
+    assert isinstance(failed[0], sqlite3.OperationalError)
+    assert value == 2
+    assert _rows(db_path) == [2]
+
+
+def test_writer_stopped_by_base_exception_does_not_hang(tmp_path):
+    db_path = str(tmp_path / "q.sqlite")
+
+    class Fatal(BaseException):
+        pass
+
+    async def fatal(db):
+        raise Fatal()
+
+    async def main():
+        queue = WriteQueue(db_path)
+        await queue.start()
+        await queue.submit(lambda db: db.execute("CREATE TABLE t (x INTEGER)"))
+        results = await asyncio.wait_for(
+            asyncio.gather(queue.submit(fatal), queue.submit(_insert(1)), return_exceptions=True), 5
+        )
+        with pytest.raises(RuntimeError):
+            await queue.submit(_insert(2))
+        await asyncio.wait_for(queue.close(), 5)
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
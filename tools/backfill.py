@@ -0,0 +1,412 @@
+"""
+從頻道匯出檔回補歷史紀錄 (Bot 加入前的 mention)
+
+讀取 DiscordChatExporter 的 JSON 匯出檔，依訊息時間重播 tracker / evaluator / timeout 的判定，
+產生 mentions 與 ghost_stats。
+
+用法 (Bot 需先停止):
+    python -m tools.backfill exports/                 # 目錄下所有 *.json
+    python -m tools.backfill a.json b.json --workers 8
+    python -m tools.backfill exports/ --dry-run       # 只統計不寫入
+
+- 以分區為單位平行處理 (ProcessPoolExecutor)，分區依 response_scope 決定:
+  channel → 每個頻道一區 / thread → 頻道與其討論串一區 / guild → 整個伺服器一區
+- 只回補該伺服器最早一筆已追蹤 mention 之前的訊息，重複執行不會重複計算
+- 每個分區重播完成即寫入所在的分片 (不等全部分區完成)，每批一個交易
+- 分區時只讀取匯出檔開頭的 guild / channel，不解析整個檔案
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import re
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from database.partitioned import shard_paths
+from database.repository import GhostRepository
+from utils.sketch import LatencySketch
+
+CHUNK_SIZE = 5000
+# 分區時讀取匯出檔開頭的字元數上限 (guild / channel 在 messages 之前)
+HEADER_BYTES = 64 * 1024
+THREAD_TYPES = {"GuildPublicThread", "GuildPrivateThread", "GuildNewsThread"}
+
+# (guild, channel, message, mentioned, mentioner, mention_time, responded, response_time, is_ghost)
+MentionRow = Tuple[int, int, int, int, int, str, bool, Optional[str], bool]
+
+
+class ArchivedMessage:
+    """
+    匯出檔中的訊息，提供 tracker / evaluator 需要的 discord.Message 屬性
+    """
+    __slots__ = ("id", "content", "created_at", "author", "guild", "channel", "reference", "mentions")
+
+    def __init__(self, data: dict, guild_id: int, channel_id: int, parent_id: Optional[int]):
+        self.id = int(data["id"])
+        self.content = data.get("content") or ""
+        self.created_at = _parse_timestamp(data["timestamp"])
+        author = data.get("author") or {}
+        self.author = SimpleNamespace(id=int(author.get("id", 0)), bot=bool(author.get("isBot", False)))
+        self.guild = SimpleNamespace(id=guild_id)
+        self.channel = SimpleNamespace(id=channel_id, parent_id=parent_id)
+        reference = data.get("reference")
+        self.reference = (
+            SimpleNamespace(message_id=int(reference["messageId"]))
+            if reference and reference.get("messageId") else None
+        )
+        self.mentions = [
+            SimpleNamespace(id=int(user["id"]), bot=bool(user.get("isBot", False)))
+            for user in data.get("mentions") or ()
+        ]
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """
+    匯出檔的時間含時區，資料庫使用本地時間 (與 datetime.now() 一致)
+    """
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def _channel_ids(data: dict) -> Tuple[int, int, Optional[int]]:
+    channel = data["channel"]
+    parent_id = int(channel["categoryId"]) if channel.get("type") in THREAD_TYPES and channel.get("categoryId") else None
+    return int(data["guild"]["id"]), int(channel["id"]), parent_id
+
+
+_WHITESPACE = re.compile(r"\s*")
+
+
+def _parse_header(text: str) -> Optional[dict]:
+    """
+    逐一解析最上層的鍵值，取得 guild 與 channel 即停止
+    (兩者不在 text 範圍內時回傳 None)
+    """
+    decoder = json.JSONDecoder()
+    header = {}
+    pos = _WHITESPACE.match(text, 0).end()
+    if not text.startswith("{", pos):
+        return None
+    pos += 1
+    try:
+        while len(header) < 2:
+            pos = _WHITESPACE.match(text, pos).end()
+            key, pos = decoder.raw_decode(text, pos)
+            pos = _WHITESPACE.match(text, pos).end()
+            if not text.startswith(":", pos):
+                return None
+            value, pos = decoder.raw_decode(text, _WHITESPACE.match(text, pos + 1).end())
+            if key in ("guild", "channel"):
+                header[key] = value
+            pos = _WHITESPACE.match(text, pos).end()
+            if not text.startswith(",", pos):
+                break
+            pos += 1
+    except json.JSONDecodeError:
+        return None
+    return header if len(header) == 2 else None
+
+
+def read_channel_header(path: str) -> Tuple[int, int, Optional[int]]:
+    """
+    Returns:
+        (guild_id, channel_id, 討論串的上層頻道 id)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = _parse_header(f.read(HEADER_BYTES))
+        if header is None:
+            # 非 DiscordChatExporter 的欄位順序: 解析整個檔案
+            f.seek(0)
+            header = json.load(f)
+    return _channel_ids(header)
+
+
+def _load_messages(path: str) -> List[ArchivedMessage]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    guild_id, channel_id, parent_id = _channel_ids(data)
+    messages = [ArchivedMessage(m, guild_id, channel_id, parent_id) for m in data.get("messages", ())]
+    messages.sort(key=lambda m: (m.created_at, m.id))
+    return messages
+
+
+# ==================== 重播 (在子程序中執行) ====================
+
+def replay_partition(
+    paths: List[str],
+    guild_id: int,
+    ghost_rules: dict,
+    participants: Optional[Set[int]],
+    cutoff: Optional[str],
+    now: str
+) -> List[MentionRow]:
+    """
+    依時間順序重播一個分區的所有訊息
+
+    Args:
+        participants: 需追蹤的使用者 (None 為全部)
+        cutoff: 只建立早於此時間的 mention (該伺服器最早的已追蹤 mention)
+        now: 重播結束時仍未回應者，到期時間早於 now 即為詐欺
+    """
+    from core.evaluator import ResponseEvaluator
+    from core.participants import ParticipantRegistry
+    from core.tracker import MentionTracker
+    from database.models import MentionRecord
+
+    evaluator = ResponseEvaluator.from_config({"ghost_rules": ghost_rules})
+    timeout = timedelta(seconds=ghost_rules["response_timeout"])
+    registry = None
+    if participants is not None:
+        registry = ParticipantRegistry(None, enabled=True)
+        registry.members[guild_id] = participants
+    tracker = MentionTracker(None, ghost_rules["response_timeout"], registry)
+    cutoff_time = datetime.fromisoformat(cutoff) if cutoff else None
+
+    messages = heapq.merge(*(_load_messages(path) for path in paths), key=lambda m: (m.created_at, m.id))
+
+    records: List[MentionRecord] = []
+    pending: Dict[int, List[MentionRecord]] = defaultdict(list)
+    deadlines: List[Tuple[datetime, int, MentionRecord]] = []
+
+    def expire(until: datetime) -> None:
+        # timeout: 到期仍未回應 → 詐欺
+        while deadlines and deadlines[0][0] <= until:
+            _, _, record = heapq.heappop(deadlines)
+            if not record.responded:
+                record.is_ghost = True
+                pending[record.mentioned_user_id].remove(record)
+
+    for message in messages:
+        expire(message.created_at)
+        if message.author.bot or message.content.startswith("/"):
+            continue
+
+        # 先建立這則訊息的 mention，再判定回應 (與 on_message 相同順序)
+        if cutoff_time is None or message.created_at < cutoff_time:
+            for target in tracker.trackable_mentions(message):
+                record = MentionRecord(
+                    id=len(records),
+                    guild_id=message.guild.id,
+                    channel_id=message.channel.id,
+                    message_id=message.id,
+                    mentioned_user_id=target.id,
+                    mentioner_user_id=message.author.id,
+                    mention_time=message.created_at,
+                    responded=False
+                )
+                records.append(record)
+                pending[target.id].append(record)
+                heapq.heappush(deadlines, (record.mention_time + timeout, record.id, record))
+
+        candidates = pending.get(message.author.id)
+        if candidates:
+            for record in evaluator.evaluate(message, candidates):
+                record.responded = True
+                record.response_time = message.created_at
+                candidates.remove(record)
+
+    # 匯出檔結束後仍未回應: 已到期的視為詐欺，其餘留給 Bot 啟動時恢復排程
+    expire(datetime.fromisoformat(now))
+
+    return [
+        (
+            r.guild_id, r.channel_id, r.message_id, r.mentioned_user_id, r.mentioner_user_id,
+            r.mention_time.isoformat(), r.responded,
+            r.response_time.isoformat() if r.response_time else None, r.is_ghost
+        )
+        for r in records
+    ]
+
+
+# ==================== 分區 ====================
+
+def partition_files(paths: Iterable[str], ghost_rules: dict) -> Dict[tuple, List[str]]:
+    """
+    依判定範圍分區，同一區內的訊息必須依序處理
+    """
+    scopes = {ghost_rules.get("response_scope", "channel")}
+    scopes.update(
+        (data or {}).get("response_scope", ghost_rules.get("response_scope", "channel"))
+        for data in (ghost_rules.get("channel_overrides") or {}).values()
+    )
+
+    partitions: Dict[tuple, List[str]] = defaultdict(list)
+    for path in paths:
+        guild_id, channel_id, parent_id = read_channel_header(path)
+        if "guild" in scopes:
+            key = (guild_id,)
+        elif "thread" in scopes:
+            key = (guild_id, parent_id or channel_id)
+        else:
+            key = (guild_id, channel_id)
+        partitions[key].append(path)
+    return partitions
+
+
+def collect_paths(inputs: List[str]) -> List[str]:
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(
+                os.path.join(item, name) for name in sorted(os.listdir(item)) if name.endswith(".json")
+            )
+        else:
+            paths.append(item)
+    return paths
+
+
+# ==================== 寫入 ====================
+
+def earliest_tracked(db_path: str, guild_id: int) -> Optional[str]:
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = source.execute("SELECT MIN(mention_time) FROM mentions WHERE guild_id = ?", (guild_id,)).fetchone()
+        return row[0] if row else None
+    finally:
+        source.close()
+
+
+def guild_participants(db_path: str, guild_id: int) -> Set[int]:
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = source.execute("SELECT user_id FROM participants WHERE guild_id = ?", (guild_id,)).fetchall()
+        return {row[0] for row in rows}
+    finally:
+        source.close()
+
+
+def write_rows(db_path: str, rows: List[MentionRow], now: str) -> None:
+    """
+    分批寫入 mentions，並累加 ghost_stats、重新計算回應率
+    """
+    target = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        target.execute("PRAGMA busy_timeout = 5000")
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            target.execute("BEGIN")
+            target.executemany("""
+                INSERT INTO mentions (
+                    guild_id, channel_id, message_id, mentioned_user_id, mentioner_user_id,
+                    mention_time, responded, response_time, is_ghost, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [row + (now,) for row in chunk])
+            target.execute("COMMIT")
+
+        totals: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0])
+        latencies: Dict[Tuple[int, int], LatencySketch] = defaultdict(LatencySketch)
+        for row in rows:
+            counts = totals[(row[3], row[0])]
+            counts[0] += 1
+            counts[1] += row[8]
+            if row[6]:
+                latency = (datetime.fromisoformat(row[7]) - datetime.fromisoformat(row[5])).total_seconds()
+                latencies[(row[3], row[0])].add(max(latency, 0.0))
+
+        target.execute("BEGIN")
+        target.executemany("""
+            INSERT INTO ghost_stats (user_id, guild_id, ghost_count, mention_count, last_updated)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                ghost_count = ghost_count + excluded.ghost_count,
+                mention_count = mention_count + excluded.mention_count,
+                last_updated = excluded.last_updated
+        """, [(user_id, guild_id, ghosts, mentions, now) for (user_id, guild_id), (mentions, ghosts) in totals.items()])
+        target.executemany("""
+            UPDATE ghost_stats
+            SET response_rate = CAST((
+                SELECT COUNT(*) FROM mentions
+                WHERE mentioned_user_id = ghost_stats.user_id
+                  AND guild_id = ghost_stats.guild_id
+                  AND responded = TRUE
+            ) AS REAL) / mention_count
+            WHERE user_id = ? AND guild_id = ? AND mention_count > 0
+        """, list(totals))
+
+        # 回應延遲 sketch 與既有的合併
+        for (user_id, guild_id), sketch in latencies.items():
+            existing = target.execute(
+                "SELECT latency_sketch FROM ghost_stats WHERE user_id = ? AND guild_id = ?",
+                (user_id, guild_id)
+            ).fetchone()
+            merged = LatencySketch.from_json(existing[0] if existing else None)
+            merged.merge(sketch)
+            target.execute("""
+                UPDATE ghost_stats
+                SET latency_count = ?, latency_sum = ?, latency_p50 = ?, latency_p90 = ?, latency_sketch = ?
+                WHERE user_id = ? AND guild_id = ?
+            """, (
+                merged.count, merged.total, merged.quantile(0.5), merged.quantile(0.9), merged.to_json(),
+                user_id, guild_id
+            ))
+        target.execute("COMMIT")
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="從頻道匯出檔回補歷史詐欺紀錄")
+    parser.add_argument("inputs", nargs="+", help="DiscordChatExporter JSON 檔或其所在目錄")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--dry-run", action="store_true", help="只統計不寫入")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    db_config = config["database"]
+    ghost_rules = config["ghost_rules"]
+
+    shard_count = int(db_config.get("shards", 1))
+    paths = [db_config["path"]] if shard_count <= 1 else shard_paths(db_config["path"], shard_count)
+
+    async def init_databases():
+        for i, path in enumerate(paths):
+            await GhostRepository(path, shard_index=i, shard_count=len(paths)).init_db()
+    asyncio.run(init_databases())
+
+    partitions = partition_files(collect_paths(args.inputs), ghost_rules)
+    guild_ids = {key[0] for key in partitions}
+    now = datetime.now().isoformat()
+
+    cutoffs = {guild_id: earliest_tracked(paths[guild_id % len(paths)], guild_id) for guild_id in guild_ids}
+    participants = {
+        guild_id: guild_participants(paths[guild_id % len(paths)], guild_id) if ghost_rules.get("need_permission2play") else None
+        for guild_id in guild_ids
+    }
+
+    # 分區完成即寫入 (同時只保留一個分區的結果)，ghost_stats 以累加寫入，分次寫入與一次寫入結果相同
+    total = ghosts = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(replay_partition, files, key[0], ghost_rules, participants[key[0]], cutoffs[key[0]], now): key
+            for key, files in partitions.items()
+        }
+        for future in as_completed(futures):
+            key = futures.pop(future)
+            rows = future.result()
+            total += len(rows)
+            ghosts += sum(row[8] for row in rows)
+            if not args.dry_run and rows:
+                write_rows(paths[key[0] % len(paths)], rows, now)
+
+    print(f"{len(partitions)} 個分區, {len(guild_ids)} 個伺服器: mentions={total}, 詐欺={ghosts}")
+
+    if args.dry_run:
+        raise SystemExit(0)
+
+    snapshot_path = db_config.get("snapshot_path")
+    if snapshot_path and os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+        print(f"已刪除排程快照 {snapshot_path}")
+    print("回補完成")
@@ -0,0 +1,93 @@
+"""
+ResponseEvaluator 效能比較
+比較舊版逐筆判定 (每筆紀錄都 strip 一次) 與編譯後的規則鏈 (每則訊息只算一次)
+
+用法: python -m tools.bench_evaluator [--rounds 2000]
+"""
+import argparse
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from core.evaluator import ResponseEvaluator
+from database.models import MentionRecord
+
+
+class LegacyEvaluator:
+    """
+    舊版判定邏輯 (僅供比較)
+    """
+    def __init__(self, min_length: int = 1):
+        self.min_length = min_length
+
+    def is_valid_response(self, message, original_mention) -> bool:
+        if message.channel.id != original_mention.channel_id:
+            return False
+        if message.author.id != original_mention.mentioned_user_id:
+            return False
+        if len(message.content.strip()) < self.min_length:
+            return False
+        return True
+
+
+def _make_message(author_id: int, channel_id: int, content: str):
+    return SimpleNamespace(
+        author=SimpleNamespace(id=author_id),
+        guild=SimpleNamespace(id=1),
+        channel=SimpleNamespace(id=channel_id),
+        content=content,
+        reference=None
+    )
+
+
+def _make_records(count: int, user_id: int, channel_id: int):
+    return [
+        MentionRecord(
+            id=i,
+            guild_id=1,
+            channel_id=channel_id,
+            message_id=10_000 + i,
+            mentioned_user_id=user_id,
+            mentioner_user_id=2,
+            mention_time=datetime.now()
+        )
+        for i in range(count)
+    ]
+
+
+# (名稱, 候選紀錄數, 訊息內容)
+WORKLOADS = [
+    ("single", 1, "ok"),
+    ("few", 5, "收到 我等等看"),
+    ("heavy_user", 50, "  " + "長訊息 " * 200 + "  "),
+    ("backlog", 500, "hi"),
+]
+
+
+def run(rounds: int) -> None:
+    legacy = LegacyEvaluator(min_length=1)
+    compiled = ResponseEvaluator(min_length=1)
+
+    print(f"{'workload':<12}{'candidates':>12}{'legacy (us)':>14}{'compiled (us)':>16}{'speedup':>10}")
+    for name, count, content in WORKLOADS:
+        message = _make_message(author_id=42, channel_id=7, content=content)
+        records = _make_records(count, user_id=42, channel_id=7)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            [r for r in records if legacy.is_valid_response(message, r)]
+        legacy_us = (time.perf_counter() - start) / rounds * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            compiled.evaluate(message, records)
+        compiled_us = (time.perf_counter() - start) / rounds * 1e6
+
+        print(f"{name:<12}{count:>12}{legacy_us:>14.2f}{compiled_us:>16.2f}{legacy_us / compiled_us:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ResponseEvaluator 效能比較")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.rounds)
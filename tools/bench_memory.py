@@ -0,0 +1,156 @@
+"""
+Gateway 快取的記憶體比較 (default vs lean)
+
+以合成的 GUILD_CREATE / MESSAGE_CREATE payload 餵給 discord.py 的 ConnectionState，
+不連線 Discord。每個 profile 在獨立的子程序中量測 RSS。
+
+用法:
+    python -m tools.bench_memory
+    python -m tools.bench_memory --guilds 2000 --members 300 --messages 100
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+import discord
+
+from core.gateway import PROFILE_DEFAULT, PROFILE_LEAN, build_gateway_options
+
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def rss_mb() -> float:
+    """目前的 RSS (MB)，非 Linux 時以峰值代替"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None}
+
+
+def _member(user_id: int) -> dict:
+    return {"user": _user(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "nick": None, "flags": 0}
+
+
+def guild_payload(guild_id: int, members: int, channels: int) -> dict:
+    base = guild_id * 1_000_000
+    return {
+        "id": str(guild_id),
+        "name": f"guild{guild_id}",
+        "icon": None,
+        "owner_id": str(base + 1),
+        "member_count": members,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "threads": [],
+        "voice_states": [],
+        "presences": [],
+        "roles": [{
+            "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False
+        }],
+        "channels": [
+            {"id": str(base + 500_000 + c), "type": 0, "name": f"channel{c}", "position": c, "permission_overwrites": []}
+            for c in range(channels)
+        ],
+        "members": [_member(base + m + 1) for m in range(members)],
+    }
+
+
+def message_payload(guild_id: int, channel_id: int, message_id: int, author_id: int, mentioned_id: int) -> dict:
+    return {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "guild_id": str(guild_id),
+        "author": _user(author_id),
+        "member": {k: v for k, v in _member(author_id).items() if k != "user"},
+        "content": f"<@{mentioned_id}> hello",
+        "timestamp": TIMESTAMP,
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [dict(_user(mentioned_id), member={k: v for k, v in _member(mentioned_id).items() if k != "user"})],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+async def measure(profile: str, guilds: int, members: int, channels: int, messages: int) -> dict:
+    options = build_gateway_options({"gateway": {"profile": profile}})
+    client = discord.Client(**options)
+    state = client._connection
+
+    gc.collect()
+    before = rss_mb()
+
+    for g in range(1, guilds + 1):
+        data = guild_payload(g, members, channels)
+        # 直接建立 Guild (與 READY 後的 GUILD_CREATE 相同的快取路徑)
+        state._get_create_guild(data)
+        base = g * 1_000_000
+        for i in range(messages):
+            state.parse_message_create(message_payload(
+                g, base + 500_000 + i % channels, base * 10 + i, base + 1 + i % members, base + 1 + (i * 7) % members
+            ))
+
+    gc.collect()
+    after = rss_mb()
+    return {
+        "profile": profile,
+        "guilds": guilds,
+        "cached_members": sum(len(guild._members) for guild in client.guilds),
+        "cached_messages": len(state._messages) if state._messages is not None else 0,
+        "rss_mb": round(after - before, 1),
+        "rss_mb_per_1k_guilds": round((after - before) / guilds * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比較 default / lean gateway profile 的記憶體用量")
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=200, help="每個伺服器的成員數")
+    parser.add_argument("--channels", type=int, default=10, help="每個伺服器的頻道數")
+    parser.add_argument("--messages", type=int, default=50, help="每個伺服器的訊息數")
+    parser.add_argument("--child", choices=(PROFILE_DEFAULT, PROFILE_LEAN), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(measure(args.child, args.guilds, args.members, args.channels, args.messages))
+        print(json.dumps(result))
+        return
+
+    print(f"伺服器: {args.guilds}, 成員/伺服器: {args.members}, 頻道/伺服器: {args.channels}, 訊息/伺服器: {args.messages}")
+    print(f"{'profile':<10} {'成員快取':>10} {'訊息快取':>10} {'RSS (MB)':>10} {'MB / 1k 伺服器':>16}")
+    for profile in (PROFILE_DEFAULT, PROFILE_LEAN):
+        output = subprocess.run(
+            [sys.executable, "-m", "tools.bench_memory", "--child", profile,
+             "--guilds", str(args.guilds), "--members", str(args.members),
+             "--channels", str(args.channels), "--messages", str(args.messages)],
+            capture_output=True, text=True, check=True, cwd=os.getcwd()
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(
+            f"{result['profile']:<10} {result['cached_members']:>10} {result['cached_messages']:>10} "
+            f"{result['rss_mb']:>10} {result['rss_mb_per_1k_guilds']:>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
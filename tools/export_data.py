@@ -0,0 +1,65 @@
+"""
+匯出 / 匯入伺服器資料
+
+用法:
+    python -m tools.export_data export backup.jsonl.gz
+    python -m tools.export_data export guild.csv.gz --guild 123456789
+    python -m tools.export_data import backup.jsonl.gz [--replace]
+
+匯入檔中的伺服器若已有資料需加上 --replace (以匯入檔取代，不合併)。
+匯入時 Bot 需先停止 (記憶體中的排程與排行榜不會看到匯入的資料)。
+匯入後會刪除排程快照，下次啟動時從資料庫完整恢復 pending timeouts。
+"""
+import argparse
+import asyncio
+import os
+
+import yaml
+
+from database.export import export_data, import_data
+from database.partitioned import shard_paths
+from database.repository import GhostRepository
+
+
+def database_paths(db_config: dict) -> list:
+    shard_count = int(db_config.get("shards", 1))
+    if shard_count <= 1:
+        return [db_config["path"]]
+    return shard_paths(db_config["path"], shard_count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="匯出 / 匯入 ghost_stats、participants、mentions")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("file", help="*.jsonl[.gz] 或 *.csv[.gz]")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--guild", type=int, help="只匯出此伺服器")
+    parser.add_argument("--replace", action="store_true", help="匯入前刪除該伺服器原有的資料")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        db_config = yaml.safe_load(f)["database"]
+    paths = database_paths(db_config)
+
+    # 建表 / 補上舊版資料庫缺少的欄位
+    async def init_databases():
+        for i, path in enumerate(paths):
+            await GhostRepository(path, shard_index=i, shard_count=len(paths)).init_db()
+    asyncio.run(init_databases())
+
+    if args.action == "export":
+        if args.guild is not None:
+            paths = [paths[args.guild % len(paths)]]
+        counts = export_data(paths, args.file, guild_id=args.guild)
+    else:
+        try:
+            counts = import_data(paths, args.file, replace=args.replace)
+        except ValueError as e:
+            raise SystemExit(f"匯入失敗: {e}")
+
+        snapshot_path = db_config.get("snapshot_path")
+        if snapshot_path and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+            print(f"已刪除排程快照 {snapshot_path}")
+
+    print(", ".join(f"{table}={count}" for table, count in counts.items()))
@@ -0,0 +1,119 @@
+"""
+將單一資料庫檔拆成依 guild_id 分片的多個檔案
+
+用法 (Bot 需先停止):
+    python -m tools.split_database --shards 4
+    python -m tools.split_database --source database/ghost_rank.sqlite --shards 4
+
+完成後將 config.yaml 的 database.shards 改為相同數值。
+record_id 會重新編號，因此會刪除排程快照 (下次啟動改為完整恢復)。
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+
+import yaml
+
+from database.partitioned import shard_paths
+from database.repository import GhostRepository
+
+CHUNK_SIZE = 5000
+
+MENTION_COLUMNS = (
+    "guild_id", "channel_id", "message_id", "mentioned_user_id", "mentioner_user_id",
+    "mention_time", "responded", "response_time", "is_ghost", "updated_at"
+)
+
+
+def _copy_table(source: sqlite3.Connection, targets: list, table: str, columns: tuple, order_by: str) -> int:
+    """
+    分批讀取 source 的資料表，依 guild_id 寫入對應分片
+    """
+    shard_count = len(targets)
+    guild_index = columns.index("guild_id")
+    placeholders = ", ".join("?" for _ in columns)
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    cursor = source.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order_by}")
+    copied = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+
+        buckets = [[] for _ in range(shard_count)]
+        for row in rows:
+            buckets[row[guild_index] % shard_count].append(row)
+        for target, bucket in zip(targets, buckets):
+            if bucket:
+                target.executemany(insert, bucket)
+        copied += len(rows)
+
+    return copied
+
+
+def split(source_path: str, shard_count: int) -> None:
+    paths = shard_paths(source_path, shard_count)
+    existing = [path for path in paths if os.path.exists(path)]
+    if existing:
+        raise SystemExit(f"分片檔已存在，請先移除: {', '.join(existing)}")
+
+    # 以 GhostRepository 建立表格與分片設定
+    async def init_shards():
+        for i, path in enumerate(paths):
+            await GhostRepository(path, shard_index=i, shard_count=shard_count).init_db()
+    asyncio.run(init_shards())
+
+    source = sqlite3.connect(source_path)
+    targets = [sqlite3.connect(path) for path in paths]
+    try:
+        mentions = _copy_table(source, targets, "mentions", MENTION_COLUMNS, "id")
+        stats = _copy_table(
+            source, targets, "ghost_stats",
+            ("user_id", "guild_id", "ghost_count", "mention_count", "response_rate", "last_updated",
+             "latency_count", "latency_sum", "latency_p50", "latency_p90", "latency_sketch"),
+            "guild_id"
+        )
+        has_participants = source.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'participants'"
+        ).fetchone()
+        participants = 0
+        if has_participants:
+            participants = _copy_table(
+                source, targets, "participants", ("user_id", "guild_id", "joined_at"), "guild_id"
+            )
+
+        for target in targets:
+            target.commit()
+    finally:
+        source.close()
+        for target in targets:
+            target.close()
+
+    print(f"已拆分為 {shard_count} 個分片: mentions={mentions}, ghost_stats={stats}, participants={participants}")
+    for path in paths:
+        print(f"  {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="將資料庫依 guild_id 拆成多個分片")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--source", help="來源資料庫 (預設為 config 的 database.path)")
+    parser.add_argument("--shards", type=int, required=True)
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        db_config = yaml.safe_load(f)["database"]
+
+    if args.shards < 2:
+        raise SystemExit("--shards 必須 >= 2")
+
+    split(args.source or db_config["path"], args.shards)
+
+    snapshot_path = db_config.get("snapshot_path")
+    if snapshot_path and os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+        print(f"已刪除排程快照 {snapshot_path} (record_id 已重新編號)")
+
+    print(f"請將 config.yaml 的 database.shards 設為 {args.shards}")
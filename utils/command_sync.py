@@ -0,0 +1,93 @@
+"""
+Slash command 同步判斷
+將已啟用的指令樹 (名稱、參數、描述) 雜湊後存在本地，只有變動時才呼叫 tree.sync
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger("MentionDodger.CommandSync")
+
+
+def _command_payload(tree: app_commands.CommandTree, command) -> dict:
+    # discord.py 2.4 之後 to_dict 需要傳入 tree
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        return command.to_dict()
+
+
+def hash_command_tree(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """
+    計算某個同步目標 (guild 或 global) 的指令樹雜湊
+    """
+    payloads = sorted(
+        (_command_payload(tree, command) for command in tree.get_commands(guild=guild)),
+        key=lambda p: (p.get("type", 1), p["name"])
+    )
+    raw = json.dumps(payloads, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """
+    記錄每個同步目標上次同步時的指令樹雜湊
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.hashes: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"無法讀取指令雜湊檔 {self.path}，將重新同步: {e}")
+            return {}
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.hashes, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def target_key(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]) -> str:
+        # 換了 bot 應用程式時必須重新同步，因此以 application_id 區分
+        target = f"guild:{guild.id}" if guild else "global"
+        return f"{tree.client.application_id}:{target}"
+
+    async def sync_if_changed(
+        self,
+        tree: app_commands.CommandTree,
+        guild: Optional[discord.abc.Snowflake] = None,
+        force: bool = False
+    ) -> bool:
+        """
+        指令樹與上次同步不同 (或 force) 時才呼叫 tree.sync
+
+        Returns:
+            bool: 是否實際進行了同步
+        """
+        key = self.target_key(tree, guild)
+        digest = hash_command_tree(tree, guild=guild)
+
+        if not force and self.hashes.get(key) == digest:
+            logger.info(f"Slash Commands 未變動，跳過同步 ({key})")
+            return False
+
+        await tree.sync(guild=guild)
+        self.hashes[key] = digest
+        self.save()
+        logger.info(f"Slash Commands 已同步 ({key})")
+        return True
@@ -0,0 +1,159 @@
+"""
+排行榜圖片繪製 (在子程序中執行)
+
+只依賴 Pillow 與標準函式庫，由 core/cards.py 透過 ProcessPoolExecutor 呼叫，
+輸入與輸出都是可 pickle 的簡單資料 (CardRow 列表 → PNG bytes)
+"""
+import io
+from dataclasses import dataclass
+from typing import List, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+WIDTH = 800
+HEADER_HEIGHT = 96
+ROW_HEIGHT = 64
+PADDING = 24
+AVATAR_SIZE = 44
+BAR_HEIGHT = 10
+
+BACKGROUND = (43, 45, 49)
+ROW_ALT = (49, 51, 56)
+TEXT = (242, 243, 245)
+MUTED = (181, 186, 193)
+ACCENT = (255, 107, 107)
+TRACK = (64, 66, 73)
+MEDALS = {1: (255, 201, 64), 2: (200, 205, 214), 3: (205, 127, 50)}
+
+# 內建字型不含中文，沒有指定字型檔時改用英文標籤
+LABELS_CJK = {
+    "title": "詐欺排行榜", "subtitle": "{} • 前 {} 名",
+    "ghosts": "詐欺 {} 次", "mentions": "被提及 {} 次", "rate": "詐欺率 {:.1f}%"
+}
+LABELS_ASCII = {
+    "title": "Ghost Leaderboard", "subtitle": "{} · Top {}",
+    "ghosts": "{} ghosts", "mentions": "{} mentions", "rate": "{:.1f}% ghosted"
+}
+
+
+@dataclass
+class CardRow:
+    rank: int
+    name: str
+    ghost_count: int
+    mention_count: int
+    avatar_path: Optional[str] = None
+
+    @property
+    def ghost_rate(self) -> float:
+        return self.ghost_count / self.mention_count * 100 if self.mention_count > 0 else 0.0
+
+
+def _usable_font(font_path: Optional[str]) -> Optional[str]:
+    if not font_path:
+        return None
+    try:
+        ImageFont.truetype(font_path, 12)
+        return font_path
+    except OSError:
+        return None
+
+
+def _font(size: int, font_path: Optional[str]):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 的內建字型不能指定大小
+        return ImageFont.load_default()
+
+
+def _avatar(path: Optional[str], name: str, font) -> Image.Image:
+    """
+    圓形頭像，沒有頭像時以名稱首字代替
+    """
+    mask = Image.new("L", (AVATAR_SIZE * 4, AVATAR_SIZE * 4), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, AVATAR_SIZE * 4, AVATAR_SIZE * 4), fill=255)
+    mask = mask.resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+
+    image = None
+    if path:
+        try:
+            with Image.open(path) as source:
+                image = source.convert("RGBA").resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+        except OSError:
+            image = None
+    if image is None:
+        image = Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), TRACK)
+        ImageDraw.Draw(image).text(
+            (AVATAR_SIZE / 2, AVATAR_SIZE / 2), (name[:1] or "?").upper(), font=font, fill=TEXT, anchor="mm"
+        )
+
+    image.putalpha(mask)
+    return image
+
+
+def _fit(draw: ImageDraw.ImageDraw, text: str, font, max_width: int) -> str:
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_leaderboard(guild_name: str, rows: List[CardRow], font_path: Optional[str] = None) -> bytes:
+    """
+    繪製排行榜卡片
+
+    Returns:
+        PNG bytes
+    """
+    font_path = _usable_font(font_path)
+    labels = LABELS_CJK if font_path else LABELS_ASCII
+    title_font = _font(32, font_path)
+    name_font = _font(22, font_path)
+    small_font = _font(15, font_path)
+    rank_font = _font(24, font_path)
+
+    height = HEADER_HEIGHT + ROW_HEIGHT * max(len(rows), 1) + PADDING
+    image = Image.new("RGBA", (WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    draw.rectangle((0, 0, 6, HEADER_HEIGHT - 16), fill=ACCENT)
+    draw.text((PADDING, 18), labels["title"], font=title_font, fill=TEXT)
+    draw.text((PADDING, 60), labels["subtitle"].format(guild_name, len(rows)), font=small_font, fill=MUTED)
+
+    max_ghosts = max((row.ghost_count for row in rows), default=0) or 1
+    name_x = PADDING + 56 + AVATAR_SIZE + 16
+    bar_x = WIDTH - PADDING - 260
+    bar_width = 260
+
+    for index, row in enumerate(rows):
+        top = HEADER_HEIGHT + index * ROW_HEIGHT
+        middle = top + ROW_HEIGHT // 2
+        if index % 2 == 0:
+            draw.rectangle((0, top, WIDTH, top + ROW_HEIGHT), fill=ROW_ALT)
+
+        draw.text((PADDING + 24, middle), f"{row.rank}", font=rank_font, fill=MEDALS.get(row.rank, MUTED), anchor="mm")
+        image.alpha_composite(_avatar(row.avatar_path, row.name, name_font), (PADDING + 56, middle - AVATAR_SIZE // 2))
+
+        name = _fit(draw, row.name, name_font, bar_x - name_x - 16)
+        draw.text((name_x, middle - 4), name, font=name_font, fill=TEXT, anchor="ls")
+        draw.text(
+            (name_x, middle + 18),
+            f"{labels['mentions'].format(row.mention_count)} · {labels['rate'].format(row.ghost_rate)}",
+            font=small_font, fill=MUTED, anchor="ls"
+        )
+
+        # 詐欺次數長條 (以本榜最大值為滿格)
+        bar_top = middle + 4
+        draw.rounded_rectangle((bar_x, bar_top, bar_x + bar_width, bar_top + BAR_HEIGHT), radius=5, fill=TRACK)
+        filled = round(bar_width * row.ghost_count / max_ghosts)
+        if filled > 0:
+            draw.rounded_rectangle((bar_x, bar_top, bar_x + max(filled, BAR_HEIGHT), bar_top + BAR_HEIGHT), radius=5, fill=ACCENT)
+        draw.text((bar_x + bar_width, middle - 4), labels["ghosts"].format(row.ghost_count), font=small_font, fill=TEXT, anchor="rs")
+
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
@@ -1,22 +1,146 @@
 """
 統一的 Log 管理
+
+所有 handler 掛在 root logger 的 QueueHandler 後面:
+- 呼叫端 (event loop) 只負責把 record 放進佇列
+- QueueListener 在背景執行緒中格式化並寫入 console / 檔案 (含 rotation)
+
+結構化欄位以 extra 傳入，例如:
+    logger.debug("已排程 timeout: record_id=%s", record.id, extra={"record_id": record.id, "guild_id": record.guild_id})
 """
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+# 會輸出到 JSON 的結構化欄位
+STRUCTURED_FIELDS = ("guild_id", "record_id", "user_id", "channel_id")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每筆 log 輸出為一行 JSON
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    DEBUG 事件只保留 rate 比例 (每個 mention 都會產生的事件量太大)
+    INFO 以上一律保留
+    """
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _PreformattedQueueHandler(QueueHandler):
+    """
+    QueueHandler 預設會在呼叫端套用 formatter；這裡只在呼叫端合併 msg % args
+    (參數可能是之後會被修改的物件，必須在記錄當下取值)，formatter 留給 listener 執行緒
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        # exc_info 中的 traceback 物件不能跨執行緒安全保存，先轉成文字
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def setup_logging(config: Optional[dict] = None) -> QueueListener:
+    """
+    初始化整個程式的 log (重複呼叫不會重複掛 handler)
+
+    Args:
+        config: config.yaml 的 logging 區塊
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    config = config or {}
+    level = logging.getLevelName(str(config.get("level", "INFO")).upper())
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("[%(asctime)s] %(name)s - %(levelname)s: %(message)s"))
+    handlers = [console]
+
+    log_file = config.get("file", "logs/bot.log")
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=config.get("max_bytes", 5 * 1024 * 1024),
+            backupCount=config.get("backup_count", 3),
+            encoding="utf-8"
+        )
+        if config.get("json", True):
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter("[%(asctime)s] %(name)s - %(levelname)s: %(message)s"))
+        handlers.append(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _PreformattedQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(config.get("debug_sample_rate", 1.0)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    停止背景寫入執行緒 (會先寫完佇列中剩餘的 log)
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logger(name: str, level=logging.INFO):
+    """
+    取得已接上統一 log 系統的 logger
+    """
+    setup_logging()
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
-    # Console Handler
-    console = logging.StreamHandler()
-    console.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s"))
-    logger.addHandler(console)
-    
-    # File Handler
-    file_handler = RotatingFileHandler("logs/bot.log", maxBytes=5*1024*1024, backupCount=3)
-    file_handler.setFormatter(logging.Formatter("[%(asctime)s] %(name)s - %(levelname)s: %(message)s"))
-
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+    return logger
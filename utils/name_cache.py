@@ -0,0 +1,53 @@
+"""
+顯示名稱快取 (LRU)
+
+lean 模式不快取成員，/rank 需要的名稱從最近的訊息與互動中記下，
+查不到才以 fetch_user 向 API 查詢
+
+快取不分伺服器，只記全域名稱 (global_name 或使用者名稱)，
+不使用 Member.display_name，避免某個伺服器的暱稱出現在其他伺服器的排行榜
+"""
+from collections import OrderedDict
+from typing import Optional
+
+import discord
+
+
+class NameCache:
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.names: "OrderedDict[int, str]" = OrderedDict()
+
+    @staticmethod
+    def global_name(user: discord.abc.User) -> str:
+        return user.global_name or user.name
+
+    def remember(self, user: discord.abc.User) -> None:
+        self.names[user.id] = self.global_name(user)
+        self.names.move_to_end(user.id)
+        if len(self.names) > self.max_size:
+            self.names.popitem(last=False)
+
+    def get(self, user_id: int) -> Optional[str]:
+        name = self.names.get(user_id)
+        if name is not None:
+            self.names.move_to_end(user_id)
+        return name
+
+    async def resolve(self, client: discord.Client, user_id: int) -> str:
+        """
+        名稱快取 → client 快取 → API，都失敗時返回「未知使用者」
+        """
+        name = self.get(user_id)
+        if name is not None:
+            return name
+
+        user = client.get_user(user_id)
+        if user is None:
+            try:
+                user = await client.fetch_user(user_id)
+            except discord.HTTPException:
+                return f"未知使用者 ({user_id})"
+
+        self.remember(user)
+        return self.global_name(user)
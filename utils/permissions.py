@@ -0,0 +1,125 @@
+"""
+權限判斷 (config/permissions.json)
+
+讀取時編譯成 PermissionTable (身分組名稱 / id 與使用者 id 的集合)，
+之後每次判斷只做集合查詢，檔案變動時由 ConfigReloader 整份替換
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable
+
+import discord
+
+logger = logging.getLogger("MentionDodger.Permissions")
+
+
+@dataclass(frozen=True)
+class RoleSet:
+    """
+    身分組名稱與 id 的集合 (permissions.json 中兩種寫法皆可)
+    """
+    names: FrozenSet[str] = frozenset()
+    ids: FrozenSet[int] = frozenset()
+
+    @classmethod
+    def compile(cls, entries: Iterable) -> "RoleSet":
+        names, ids = set(), set()
+        for entry in entries:
+            if isinstance(entry, int) or (isinstance(entry, str) and entry.isdigit()):
+                ids.add(int(entry))
+            elif isinstance(entry, str):
+                names.add(entry)
+            else:
+                raise ValueError(f"無效的身分組設定: {entry!r}")
+        return cls(frozenset(names), frozenset(ids))
+
+    def matches(self, member: discord.abc.User) -> bool:
+        if not self.names and not self.ids:
+            return False
+        for role in getattr(member, "roles", ()):
+            if role.id in self.ids or role.name in self.names:
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class CommandRule:
+    allowed_roles: RoleSet = RoleSet()
+    allowed_users: FrozenSet[int] = frozenset()
+
+
+@dataclass(frozen=True)
+class PermissionTable:
+    admin_roles: RoleSet = RoleSet()
+    commands: Dict[str, CommandRule] = field(default_factory=dict)
+
+    @classmethod
+    def compile(cls, data: dict) -> "PermissionTable":
+        """
+        驗證並編譯 permissions.json 的內容 (格式錯誤時拋出 ValueError)
+        """
+        if not isinstance(data, dict):
+            raise ValueError("permissions.json 的最上層必須是物件")
+        admin_roles = data.get("admin_roles", [])
+        commands = data.get("commands", {})
+        if not isinstance(admin_roles, list) or not isinstance(commands, dict):
+            raise ValueError("admin_roles 必須是陣列，commands 必須是物件")
+
+        rules = {}
+        for name, rule in commands.items():
+            if not isinstance(rule, dict):
+                raise ValueError(f"{name} 的權限設定必須是物件")
+            rules[name if name.startswith("/") else f"/{name}"] = CommandRule(
+                allowed_roles=RoleSet.compile(rule.get("allowed_roles", [])),
+                allowed_users=frozenset(int(user_id) for user_id in rule.get("allowed_users", []))
+            )
+        return cls(admin_roles=RoleSet.compile(admin_roles), commands=rules)
+
+    def is_admin(self, member: discord.abc.User) -> bool:
+        """
+        伺服器管理員，或擁有 admin_roles 中任一身分組
+        """
+        guild_permissions = getattr(member, "guild_permissions", None)
+        if guild_permissions is not None and guild_permissions.administrator:
+            return True
+        return self.admin_roles.matches(member)
+
+    def can_use(self, member: discord.abc.User, command: str) -> bool:
+        """
+        管理員，或符合該指令的 allowed_roles / allowed_users
+        """
+        if self.is_admin(member):
+            return True
+        rule = self.commands.get(command)
+        if rule is None:
+            return False
+        return member.id in rule.allowed_users or rule.allowed_roles.matches(member)
+
+
+def read_permissions(path: str = "config/permissions.json") -> PermissionTable:
+    """
+    讀取並編譯權限檔 (找不到檔案時為空表，格式錯誤時拋出 ValueError)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return PermissionTable()
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path} 不是有效的 JSON: {e}") from e
+    return PermissionTable.compile(data)
+
+
+def load_permissions(path: str = "config/permissions.json") -> PermissionTable:
+    """
+    啟動時讀取 (找不到檔案時記錄警告)
+    """
+    if not os.path.exists(path):
+        logger.warning(f"找不到 {path}，僅伺服器管理員具有管理權限。")
+    return read_permissions(path)
+
+
+def is_admin(member: discord.abc.User, permissions: PermissionTable) -> bool:
+    return permissions.is_admin(member)
@@ -0,0 +1,112 @@
+"""
+回應延遲的分位數 sketch
+
+以對數分桶記錄數值 (相對誤差 relative_accuracy)，桶數有上限，記憶體與樣本數無關:
+- add: O(1)
+- quantile: O(桶數)
+- 序列化為精簡 JSON 存入 ghost_stats.latency_sketch
+"""
+import json
+import math
+from typing import Dict, Optional
+
+# 小於 MIN_VALUE / 大於 MAX_VALUE (秒) 的延遲分別併入最低 / 最高的桶
+MIN_VALUE = 0.01
+MAX_VALUE = 30 * 86400
+
+
+class LatencySketch:
+    def __init__(self, relative_accuracy: float = 0.02, max_buckets: Optional[int] = None):
+        """
+        Args:
+            max_buckets: 桶數上限 (None 時為涵蓋 MIN_VALUE ~ MAX_VALUE 所需的桶數，約 480 個，
+                正常情況下不會合併; 設得太小時最低的桶會一路往上合併，分位數偏高)
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._min_index = self._index(MIN_VALUE)
+        self._max_index = self._index(MAX_VALUE)
+        if max_buckets is None:
+            max_buckets = self._max_index - self._min_index + 1
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(min(max(value, MIN_VALUE), MAX_VALUE)) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # 桶的代表值 (桶內相對誤差最小的點)
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """
+        桶數超過上限時，把最小的兩個桶合併 (犧牲最快的回應的精度)
+        """
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other: "LatencySketch") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.buckets))
+
+    # ==================== 序列化 ====================
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"a": self.relative_accuracy, "n": self.count, "s": round(self.total, 3), "b": self.buckets},
+            separators=(",", ":")
+        )
+
+    @classmethod
+    def from_json(cls, data: Optional[str]) -> "LatencySketch":
+        if not data:
+            return cls()
+        payload = json.loads(data)
+        sketch = cls(relative_accuracy=payload["a"])
+        sketch.buckets = {int(index): count for index, count in payload["b"].items()}
+        sketch.count = payload["n"]
+        sketch.total = payload["s"]
+        return sketch
+
+
+def format_latency(seconds: Optional[float]) -> str:
+    """
+    12.3 → "12 秒", 95 → "1.6 分", 7200 → "2.0 小時"
+    """
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f} 秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} 分"
+    return f"{seconds / 3600:.1f} 小時"